@@ -0,0 +1,236 @@
+import argparse
+import sys
+
+from bitio import InputBitStream, OutputBitStream
+from stats import STATS, add_arguments, reporting
+
+SYMBOL_BITS = 9         # Raw size of a symbol sent after the NYT code
+EOF_SYMBOL = 256        # End of stream, after the 256 byte values
+SYMBOL_COUNT = 257
+INTERNAL = -1           # Symbol of an internal node
+NYT = -2                # Symbol of the "not yet transmitted" leaf
+CHUNK_SIZE = 1 << 16
+
+
+class AdaptiveHuffmanTree:
+    """
+    FGK adaptive Huffman tree over bytes plus an end-of-stream symbol.
+
+    Encoder and decoder start from the same single NYT ("not yet transmitted") leaf and apply the same
+    ``update`` after every symbol, so no code table is ever stored. A symbol seen for the first time is sent as
+    the NYT code followed by its 9-bit value. Node indices are the FGK node numbers: weights never decrease
+    with the index and the root is the last node, so the block leader of a node is found by scanning upwards.
+    Memory is fixed at ``2 * SYMBOL_COUNT - 1`` nodes whatever the stream length.
+
+    Examples:
+        # Example usage:
+        tree = AdaptiveHuffmanTree()
+        code, length = tree.encode(ord('a'))  # NYT code, then ord('a') in 9 bits
+        tree.update(ord('a'))
+    """
+
+    def __init__(self):
+        size = 2 * SYMBOL_COUNT - 1
+        self.root = size - 1
+        self.nyt = self.root
+        self.weight = [0] * size
+        self.parent = [None] * size
+        self.left = [None] * size
+        self.right = [None] * size
+        self.symbol = [INTERNAL] * size
+        self.symbol[self.root] = NYT
+        self.leaf = [None] * SYMBOL_COUNT  # Symbol -> node index
+
+    def code_of(self, node):
+        """
+        Returns:
+            tuple: ``(code, length)`` of the path from the root to node.
+        """
+        code = 0
+        length = 0
+        parent = self.parent
+        right = self.right
+        while node != self.root:
+            up = parent[node]
+            if right[up] == node:
+                code |= 1 << length
+            length += 1
+            node = up
+        return code, length
+
+    def encode(self, symbol):
+        """
+        Compute the bits to send for a symbol, before the tree is updated with it.
+
+        Returns:
+            tuple: ``(code, length)``.
+        """
+        node = self.leaf[symbol]
+        if node is not None:
+            return self.code_of(node)
+        code, length = self.code_of(self.nyt)
+        return (code << SYMBOL_BITS) | symbol, length + SYMBOL_BITS
+
+    def decode(self, bit_stream):
+        """
+        Read one symbol from a bit stream.
+
+        Returns:
+            int: The symbol.
+
+        Raises:
+            EOFError: If the stream ends inside a code.
+        """
+        node = self.root
+        left = self.left
+        right = self.right
+        symbol = self.symbol
+        while symbol[node] == INTERNAL:
+            bit = bit_stream.read()
+            if bit is None:
+                raise EOFError('Unexpected end of bit stream.')
+            node = right[node] if bit else left[node]
+        if symbol[node] == NYT:
+            return bit_stream.read_bits(SYMBOL_BITS)
+        return symbol[node]
+
+    def _swap(self, a, b):
+        """
+        Exchange the subtrees at node numbers a and b (both keep their number and parent slot).
+        """
+        symbol, left, right = self.symbol, self.left, self.right
+        symbol[a], symbol[b] = symbol[b], symbol[a]
+        left[a], left[b] = left[b], left[a]
+        right[a], right[b] = right[b], right[a]
+        for node in (a, b):
+            if symbol[node] == INTERNAL:
+                self.parent[left[node]] = node
+                self.parent[right[node]] = node
+            elif symbol[node] == NYT:
+                self.nyt = node
+            else:
+                self.leaf[symbol[node]] = node
+
+    def update(self, symbol):
+        """
+        Add one occurrence of a symbol and restore the sibling property (FGK update).
+        """
+        weight = self.weight
+        parent = self.parent
+        node = self.leaf[symbol]
+        if node is None:
+            # Split NYT into an internal node with a new NYT (left) and the new leaf (right)
+            old = self.nyt
+            new_nyt, new_leaf = old - 2, old - 1
+            self.symbol[old] = INTERNAL
+            self.left[old], self.right[old] = new_nyt, new_leaf
+            parent[new_nyt] = parent[new_leaf] = old
+            self.symbol[new_nyt] = NYT
+            self.symbol[new_leaf] = symbol
+            self.leaf[symbol] = new_leaf
+            self.nyt = new_nyt
+            node = new_leaf
+        while node is not None:
+            leader = node
+            node_weight = weight[node]
+            while leader < self.root and weight[leader + 1] == node_weight:
+                leader += 1
+            if leader != node and leader != parent[node]:
+                self._swap(node, leader)
+                node = leader
+            weight[node] += 1
+            node = parent[node]
+
+
+def open_stream(path, mode):
+    """
+    Open a binary file, or standard input/output for '-'.
+    """
+    if path == '-':
+        return sys.stdin.buffer if 'r' in mode else sys.stdout.buffer
+    return open(path, mode)
+
+
+def compress(input_file, output_file):
+    """
+    Encode a binary stream in one pass with constant memory.
+
+    Each chunk is encoded as soon as it is read (``read1`` does not wait for a full chunk on pipes or sockets)
+    and the complete output bytes are handed to the output right away, so the first bytes come out before
+    the input ends. The stream is terminated by EOF_SYMBOL.
+
+    Args:
+        input_file (file object): A binary file object, e.g. sys.stdin.buffer.
+        output_file (file object): A binary file object opened for writing.
+    """
+    tree = AdaptiveHuffmanTree()
+    bit_stream = OutputBitStream(output_file)
+    write_bits = bit_stream.write_bits
+    read = getattr(input_file, 'read1', input_file.read)
+    with STATS.stage('encode'):                                 # Reading, encoding and writing are interleaved
+        chunk = read(CHUNK_SIZE)
+        while chunk:
+            for symbol in chunk:
+                write_bits(*tree.encode(symbol))
+                tree.update(symbol)
+            bit_stream.drain()
+            STATS.count('symbols', len(chunk))
+            chunk = read(CHUNK_SIZE)
+        write_bits(*tree.encode(EOF_SYMBOL))
+        bit_stream.flush()
+
+
+def decompress(input_file, output_file):
+    """
+    Decode a stream written by ``compress``, writing output whenever the input has no more buffered bits.
+
+    Args:
+        input_file (file object): A binary file object, e.g. sys.stdin.buffer.
+        output_file (file object): A binary file object opened for writing.
+    """
+    tree = AdaptiveHuffmanTree()
+    bit_stream = InputBitStream(input_file)
+    decoded = bytearray()
+    with STATS.stage('decode'):
+        while True:
+            if not bit_stream.buffered() or len(decoded) >= CHUNK_SIZE:
+                output_file.write(decoded)
+                output_file.flush()
+                STATS.count('symbols', len(decoded))
+                decoded = bytearray()
+            symbol = tree.decode(bit_stream)
+            if symbol == EOF_SYMBOL:
+                break
+            decoded.append(symbol)
+            tree.update(symbol)
+        output_file.write(decoded)
+        output_file.flush()
+    STATS.count('symbols', len(decoded))
+
+
+def main(input_file_path, output_file_path, decompress_mode=False):
+    input_file = open_stream(input_file_path, 'rb')
+    output_file = open_stream(output_file_path, 'wb')
+    try:
+        if decompress_mode:
+            decompress(input_file, output_file)
+        else:
+            compress(input_file, output_file)
+    finally:
+        if input_file_path != '-':
+            input_file.close()
+        if output_file_path != '-':
+            output_file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Single-pass adaptive Huffman coding of byte streams.')
+    parser.add_argument('--input', '-i', type=str, default='-', help='Input file path, - for standard input.')
+    parser.add_argument('--output', '-o', type=str, default='-', help='Output file path, - for standard output.')
+    parser.add_argument('--decompress', '-d', action='store_true', help='Decompress instead of compress.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.decompress)
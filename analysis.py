@@ -0,0 +1,246 @@
+import math
+import re
+from collections import Counter
+
+import vectorized
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # characters
+
+RUN_PATTERN = re.compile(r'(.)\1*', re.DOTALL)
+
+
+class SymbolStats:
+    """
+    Statistics gathered in one pass over a text: order-0 histogram, order-1 transition counts and runs.
+
+    Text can be fed in consecutive chunks with ``update``; pairs and runs spanning chunk boundaries are
+    counted as if the text had been given at once. Call ``finish`` after the last chunk to close the final run.
+    With ``histogram_only`` set, only ``total`` and ``histogram`` are gathered, for coders that need nothing else.
+    Every Counter keeps its keys in order of first occurrence, with or without NumPy.
+
+    Examples:
+        # Example usage:
+        stats = SymbolStats()
+        stats.update('aab')
+        stats.update('bba')
+        stats.finish()
+        stats.histogram    # Counter({'a': 3, 'b': 3})
+        stats.transitions  # Counter({('b', 'b'): 2, ('a', 'a'): 1, ('a', 'b'): 1, ('b', 'a'): 1})
+        stats.run_lengths  # Counter({2: 1, 3: 1, 1: 1})
+    """
+
+    def __init__(self, histogram_only=False):
+        self.histogram_only = histogram_only  # Skip the transitions and runs
+        self.total = 0                  # Number of characters
+        self.histogram = Counter()      # Character -> count
+        self.transitions = Counter()    # (previous character, character) -> count
+        self.run_lengths = Counter()    # Run length -> number of runs
+        self.run_chars = Counter()      # Character -> number of runs of that character
+        self.last = None                # Last character seen
+        self.open_run = 0               # Length of the run still open at the end of the text seen so far
+
+    def update(self, text):
+        """
+        Add the next chunk of text.
+
+        Args:
+            text (str): The chunk.
+        """
+        if not text:
+            return
+        self.total += len(text)
+        if self.histogram_only:
+            self.histogram.update(vectorized.count_histogram(text) if vectorized.np is not None else text)
+            return
+        if vectorized.np is not None:
+            histogram, transitions, run_lengths, run_chars, open_run = vectorized.count_chunk(
+                text, self.last, self.open_run)
+            self.histogram.update(histogram)
+            self.transitions.update(transitions)
+            self.run_lengths.update(run_lengths)
+            self.run_chars.update(run_chars)
+            self.last = text[-1]
+            self.open_run = open_run
+            return
+
+        self.histogram.update(text)
+        if self.last is not None:
+            self.transitions[(self.last, text[0])] += 1
+        self.transitions.update(zip(text, text[1:]))
+
+        run_lengths = self.run_lengths
+        run_chars = self.run_chars
+        runs = RUN_PATTERN.finditer(text)
+        first = next(runs)
+        char = first.group(1)
+        length = first.end()
+        if char == self.last:
+            length += self.open_run
+        elif self.open_run:
+            run_lengths[self.open_run] += 1
+            run_chars[self.last] += 1
+        for run in runs:
+            run_lengths[length] += 1
+            run_chars[char] += 1
+            char = run.group(1)
+            length = run.end() - run.start()
+        self.last = char
+        self.open_run = length
+
+    def finish(self):
+        """
+        Close the run still open at the end of the text. Further ``update`` calls start a new run.
+
+        Returns:
+            SymbolStats: self, for chaining.
+        """
+        if self.open_run:
+            self.run_lengths[self.open_run] += 1
+            self.run_chars[self.last] += 1
+            self.open_run = 0
+        return self
+
+    @property
+    def runs(self):
+        """
+        Returns:
+            int: Number of closed runs.
+        """
+        return sum(self.run_lengths.values())
+
+    def context_counts(self):
+        """
+        Returns:
+            Counter: Previous character -> number of transitions leaving it.
+        """
+        counts = Counter()
+        for (current_char, _), count in self.transitions.items():
+            counts[current_char] += count
+        return counts
+
+    def transition_matrix(self):
+        """
+        Returns:
+            dict: P(X_2|X_1) as ``{current_char: {next_char: probability}}``.
+        """
+        context_counts = self.context_counts()
+        matrix = {}
+        for (current_char, next_char), count in self.transitions.items():
+            matrix.setdefault(current_char, {})[next_char] = count / context_counts[current_char]
+        return matrix
+
+    def count_matrix(self):
+        """
+        Returns:
+            tuple: ``(alphabet, matrix)`` with the transition counts as a dense or sparse integer matrix, see
+            vectorized.count_matrix. Requires NumPy.
+        """
+        return vectorized.count_matrix(self.histogram, self.transitions)
+
+    def entropies(self):
+        """
+        Returns:
+            tuple: ``(H(X), H(X_2|X_1), H(X_1, X_2))`` in bits, computed with array math when NumPy is available.
+        """
+        if vectorized.np is not None:
+            return vectorized.order1_entropies(self.histogram, self.transitions, self.total)
+        total_pairs = sum(self.transitions.values())
+        joint_entropy = -sum(count / total_pairs * math.log2(count / total_pairs)
+                             for count in self.transitions.values())
+        return self.entropy(), self.conditional_entropy(), joint_entropy
+
+    def entropy(self):
+        """
+        Returns:
+            float: Order-0 entropy H(X) in bits per character.
+        """
+        if vectorized.np is not None:
+            return vectorized.order1_entropies(self.histogram, {}, self.total)[0]
+        total = self.total
+        return -sum(count / total * math.log2(count / total) for count in self.histogram.values())
+
+    def conditional_entropy(self):
+        """
+        Returns:
+            float: Order-1 conditional entropy H(X_2|X_1) in bits per character.
+        """
+        if vectorized.np is not None:
+            return vectorized.order1_entropies(self.histogram, self.transitions, self.total)[1]
+        conditional_entropy = 0.0
+        for current_char, next_chars in self.transition_matrix().items():
+            p_current = self.histogram[current_char] / self.total
+            for p_next in next_chars.values():
+                conditional_entropy += p_current * p_next * -math.log2(p_next)
+        return conditional_entropy
+
+
+def analyze_text(text, histogram_only=False):
+    """
+    Gather the statistics of a text held in memory.
+
+    Args:
+        text (str): The text.
+        histogram_only (bool): Only count the characters, see SymbolStats.
+
+    Returns:
+        SymbolStats: The finished statistics.
+    """
+    stats = SymbolStats(histogram_only)
+    stats.update(text)
+    return stats.finish()
+
+
+def analyze_file(input_file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Gather the statistics of a UTF-8 text file in one streaming pass.
+
+    The file is read with universal newlines, so ``\r\n`` counts as a single ``\n`` character.
+
+    Args:
+        input_file_path (str): The file to analyze.
+        chunk_size (int): Number of characters read at a time.
+
+    Returns:
+        SymbolStats: The finished statistics.
+    """
+    stats = SymbolStats()
+    with open(input_file_path, 'r', encoding='utf-8') as file:
+        chunk = file.read(chunk_size)
+        while chunk:
+            stats.update(chunk)
+            chunk = file.read(chunk_size)
+    return stats.finish()
+
+
+def byte_histogram(data):
+    """
+    Count the byte values of a bytes-like object without decoding it.
+
+    Args:
+        data (bytes-like): The raw data.
+
+    Returns:
+        dict: Byte value (int) -> count, for the values present, in increasing byte order.
+    """
+    if vectorized.np is not None:
+        counts = vectorized.np.bincount(vectorized.np.frombuffer(data, dtype=vectorized.np.uint8), minlength=256)
+        return {byte: count for byte, count in enumerate(counts.tolist()) if count}
+    return dict(sorted(Counter(data).items()))
+
+
+def utf8_boundary(data):
+    """
+    Find where to cut a buffer so that no UTF-8 sequence is split.
+
+    Args:
+        data (bytes-like): The raw data.
+
+    Returns:
+        int: The largest index not greater than len(data) that starts a character (or ends the buffer).
+    """
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:  # Last lead byte
+            need = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= need else len(data) - back
+    return len(data)
@@ -0,0 +1,335 @@
+import argparse
+from collections import Counter, namedtuple
+from functools import partial
+from io import BytesIO
+
+from analysis import analyze_text
+from bitio import InputBitStream, OutputBitStream
+from canonical import (AUTO_MAGIC, code_cost, canonical_codes, read_dense_lengths, read_varint, write_dense_lengths,
+                       write_varint)
+from compress import encode_block as encode_huffman_block, huffman_code_lengths
+from compress_2 import build_context_codes, write_context_stream
+import compress_bwt
+import compress_lz
+import decompress
+import decompress_2
+import decompress_bwt
+import decompress_lz
+from hufftable import DecodeTable
+from lz77 import DEFAULT_LEVEL, MatchFinder, expand
+from parallel import map_ordered
+from rle import extra_bits, find_runs, length_symbol, split_lengths, symbol_length
+from stats import STATS, add_arguments, reporting
+
+MAX_CODE_LENGTH = 15          # Keeps every decoder on single-level tables
+DEFAULT_BLOCK_SIZE = 1 << 20  # bytes
+
+# A block codec. estimate(stats) predicts the frame size in bits from the SymbolStats of the block (decoded
+# as Latin-1, one character per byte) without encoding it, or is None for codecs only used when forced.
+# encode(block) returns the payload, decode(payload, raw_size) the block.
+Codec = namedtuple('Codec', 'codec_id name estimate encode decode')
+
+CODECS = {}     # Codec id (stored in every block header) -> Codec
+BY_NAME = {}    # Codec name -> Codec
+
+
+def register(codec):
+    """
+    Add a codec to the registry.
+
+    Raises:
+        ValueError: If its id or name is already taken, or its id does not fit in one byte.
+    """
+    if codec.codec_id in CODECS or codec.name in BY_NAME or not 0 <= codec.codec_id < 256:
+        raise ValueError(f"Cannot register codec {codec.codec_id} ({codec.name})!")
+    CODECS[codec.codec_id] = codec
+    BY_NAME[codec.name] = codec
+    return codec
+
+
+def dense_table_bits(lengths):
+    """
+    Returns:
+        int: Size in bits of ``canonical.write_dense_lengths(lengths)``, assuming one-byte varints.
+    """
+    symbols = sorted(lengths)
+    gaps = sum(1 for previous, symbol in zip([-1] + symbols, symbols) if symbol - previous > 1)
+    return 8 * (1 + len(symbols) + 2 * gaps)
+
+
+def huffman_bits(frequencies):
+    """
+    Returns:
+        int: Payload bits of the length-limited Huffman code of a histogram, the code being built but not used.
+    """
+    return code_cost(huffman_code_lengths(frequencies, MAX_CODE_LENGTH), frequencies)
+
+
+# --- stored ---------------------------------------------------------------------------------------------------
+
+def estimate_stored(stats):
+    return 8 * stats.total
+
+
+def encode_stored(block):
+    return block
+
+
+def decode_stored(payload, raw_size):
+    return payload
+
+
+# --- order-0 Huffman over bytes (compress.encode_block with raw set) -------------------------------------------
+
+def estimate_huffman(stats):
+    lengths = huffman_code_lengths(stats.histogram, MAX_CODE_LENGTH)
+    table_bytes = 3 + max(lengths.values()) + len(lengths)          # write_code_lengths
+    return code_cost(lengths, stats.histogram) + 8 * (8 + table_bytes)
+
+
+def encode_huffman(block):
+    return encode_huffman_block(block, MAX_CODE_LENGTH, raw=True)
+
+
+def decode_huffman(payload, raw_size):
+    return decompress.decode_block(BytesIO(payload))
+
+
+# --- runs: (byte, length symbol) pairs with two Huffman tables, as in mixed_cmp_2 -------------------------------
+
+def estimate_rle(stats):
+    length_frequencies = Counter()
+    extra = 0
+    for length, count in stats.run_lengths.items():
+        symbol, bits, _ = length_symbol(length)
+        length_frequencies[symbol] += count
+        extra += bits * count
+    char_frequencies = {ord(char): count for char, count in stats.run_chars.items()}
+    table_bits = dense_table_bits(char_frequencies) + dense_table_bits(length_frequencies)
+    return huffman_bits(char_frequencies) + huffman_bits(length_frequencies) + extra + table_bits + 16
+
+
+def encode_rle(block):
+    """
+    Layout: byte code lengths and length-symbol code lengths (canonical.write_dense_lengths), varint number of
+    runs, then per run the byte code, the length-symbol code and its extra bits.
+    """
+    run_chars, run_lengths = find_runs(block.decode('latin-1'))
+    run_bytes = run_chars.encode('latin-1')
+    symbols, extra_counts, extras = split_lengths(run_lengths)
+    char_lengths = huffman_code_lengths(Counter(run_bytes), MAX_CODE_LENGTH)
+    length_lengths = huffman_code_lengths(Counter(symbols), MAX_CODE_LENGTH)
+    char_codes = canonical_codes(char_lengths)
+    length_codes = canonical_codes(length_lengths)
+
+    output_file = BytesIO()
+    write_dense_lengths(output_file, char_lengths)
+    write_dense_lengths(output_file, length_lengths)
+    write_varint(output_file, len(run_bytes))
+    bit_stream = OutputBitStream(output_file)
+    write_bits = bit_stream.write_bits
+    for byte, symbol, extra_count, extra in zip(run_bytes, symbols, extra_counts, extras):
+        write_bits(*char_codes[byte])
+        write_bits(*length_codes[symbol])
+        if extra_count:
+            write_bits(extra, extra_count)
+    bit_stream.flush()
+    return output_file.getvalue()
+
+
+def decode_rle(payload, raw_size):
+    input_file = BytesIO(payload)
+    char_table = DecodeTable(canonical_codes(read_dense_lengths(input_file)), root_bits=None)
+    length_table = DecodeTable(canonical_codes(read_dense_lengths(input_file)), root_bits=None)
+    runs = read_varint(input_file)
+    bit_stream = InputBitStream(input_file.read())
+    read_bits = bit_stream.read_bits
+    block = bytearray()
+    for _ in range(runs):
+        byte = char_table.read_symbol(bit_stream)
+        symbol = length_table.read_symbol(bit_stream)
+        bits = extra_bits(symbol)
+        block += bytes((byte,)) * symbol_length(symbol, read_bits(bits) if bits else 0)
+    return bytes(block)
+
+
+# --- order-1 context Huffman (compress_2 stream over Latin-1 text) ---------------------------------------------
+
+def estimate_context(stats):
+    successors = {}
+    for (current_char, next_char), count in stats.transitions.items():
+        successors.setdefault(current_char, {})[next_char] = count
+    payload_bits = sum(huffman_bits(counts) for counts in successors.values() if len(counts) > 1)
+    table_bytes = 1 + 2 * len(stats.histogram) + sum(2 * len(counts) for counts in successors.values())
+    return payload_bits + 8 * (table_bytes + 6)
+
+
+def encode_context(block):
+    text = block.decode('latin-1')
+    successors = {}
+    for (current_char, next_char), count in analyze_text(text).transitions.items():
+        successors.setdefault(current_char, {})[next_char] = count
+    output_file = BytesIO()
+    write_context_stream(output_file, text, build_context_codes(successors))
+    return output_file.getvalue()
+
+
+def decode_context(payload, raw_size):
+    return ''.join(''.join(symbols) for symbols in decompress_2.read_context_stream(BytesIO(payload))).encode(
+        'latin-1')
+
+
+# --- forced only: LZ77 + Huffman and BWT pipelines --------------------------------------------------------------
+
+def encode_lz(block):
+    return compress_lz.encode_block(*MatchFinder(block, DEFAULT_LEVEL).tokenize(0, len(block)))
+
+
+def decode_lz(payload, raw_size):
+    input_file = BytesIO(payload)
+    litlen_table, distance_table = decompress_lz.read_tables(input_file)
+    count = read_varint(input_file)
+    tokens = input_file.read(read_varint(input_file))
+    block = bytearray()
+    expand(block, *decompress_lz.decode_tokens(tokens, count, litlen_table, distance_table))
+    return bytes(block)
+
+
+def decode_bwt(payload, raw_size):
+    input_file = BytesIO(payload)
+    return decompress_bwt.decode_block(input_file, read_varint(input_file))
+
+
+register(Codec(0, 'stored', estimate_stored, encode_stored, decode_stored))
+register(Codec(1, 'huffman', estimate_huffman, encode_huffman, decode_huffman))
+register(Codec(2, 'rle', estimate_rle, encode_rle, decode_rle))
+register(Codec(3, 'context', estimate_context, encode_context, decode_context))
+register(Codec(4, 'lz77', None, encode_lz, decode_lz))
+register(Codec(5, 'bwt', None, compress_bwt.encode_block, decode_bwt))
+
+
+def choose_codec(stats):
+    """
+    Pick the registered codec with the smallest estimated size for a block.
+
+    Args:
+        stats (SymbolStats): Statistics of the block decoded as Latin-1.
+
+    Returns:
+        tuple: ``(codec, estimated_bits)``.
+    """
+    estimates = [(codec.estimate(stats), codec.codec_id) for codec in CODECS.values() if codec.estimate]
+    bits, codec_id = min(estimates)
+    return CODECS[codec_id], bits
+
+
+def encode_block(block, codec_name=None):
+    """
+    Encode one block with the codec chosen by ``choose_codec``, or with the named one.
+
+    Frame layout:
+        raw size     (varint)
+        codec id     (1 byte)
+        payload size (varint)
+        payload
+
+    Returns:
+        tuple: ``(frame, codec_name, estimated_bits)``, the estimate being None for a forced codec.
+    """
+    if codec_name:
+        codec, bits = BY_NAME[codec_name], None
+    else:
+        codec, bits = choose_codec(analyze_text(block.decode('latin-1')))
+    payload = codec.encode(block)
+    frame = BytesIO()
+    write_varint(frame, len(block))
+    frame.write(bytes((codec.codec_id,)))
+    write_varint(frame, len(payload))
+    frame.write(payload)
+    return frame.getvalue(), codec.name, bits
+
+
+def decode_block(input_file, raw_size):
+    """
+    Decode the rest of a frame once its raw size has been read, dispatching on the codec id.
+
+    Raises:
+        ValueError: If the codec id is unknown or the block does not decode to raw_size bytes.
+    """
+    codec_id = input_file.read(1)[0]
+    if codec_id not in CODECS:
+        raise ValueError(f"Unknown codec id {codec_id}!")
+    block = CODECS[codec_id].decode(input_file.read(read_varint(input_file)), raw_size)
+    if len(block) != raw_size:
+        raise ValueError("Block size mismatch!")
+    return block
+
+
+def compress(input_file_path, output_file_path, block_size=DEFAULT_BLOCK_SIZE, codec_name=None, workers=1):
+    """
+    Compress any file block by block, each block with its cheapest codec.
+
+    The output is ``AUTO_MAGIC`` followed by one frame per block (see encode_block) and a varint raw size of 0.
+
+    Args:
+        input_file_path (str): The file to compress, read as bytes.
+        output_file_path (str): The compressed file.
+        block_size (int): Input bytes per block.
+        codec_name (str): Use this codec for every block instead of choosing.
+        workers (int): Number of processes, 0 for one per CPU core.
+    """
+    with open(output_file_path, 'wb') as output_file:
+        output_file.write(AUTO_MAGIC)
+        encode = partial(encode_block, codec_name=codec_name)
+        with STATS.stage('encode'):                             # Reading, encoding and writing are interleaved
+            for frame, name, bits in map_ordered(encode, compress_bwt.read_blocks(input_file_path, block_size),
+                                                 workers):
+                output_file.write(frame)
+                STATS.count('blocks')
+                STATS.count(f'blocks_{name}')                   # Blocks per chosen codec
+                if bits is not None:
+                    STATS.count('estimated_bits', bits)
+        write_varint(output_file, 0)
+        STATS.count('output_bytes', output_file.tell())
+
+
+def decompress_file(input_file_path, output_file_path):
+    """
+    Raises:
+        ValueError: If the file does not start with ``AUTO_MAGIC``.
+    """
+    with open(input_file_path, 'rb') as input_file, open(output_file_path, 'wb') as output_file:
+        if input_file.read(len(AUTO_MAGIC)) != AUTO_MAGIC:
+            raise ValueError("Not an automatic codec file!")
+        with STATS.stage('decode'):
+            raw_size = read_varint(input_file)
+            while raw_size:
+                output_file.write(decode_block(input_file, raw_size))
+                STATS.count('blocks')
+                raw_size = read_varint(input_file)
+        STATS.count('output_bytes', output_file.tell())
+
+
+def main(input_file_path, output_file_path, decompress_mode=False, block_size=DEFAULT_BLOCK_SIZE, codec_name=None,
+         workers=1):
+    if decompress_mode:
+        decompress_file(input_file_path, output_file_path)
+    else:
+        compress(input_file_path, output_file_path, block_size, codec_name, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress files choosing the cheapest codec for every block.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--decompress', '-d', action='store_true', help='Decompress instead of compress.')
+    parser.add_argument('--block-size', '-b', type=int, default=DEFAULT_BLOCK_SIZE, help='Input bytes per block.')
+    parser.add_argument('--codec', choices=sorted(BY_NAME), help='Use this codec for every block.')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Number of processes encoding blocks, 0 for one per CPU core.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.decompress, args.block_size, args.codec, args.workers)
@@ -0,0 +1,377 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from analysis import analyze_file, analyze_text
+from compare import are_files_identical
+from performance_limit import compute_performance_limit
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS_SIZE = 1 << 18  # bytes per corpus
+DEFAULT_SEED = 1
+DEFAULT_TOLERANCE = 0.02       # Relative growth of the ratio reported as a regression
+DEFAULT_SPEED_TOLERANCE = 0.3  # Relative loss of throughput, or growth of peak RSS, reported as a regression
+
+# A compressor/decompressor pair run as scripts of this directory: argument lists after the script name,
+# followed by -i/-o. decompress is None for compressors without a decoder (ratio only); binary tells whether
+# the pair accepts input that is not UTF-8.
+Pair = namedtuple('Pair', 'name compress decompress binary')
+
+PAIRS = [
+    Pair('huffman', ['compress.py'], ['decompress.py'], False),
+    Pair('huffman-canonical', ['compress.py', '--canonical'], ['decompress.py'], False),
+    Pair('huffman-blocks', ['compress.py', '--block-size', '262144'], ['decompress.py'], False),
+    Pair('huffman-raw', ['compress.py', '--raw', '--max-code-length', '15'], ['decompress.py'], True),
+    Pair('shannon-fano', ['compress_sn.py'], ['decompress.py'], False),
+    Pair('context', ['compress_2.py'], ['decompress_2.py'], False),
+    Pair('rle-pairs', ['mixed_compress.py'], None, False),
+    Pair('rle', ['mixed_cmp_2.py'], ['mixed_decmp_2.py'], False),
+    Pair('adaptive', ['adaptive.py'], ['adaptive.py', '-d'], True),
+    Pair('range', ['rangecoder.py'], ['rangecoder.py', '-d'], False),
+    Pair('rans', ['rans.py'], ['rans.py', '-d'], False),
+    Pair('lz77', ['compress_lz.py'], ['decompress_lz.py'], True),
+    Pair('bwt', ['compress_bwt.py'], ['decompress_bwt.py'], True),
+    Pair('auto', ['autocodec.py'], ['autocodec.py', '-d'], True),
+]
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def text_of_size(chars, size):
+    """
+    Returns:
+        bytes: The UTF-8 encoding of the characters, cut to at most size bytes on a character boundary.
+    """
+    data = ''.join(chars).encode('utf-8')[:size]
+    return data.decode('utf-8', errors='ignore').encode('utf-8')
+
+
+def skewed_corpus(size, rng):
+    """ASCII letters, digits, punctuation and newlines drawn independently from a Zipf distribution."""
+    alphabet = 'etaoin shrdl\nucmfwypvbgkjqxzETAOINSHRDLUCMFWYPVBGKJQXZ0123456789.,;:!?-'
+    return text_of_size(rng.choices(alphabet, zipf_weights(len(alphabet)), k=size), size)
+
+
+def runs_corpus(size, rng):
+    """Runs of a few characters with geometrically distributed lengths (mean 32)."""
+    chars = []
+    length = 0
+    while length < size:
+        run = min(size - length, int(rng.expovariate(1 / 32)) + 1)
+        chars.append(rng.choice('ab01 \n-=') * run)
+        length += run
+    return text_of_size(chars, size)
+
+
+def cjk_corpus(size, rng):
+    """CJK ideographs from a Zipf distribution over 3000 characters, with full-width punctuation (3 bytes each)."""
+    alphabet = [chr(0x4E00 + index) for index in rng.sample(range(0x5000), 3000)]
+    sentence_ends = '，。、；：？！'
+    chars = rng.choices(alphabet, zipf_weights(len(alphabet)), k=size // 3)
+    for position in range(0, len(chars), 12):
+        chars[position] = rng.choice(sentence_ends) if position % 120 else '\n'
+    return text_of_size(chars, size)
+
+
+def logs_corpus(size, rng):
+    """Log lines built from a few templates: timestamps, levels, paths and numbers, like application logs."""
+    templates = ['{time} INFO  request {id} GET /api/v1/users/{user} 200 {ms}ms\n',
+                 '{time} INFO  request {id} POST /api/v1/orders 201 {ms}ms\n',
+                 '{time} WARN  cache miss for key user:{user}:profile\n',
+                 '{time} ERROR worker-{worker} timeout after {ms}ms on /var/lib/app/queue/{id}.job\n',
+                 '{time} DEBUG gc pause {ms}ms heap {heap}MB\n']
+    lines = []
+    length = 0
+    clock = 1700000000.0
+    while length < size:
+        clock += rng.expovariate(20)
+        stamp = datetime.fromtimestamp(clock, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        line = rng.choices(templates, [50, 20, 15, 5, 10])[0].format(
+            time=stamp, id=rng.randrange(1 << 24), user=rng.randrange(5000), ms=int(rng.expovariate(1 / 40)),
+            worker=rng.randrange(16), heap=rng.randrange(256, 4096))
+        lines.append(line)
+        length += len(line)
+    return text_of_size(lines, size)
+
+
+def binary_corpus(size, rng):
+    """Fixed-size records (counters, small integers, zero padding, a float) mixed with random bytes."""
+    data = bytearray()
+    counter = 0
+    while len(data) < size:
+        if rng.random() < 0.1:
+            data += rng.randbytes(rng.randrange(16, 256))
+            continue
+        counter += rng.randrange(1, 4)
+        data += counter.to_bytes(4, 'little') + rng.randrange(100).to_bytes(2, 'little') + bytes(6)
+        data += int(rng.gauss(1 << 15, 1000)).to_bytes(4, 'little', signed=True)
+    return bytes(data[:size])
+
+
+CORPORA = {
+    'skewed': skewed_corpus,
+    'runs': runs_corpus,
+    'cjk': cjk_corpus,
+    'logs': logs_corpus,
+    'binary': binary_corpus,
+}
+
+
+def generate_corpora(directory, size=DEFAULT_CORPUS_SIZE, names=None, seed=DEFAULT_SEED):
+    """
+    Write the synthetic corpora; the same size and seed always give the same files.
+
+    Args:
+        directory (str): Where to write ``<name>.dat`` files.
+        size (int): Bytes per corpus (text corpora may be a few bytes shorter, cut on a character boundary).
+        names (list): Corpora to generate, all of CORPORA by default.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Corpus name -> file path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name in names or CORPORA:
+        path = os.path.join(directory, f'{name}.dat')
+        with open(path, 'wb') as file:
+            file.write(CORPORA[name](size, random.Random(f'{seed}:{name}')))
+        paths[name] = path
+    return paths
+
+
+def is_text(path):
+    with open(path, 'rb') as file:
+        try:
+            file.read().decode('utf-8')
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def performance_bound(path):
+    """
+    The ``performance_limit`` bound of a file: its order-1 conditional entropy times its number of symbols.
+    Files that are not UTF-8 are measured over bytes. Codecs modelling longer contexts (LZ77, BWT) can go below
+    it, which shows as a negative gap.
+
+    Returns:
+        float: The bound in bytes.
+    """
+    if is_text(path):
+        stats = analyze_file(path)
+    else:
+        with open(path, 'rb') as file:
+            stats = analyze_text(file.read().decode('latin-1'))
+    if stats.total < 2:
+        return 0.0
+    return compute_performance_limit(path, stats) * stats.total / 8
+
+
+def run_script(arguments, input_file_path, output_file_path):
+    """
+    Run one script of this directory in a child process, with ``--stats json``.
+
+    Returns:
+        tuple: ``(seconds, peak_rss_kb)``: the ``total`` stage reported by the script, which leaves out
+        interpreter startup and imports, and its ``peak_rss_kb`` counter. Where the script cannot measure its
+        peak RSS, the child's ru_maxrss (in KB on Linux) is used; it is never below the RSS of this process.
+
+    Raises:
+        subprocess.CalledProcessError: If the script fails or does not report its timings.
+    """
+    command = [sys.executable, os.path.join(SCRIPT_DIR, arguments[0]), *arguments[1:],
+               '-i', input_file_path, '-o', output_file_path, '--stats', 'json']
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=errors, cwd=SCRIPT_DIR)
+        _, status, usage = os.wait4(process.pid, 0)                  # Resource usage of this child only
+        process.returncode = os.waitstatus_to_exitcode(status)
+        errors.seek(0)
+        stderr = errors.read().decode('utf-8', errors='replace')
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr)
+    lines = stderr.strip().splitlines()
+    try:
+        report = json.loads(lines[-1])
+        seconds = report['timers']['total']
+    except (IndexError, ValueError, KeyError) as error:
+        raise subprocess.CalledProcessError(0, command, stderr=f'{stderr}\nNo --stats json report ({error!r})')
+    return seconds, report['counters'].get('peak_rss_kb', usage.ru_maxrss)
+
+
+def interpreter_rss():
+    """
+    Returns:
+        int: Peak RSS in KB of a child interpreter that only loads ``stats``, subtracted from the measured peaks.
+    """
+    output = subprocess.run([sys.executable, '-c', 'from stats import peak_rss_kb; print(peak_rss_kb())'],
+                            capture_output=True, text=True, cwd=SCRIPT_DIR, check=True).stdout.strip()
+    return int(output) if output != 'None' else 0
+
+
+def benchmark_pair(pair, corpus, input_file_path, work_dir, bound=None, repeat=1, base_rss=0):
+    """
+    Compress and decompress one corpus with one pair, keeping the fastest of ``repeat`` runs.
+
+    Throughput is measured over the scripts' own ``total`` stage. Peak RSS is reported above base_rss, the
+    peak of a bare interpreter (see interpreter_rss).
+
+    Returns:
+        dict: The measurements; ``error`` is set instead when a script fails.
+    """
+    size = os.path.getsize(input_file_path)
+    compressed_path = os.path.join(work_dir, f'{corpus}.{pair.name}')
+    restored_path = compressed_path + '.out'
+    result = {'codec': pair.name, 'corpus': corpus, 'size': size}
+    try:
+        compress_runs = [run_script(pair.compress, input_file_path, compressed_path) for _ in range(repeat)]
+        compressed = os.path.getsize(compressed_path)
+        result.update(compressed=compressed, ratio=compressed / size if size else 0.0,
+                      bits_per_byte=compressed * 8 / size if size else 0.0,
+                      compress_mb_s=size / max(min(seconds for seconds, _ in compress_runs), 1e-6) / 1e6,
+                      compress_rss_kb=max(rss for _, rss in compress_runs) - base_rss)
+        if bound:
+            result.update(bound=bound, bound_gap=compressed / bound - 1)
+        if pair.decompress:
+            decompress_runs = [run_script(pair.decompress, compressed_path, restored_path) for _ in range(repeat)]
+            result.update(decompress_mb_s=size / max(min(seconds for seconds, _ in decompress_runs), 1e-6) / 1e6,
+                          decompress_rss_kb=max(rss for _, rss in decompress_runs) - base_rss,
+                          roundtrip=are_files_identical(input_file_path, restored_path))
+    except subprocess.CalledProcessError as error:
+        lines = error.stderr.strip().splitlines()
+        result['error'] = lines[-1] if lines else f'exit status {error.returncode}'
+    finally:
+        for path in (compressed_path, restored_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return result
+
+
+def run_benchmarks(work_dir, size=DEFAULT_CORPUS_SIZE, codecs=None, corpora=None, seed=DEFAULT_SEED, repeat=1):
+    """
+    Generate the corpora and benchmark every selected pair on every corpus it accepts.
+
+    Returns:
+        dict: The run settings and a ``results`` list of benchmark_pair dicts.
+    """
+    paths = generate_corpora(work_dir, size, corpora, seed)
+    bounds = {corpus: performance_bound(path) for corpus, path in paths.items()}
+    base_rss = interpreter_rss()
+    results = []
+    for corpus, path in paths.items():
+        text = is_text(path)
+        for pair in PAIRS:
+            if codecs and pair.name not in codecs or not (text or pair.binary):
+                continue
+            result = benchmark_pair(pair, corpus, path, work_dir, bounds[corpus], repeat, base_rss)
+            print(format_result(result), flush=True)
+            results.append(result)
+    return {'size': size, 'seed': seed, 'repeat': repeat, 'python': platform.python_version(),
+            'platform': platform.platform(), 'date': datetime.now().isoformat(timespec='seconds'),
+            'interpreter_rss_kb': base_rss, 'results': results}
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"{result['codec']:<18} {result['corpus']:<7} ERROR {result['error']}"
+    line = (f"{result['codec']:<18} {result['corpus']:<7} ratio {result['ratio']:7.4f} "
+            f"comp {result['compress_mb_s']:6.2f} MB/s {result['compress_rss_kb'] / 1024:6.1f} MB")
+    if 'decompress_mb_s' in result:
+        line += f"  decomp {result['decompress_mb_s']:6.2f} MB/s {result['decompress_rss_kb'] / 1024:6.1f} MB"
+        line += '' if result['roundtrip'] else '  MISMATCH'
+    if 'bound_gap' in result:
+        line += f"  bound gap {result['bound_gap']:+.1%}"
+    return line
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE, speed_tolerance=DEFAULT_SPEED_TOLERANCE):
+    """
+    Compare a run with a stored baseline run, codec by codec and corpus by corpus.
+
+    A regression is a failure or round-trip mismatch that the baseline did not have, a ratio more than
+    ``tolerance`` (relative) above the baseline, or a throughput more than ``speed_tolerance`` below it / a
+    peak RSS more than ``speed_tolerance`` above it. Runs with a different corpus size or seed are not
+    comparable.
+
+    Returns:
+        list: One message per regression.
+
+    Raises:
+        ValueError: If the runs used different corpora.
+    """
+    if (results['size'], results['seed']) != (baseline['size'], baseline['seed']):
+        raise ValueError("The baseline was run on different corpora (size or seed)!")
+    previous = {(result['codec'], result['corpus']): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        key = (result['codec'], result['corpus'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        name = f"{key[0]} on {key[1]}"
+        if 'error' in result or not result.get('roundtrip', True):
+            if 'error' not in old and old.get('roundtrip', True):
+                regressions.append(f"{name}: {result.get('error', 'round trip mismatch')}")
+            continue
+        if 'error' in old:
+            continue
+        if result['ratio'] > old['ratio'] * (1 + tolerance):
+            regressions.append(f"{name}: ratio {old['ratio']:.4f} -> {result['ratio']:.4f}")
+        for metric in ('compress_mb_s', 'decompress_mb_s'):
+            if metric in result and metric in old and result[metric] < old[metric] * (1 - speed_tolerance):
+                regressions.append(f"{name}: {metric} {old[metric]:.2f} -> {result[metric]:.2f}")
+        for metric in ('compress_rss_kb', 'decompress_rss_kb'):
+            if metric in result and metric in old and result[metric] > old[metric] * (1 + speed_tolerance):
+                regressions.append(f"{name}: {metric} {old[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(work_dir, output_file_path=None, size=DEFAULT_CORPUS_SIZE, codecs=None, corpora=None, seed=DEFAULT_SEED,
+         repeat=1, baseline_path=None, tolerance=DEFAULT_TOLERANCE, speed_tolerance=DEFAULT_SPEED_TOLERANCE):
+    """
+    Returns:
+        int: Exit status, 1 if regressions against the baseline were found.
+    """
+    results = run_benchmarks(work_dir, size, codecs, corpora, seed, repeat)
+    if output_file_path:
+        with open(output_file_path, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if not baseline_path:
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = compare_results(results, baseline, tolerance, speed_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regression(s) against {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark every compressor/decompressor pair on synthetic corpora.')
+    parser.add_argument('--work-dir', type=str, default='bench', help='Directory for the corpora and temporary files.')
+    parser.add_argument('--output', '-o', type=str, help='Write the results to this JSON file.')
+    parser.add_argument('--size', '-s', type=int, default=DEFAULT_CORPUS_SIZE, help='Bytes per corpus.')
+    parser.add_argument('--codecs', nargs='+', choices=[pair.name for pair in PAIRS], help='Pairs to run (default: all).')
+    parser.add_argument('--corpora', nargs='+', choices=sorted(CORPORA), help='Corpora to use (default: all).')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Random seed of the corpus generator.')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per measurement; the fastest is kept.')
+    parser.add_argument('--baseline', type=str, help='JSON results of an earlier run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Relative ratio growth reported as a regression.')
+    parser.add_argument('--speed-tolerance', type=float, default=DEFAULT_SPEED_TOLERANCE,
+                        help='Relative throughput loss or peak-RSS growth reported as a regression.')
+
+    args = parser.parse_args()
+
+    sys.exit(main(args.work_dir, args.output, args.size, args.codecs, args.corpora, args.seed, args.repeat,
+                  args.baseline, args.tolerance, args.speed_tolerance))
@@ -9,16 +9,21 @@ class OutputBitStream(BitStreamBase):
     """
     Write bits to a binary file.
 
+    Bits are collected in an integer accumulator and complete bytes are moved to an internal buffer, which is
+    written to the file in chunks of ``BUFFER_SIZE`` bytes.
+
     Examples:
         # Example usage:
         with open("output.bin", "wb") as file:
             bit_stream = OutputBitStream(file)
-            bit_stream.write_bits(1)
-            bit_stream.write_bits(0)
-            bit_stream.write_bits(1)
-            # Continue writing other bits...
+            bit_stream.write(1)
+            bit_stream.write(0)
+            bit_stream.write_bits(0b101, 3)
+            # Continue writing other bits or whole codes...
             bit_stream.flush()  # Don't forget to flush at the end to write remaining bits to the file.
     """
+    BUFFER_SIZE = 1 << 16
+    ACC_BITS = 64
 
     def __init__(self, output_file):
         """
@@ -30,8 +35,9 @@ class OutputBitStream(BitStreamBase):
         Raise:
             TypeError: If the output_file is not a BytesIO object or a file object opened in 'wb' mode.
         """
-        self._buffer = bytearray(1)
-        self._bit_mask = self.INIT_BIT_MASK
+        self._acc = 0
+        self._acc_bits = 0
+        self._buffer = bytearray()
         if isinstance(output_file, BytesIO) or output_file.mode == 'wb':
             self._output_file = output_file
         else:
@@ -39,7 +45,7 @@ class OutputBitStream(BitStreamBase):
 
     def write(self, bit):
         """
-        Write a single bit to the _buffer and then write it to the file when the _buffer is full (8 bits).
+        Write a single bit.
 
         Args:
            bit (int): The bit to write (0 or 1).
@@ -49,30 +55,74 @@ class OutputBitStream(BitStreamBase):
         """
         if bit != 0 and bit != 1:
             raise ValueError("Input value must be 0 or 1!")
-        bit_mask = self._bit_mask
-        if bit:
-            self._buffer[0] |= bit_mask
-        bit_mask >>= 1
-        if bit_mask == 0:
+        self.write_bits(bit, 1)
+
+    def write_bits(self, value, nbits):
+        """
+        Write the ``nbits`` low bits of ``value``, most significant bit first.
+
+        Args:
+            value (int): The bits to write, e.g. an integer Huffman code.
+            nbits (int): Number of bits to write (the code length).
+
+        Raises:
+            ValueError: If value does not fit in nbits bits.
+        """
+        if value >> nbits:
+            raise ValueError("Input value does not fit in the given number of bits!")
+        acc = (self._acc << nbits) | value
+        acc_bits = self._acc_bits + nbits
+        if acc_bits >= self.ACC_BITS:
+            rest = acc_bits & 7
+            self._buffer += (acc >> rest).to_bytes(acc_bits >> 3, byteorder='big')
+            acc &= (1 << rest) - 1
+            acc_bits = rest
+            if len(self._buffer) >= self.BUFFER_SIZE:
+                self._output_file.write(self._buffer)
+                self._buffer = bytearray()
+        self._acc = acc
+        self._acc_bits = acc_bits
+
+    def drain(self):
+        """
+        Write every complete byte to the file without padding the pending bits, and flush the file if it can.
+
+        Used by streaming encoders to hand output downstream (e.g. to a pipe) before the stream ends.
+        """
+        acc_bits = self._acc_bits
+        if acc_bits >= 8:
+            rest = acc_bits & 7
+            self._buffer += (self._acc >> rest).to_bytes(acc_bits >> 3, byteorder='big')
+            self._acc &= (1 << rest) - 1
+            self._acc_bits = rest
+        if self._buffer:
             self._output_file.write(self._buffer)
-            self._buffer = bytearray(1)
-            self._bit_mask = OutputBitStream.INIT_BIT_MASK
-        else:
-            self._bit_mask = bit_mask
+            self._buffer = bytearray()
+        if hasattr(self._output_file, 'flush'):
+            self._output_file.flush()
 
     def flush(self):
         """
-        Flush the remaining bits (is not full of 8 bits) in the _buffer to the binary file.
+        Flush the buffered bytes and the remaining bits (padded with 0 up to a whole byte) to the binary file.
         """
-        if self._bit_mask != 0:
+        acc_bits = self._acc_bits
+        if acc_bits:
+            pad = -acc_bits & 7
+            self._buffer += (self._acc << pad).to_bytes((acc_bits + pad) >> 3, byteorder='big')
+            self._acc = 0
+            self._acc_bits = 0
+        if self._buffer:
             self._output_file.write(self._buffer)
-            self._buffer = bytearray(1)
-            self._bit_mask = OutputBitStream.INIT_BIT_MASK
+            self._buffer = bytearray()
 
 
 class InputBitStream(BitStreamBase):
     """
-    Read a stream of bits from a binary file.
+    Read a stream of bits from a binary file or an in-memory buffer.
+
+    Bytes are fetched from the file in chunks of ``CHUNK_SIZE`` (or taken directly from a bytes-like buffer)
+    and kept in an integer accumulator, so whole codewords can be peeked and consumed in one call. Positions
+    reported by ``tell`` and accepted by ``seek`` are in bits, relative to where the stream started.
 
     Examples:
         # Example usage:
@@ -82,41 +132,215 @@ class InputBitStream(BitStreamBase):
             while bit is not None:
                 # Process bit
                 bit = bit_stream.read()
+
+        # Or whole codes at once:
+        bit_stream = InputBitStream(b'\xa5')
+        bit_stream.peek_bits(3)  # 0b101, nothing consumed
+        bit_stream.read_bits(4)  # 0b1010
+        bit_stream.skip_bits(2)
+        bit_stream.tell()        # 6
     """
+    CHUNK_SIZE = 1 << 16
 
     def __init__(self, input_file):
         """
         Initializes the InputBitStream instance.
 
         Args:
-            input_file (file object): The input file object.
+            input_file (file object or bytes-like): The input file object, or a bytes/bytearray/memoryview buffer.
 
         Raises:
-            TypeError: If the input_file_path is not a BytesIO object or a file object opened in 'rb' mode.
+            TypeError: If the input_file is not a bytes-like buffer, a BytesIO object or a file object opened in 'rb' mode.
             EOFError:  If the file is empty.
         """
-        if isinstance(input_file, BytesIO) or input_file.mode == 'rb':
+        if isinstance(input_file, (bytes, bytearray, memoryview)):
+            self._input_file = None
+            self._origin = 0
+            self._data = memoryview(input_file)
+        elif isinstance(input_file, BytesIO) or input_file.mode == 'rb':
             self._input_file = input_file
+            # read1 returns what is available instead of waiting for a full chunk (pipes, sockets)
+            self._read = getattr(input_file, 'read1', input_file.read)
+            try:
+                self._origin = input_file.tell()
+            except OSError:
+                self._origin = None  # Not seekable, e.g. a pipe
+            self._data = self._read(self.CHUNK_SIZE)
         else:
             raise TypeError
-        self._buffer = input_file.read(1)
-        if not self._buffer:
+        if not self._data:
             raise EOFError('The file is empty.')
-        self._bit_mask = self.INIT_BIT_MASK
+        self._data_start = 0  # Byte offset of self._data in the stream
+        self._pos = 0         # Next byte of self._data to move into the accumulator
+        self._acc = 0
+        self._acc_bits = 0
+
+    def _next_chunk(self):
+        """
+        Replace the exhausted buffer by the next chunk of the file.
+
+        Returns:
+            bool: False if there is no more data.
+        """
+        if self._input_file is None:
+            return False
+        chunk = self._read(self.CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._data_start += len(self._data)
+        self._data = chunk
+        self._pos = 0
+        return True
+
+    def _fill(self, nbits):
+        """
+        Load bytes into the accumulator until it holds at least nbits bits or the stream ends.
+
+        Returns:
+            bool: True if nbits bits are available.
+        """
+        acc = self._acc
+        acc_bits = self._acc_bits
+        while acc_bits < nbits:
+            if self._pos >= len(self._data) and not self._next_chunk():
+                break
+            data = self._data
+            pos = self._pos
+            take = min(len(data) - pos, 8)
+            acc = (acc << (take << 3)) | int.from_bytes(data[pos:pos + take], byteorder='big')
+            acc_bits += take << 3
+            self._pos = pos + take
+        self._acc = acc
+        self._acc_bits = acc_bits
+        return acc_bits >= nbits
 
     def read(self):
         """
         Reads the next bit from the binary file.
 
         Returns:
-            int: The next bit read from the file (0 or 1)
-        """
-        bit_mask = self._bit_mask
-        bit = 0 if self._buffer[0] & bit_mask == 0 else 1
-        bit_mask >>= 1
-        if bit_mask == 0:
-            self._buffer = self._input_file.read(1)
-            self._bit_mask = self.INIT_BIT_MASK
-        else:
-            self._bit_mask = bit_mask
+            int: The next bit read from the file (0 or 1), or None at the end of the stream.
+        """
+        if not self._acc_bits and not self._fill(1):
+            return None
+        self._acc_bits -= 1
+        bit = (self._acc >> self._acc_bits) & 1
+        self._acc &= (1 << self._acc_bits) - 1
         return bit
+
+    def peek_bits(self, nbits):
+        """
+        Return the next nbits bits without consuming them.
+
+        Past the end of the stream the missing bits read as 0, so a table-driven decoder can always index with a
+        fixed number of bits; use ``eof`` or ``read_bits`` to detect the actual end.
+
+        Args:
+            nbits (int): Number of bits to look at.
+
+        Returns:
+            int: The bits, most significant first.
+        """
+        if self._acc_bits < nbits:
+            self._fill(nbits)
+        acc_bits = self._acc_bits
+        if acc_bits >= nbits:
+            return (self._acc >> (acc_bits - nbits)) & ((1 << nbits) - 1)
+        return self._acc << (nbits - acc_bits)
+
+    def skip_bits(self, nbits):
+        """
+        Consume nbits bits.
+
+        Args:
+            nbits (int): Number of bits to skip.
+
+        Raises:
+            EOFError: If the stream ends before nbits bits.
+        """
+        if nbits > self._acc_bits:
+            nbits -= self._acc_bits
+            self._acc = 0
+            self._acc_bits = 0
+            skip_bytes = nbits >> 3
+            while skip_bytes > len(self._data) - self._pos:
+                skip_bytes -= len(self._data) - self._pos
+                self._pos = len(self._data)
+                if not self._next_chunk():
+                    raise EOFError('Unexpected end of bit stream.')
+            self._pos += skip_bytes
+            nbits &= 7
+            if not self._fill(nbits):
+                raise EOFError('Unexpected end of bit stream.')
+        self._acc_bits -= nbits
+        self._acc &= (1 << self._acc_bits) - 1
+
+    def read_bits(self, nbits):
+        """
+        Read and consume the next nbits bits.
+
+        Args:
+            nbits (int): Number of bits to read.
+
+        Returns:
+            int: The bits, most significant first.
+
+        Raises:
+            EOFError: If the stream ends before nbits bits.
+        """
+        if self._acc_bits < nbits and not self._fill(nbits):
+            raise EOFError('Unexpected end of bit stream.')
+        self._acc_bits -= nbits
+        value = self._acc >> self._acc_bits
+        self._acc &= (1 << self._acc_bits) - 1
+        return value
+
+    def buffered(self):
+        """
+        Returns:
+            int: Number of bits that can be consumed without reading from the file again.
+        """
+        return self._acc_bits + ((len(self._data) - self._pos) << 3)
+
+    def eof(self):
+        """
+        Check whether all bits of the stream have been consumed.
+
+        Returns:
+            bool: True at the end of the stream.
+        """
+        return not self._acc_bits and not self._fill(1)
+
+    def tell(self):
+        """
+        Returns:
+            int: Number of bits consumed since the start of the stream.
+        """
+        return ((self._data_start + self._pos) << 3) - self._acc_bits
+
+    def seek(self, bit_position):
+        """
+        Move to an absolute bit position.
+
+        Args:
+            bit_position (int): Bits from the start of the stream.
+
+        Raises:
+            OSError: If the underlying file is not seekable, or the position is past the end of an in-memory buffer.
+        """
+        byte_position = bit_position >> 3
+        self._acc = 0
+        self._acc_bits = 0
+        if self._data_start <= byte_position <= self._data_start + len(self._data):
+            self._pos = byte_position - self._data_start
+        elif self._input_file is None:
+            raise OSError('The position is outside the buffer.')
+        elif self._origin is None:
+            raise OSError('The stream is not seekable.')
+        else:
+            self._input_file.seek(self._origin + byte_position)
+            self._data_start = byte_position
+            self._data = self._read(self.CHUNK_SIZE)
+            self._pos = 0
+        if bit_position & 7:
+            self.skip_bits(bit_position & 7)
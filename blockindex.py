@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+INDEX_MAGIC = b'HIDX'
+LINE_INDEX_MAGIC = b'HIDL'
+ENTRY_SIZE = 12  # frame offset (8 bytes) + raw size (4 bytes)
+LINE_ENTRY_SIZE = 16  # frame offset (8 bytes) + raw size (4 bytes) + newline count (4 bytes)
+FOOTER_SIZE = 12  # entry count (8 bytes) + magic
+
+# One block of a block-framed file. raw_offset and line_offset are the number of decompressed bytes and of
+# newlines before the block; line_offset and newlines are None for tables written without newline counts.
+BlockEntry = namedtuple('BlockEntry', 'frame_offset raw_offset raw_size line_offset newlines')
+
+
+def write_index(output_file, entries):
+    """
+    Append a seek table to a block-framed file.
+
+    Layout:
+        entries: frame offset (8 bytes), raw size (4 bytes) and newline count (4 bytes) of every block, in order
+        entry count (8 bytes)
+        LINE_INDEX_MAGIC (4 bytes)
+
+    The table sits at the end of the file so it can be written after the last block without buffering the
+    output, and found by reading the fixed-size footer.
+
+    Args:
+        output_file (file object): A binary file object positioned after the terminating frame.
+        entries (list): ``(frame_offset, raw_size, newlines)`` triples, frame offsets being absolute file positions.
+    """
+    table = bytearray()
+    for frame_offset, raw_size, newlines in entries:
+        table += frame_offset.to_bytes(8, byteorder='big')
+        table += raw_size.to_bytes(4, byteorder='big')
+        table += newlines.to_bytes(4, byteorder='big')
+    table += len(entries).to_bytes(8, byteorder='big')
+    table += LINE_INDEX_MAGIC
+    output_file.write(table)
+
+
+def read_index(input_file):
+    """
+    Read the seek table of a block-framed file.
+
+    Args:
+        input_file (file object): A seekable binary file object. Its position is changed.
+
+    Returns:
+        list: A BlockEntry for every block; None if the file has no seek table.
+    """
+    file_size = input_file.seek(0, 2)
+    if file_size < FOOTER_SIZE:
+        return None
+    input_file.seek(file_size - FOOTER_SIZE)
+    footer = input_file.read(FOOTER_SIZE)
+    if footer[8:] == LINE_INDEX_MAGIC:
+        entry_size = LINE_ENTRY_SIZE
+    elif footer[8:] == INDEX_MAGIC:
+        entry_size = ENTRY_SIZE
+    else:
+        return None
+    count = int.from_bytes(footer[:8], byteorder='big')
+    input_file.seek(file_size - FOOTER_SIZE - count * entry_size)
+    table = input_file.read(count * entry_size)
+
+    entries = []
+    raw_offset = 0
+    line_offset = 0 if entry_size == LINE_ENTRY_SIZE else None
+    for start in range(0, len(table), entry_size):
+        frame_offset = int.from_bytes(table[start:start + 8], byteorder='big')
+        raw_size = int.from_bytes(table[start + 8:start + 12], byteorder='big')
+        newlines = None
+        if line_offset is not None:
+            newlines = int.from_bytes(table[start + 12:start + 16], byteorder='big')
+        entries.append(BlockEntry(frame_offset, raw_offset, raw_size, line_offset, newlines))
+        raw_offset += raw_size
+        if line_offset is not None:
+            line_offset += newlines
+    return entries
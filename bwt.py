@@ -0,0 +1,195 @@
+from array import array
+
+
+def suffix_array(s, upper):
+    """
+    Sort the suffixes of an integer sequence in linear time with SA-IS (induced sorting).
+
+    Suffixes are classified as S-type (smaller than the next suffix) or L-type. The leftmost S-type positions
+    (LMS) are placed at the ends of their buckets, the L-type and S-type suffixes are induced from them in two
+    scans, and the order of the LMS substrings found this way names a reduced string whose suffix array, computed
+    recursively, gives the final order of the LMS suffixes for one more induction. A suffix that is a prefix of
+    another sorts first, as if the sequence ended with a unique smallest sentinel.
+
+    Args:
+        s (sequence): Integers in range(upper + 1).
+        upper (int): Largest possible value of s.
+
+    Returns:
+        list: Start positions of the suffixes in sorted order.
+
+    Examples:
+        # Example usage:
+        suffix_array(b'banana', 255)  # [5, 3, 1, 0, 4, 2]
+    """
+    n = len(s)
+    if n < 2:
+        return list(range(n))
+    if n == 2:
+        return [0, 1] if s[0] < s[1] else [1, 0]
+
+    is_s = [False] * n                                  # S-type: suffix i < suffix i + 1
+    for i in range(n - 2, -1, -1):
+        is_s[i] = is_s[i + 1] if s[i] == s[i + 1] else s[i] < s[i + 1]
+
+    # Bucket boundaries: sum_l[c] is where the L-type suffixes starting with c begin, sum_s[c] the S-type ones
+    sum_l = [0] * (upper + 2)
+    sum_s = [0] * (upper + 2)
+    for value, s_type in zip(s, is_s):
+        if s_type:
+            sum_l[value + 1] += 1
+        else:
+            sum_s[value] += 1
+    for value in range(upper + 1):
+        sum_s[value] += sum_l[value]
+        sum_l[value + 1] += sum_s[value]
+
+    sa = [-1] * n
+
+    def induce(lms):
+        sa[:] = [-1] * n
+        bucket = sum_s[:]
+        for position in lms:
+            sa[bucket[s[position]]] = position
+            bucket[s[position]] += 1
+        bucket = sum_l[:]
+        sa[bucket[s[n - 1]]] = n - 1
+        bucket[s[n - 1]] += 1
+        for index in range(n):
+            position = sa[index] - 1
+            if position >= 0 and not is_s[position]:
+                sa[bucket[s[position]]] = position
+                bucket[s[position]] += 1
+        bucket = sum_l[:]
+        for index in range(n - 1, -1, -1):
+            position = sa[index] - 1
+            if position >= 0 and is_s[position]:
+                bucket[s[position] + 1] -= 1
+                sa[bucket[s[position] + 1]] = position
+
+    lms = [i for i in range(1, n) if is_s[i] and not is_s[i - 1]]
+    lms_index = [-1] * n
+    for index, position in enumerate(lms):
+        lms_index[position] = index
+    induce(lms)
+
+    m = len(lms)
+    if m:
+        # Name the LMS substrings in their induced order; equal substrings get equal names
+        sorted_lms = [position for position in sa if lms_index[position] >= 0]
+        reduced = [0] * m
+        name = 0
+        for previous, current in zip(sorted_lms, sorted_lms[1:]):
+            end_previous = lms[lms_index[previous] + 1] if lms_index[previous] + 1 < m else n
+            end_current = lms[lms_index[current] + 1] if lms_index[current] + 1 < m else n
+            same = end_previous - previous == end_current - current
+            if same:
+                left, right = previous, current
+                while left < end_previous and s[left] == s[right]:
+                    left += 1
+                    right += 1
+                same = max(left, right) < n and s[left] == s[right]
+            if not same:
+                name += 1
+            reduced[lms_index[current]] = name
+        reduced_sa = suffix_array(reduced, name)
+        induce([lms[index] for index in reduced_sa])
+    return sa
+
+
+def transform(block):
+    """
+    Burrows-Wheeler transform of a block, built from its suffix array.
+
+    The rotations of ``block`` followed by a sentinel smaller than every byte are sorted; the last column is
+    returned without the sentinel, whose row is returned as ``primary``.
+
+    Args:
+        block (bytes): The data, not empty.
+
+    Returns:
+        tuple: ``(last_column, primary)``: bytes of the same length as block and the sentinel row (>= 1).
+
+    Examples:
+        # Example usage:
+        transform(b'banana')  # (b'annbaa', 4)
+    """
+    sa = suffix_array(block, 255)
+    last_column = bytearray([block[-1]])
+    last_column += bytes(block[position - 1] for position in sa if position)
+    return bytes(last_column), sa.index(0) + 1
+
+
+def inverse_transform(last_column, primary):
+    """
+    Inverse of ``transform``, following the last-to-first mapping from the sentinel row backwards.
+
+    Args:
+        last_column (bytes): The transformed block.
+        primary (int): The sentinel row returned by ``transform``.
+
+    Returns:
+        bytes: The original block.
+    """
+    n = len(last_column)
+    counts = [last_column.count(byte) for byte in range(256)]
+    starts = [0] * 256
+    start = 1                                           # Row 0 is the sentinel suffix
+    for byte in range(256):
+        starts[byte] = start
+        start += counts[byte]
+    lf = array('L', [0]) * (n + 1)                    # Row -> row of the suffix one byte longer
+    for row in range(n):
+        byte = last_column[row]
+        lf[row + (row >= primary)] = starts[byte]
+        starts[byte] += 1
+    block = bytearray(n)
+    row = 0
+    for position in range(n - 1, -1, -1):
+        block[position] = last_column[row - (row > primary)]
+        row = lf[row]
+    return bytes(block)
+
+
+def move_to_front(data):
+    """
+    Replace every byte by its rank in a list of recently used bytes, then move it to the front.
+
+    After ``transform``, repeated bytes become runs of zeros and the ranks are heavily skewed towards 0.
+
+    Returns:
+        bytes: The ranks.
+
+    Examples:
+        # Example usage:
+        move_to_front(b'aaabbb')  # b'a\\x00\\x00b\\x00\\x00'
+    """
+    table = bytearray(range(256))
+    ranks = bytearray(len(data))
+    last = table[0]
+    for position, byte in enumerate(data):
+        if byte != last:
+            rank = table.index(byte)
+            ranks[position] = rank
+            del table[rank]
+            table.insert(0, byte)
+            last = byte
+    return bytes(ranks)
+
+
+def move_to_front_inverse(ranks):
+    """
+    Inverse of ``move_to_front``.
+
+    Returns:
+        bytes: The original data.
+    """
+    table = bytearray(range(256))
+    data = bytearray(len(ranks))
+    for position, rank in enumerate(ranks):
+        if rank:
+            byte = table[rank]
+            del table[rank]
+            table.insert(0, byte)
+        data[position] = table[0]
+    return bytes(data)
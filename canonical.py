@@ -0,0 +1,402 @@
+import heapq
+
+from stats import STATS
+
+CANONICAL_MAGIC = b'HCAN'
+BLOCK_MAGIC = b'HBLK'
+CONTEXT_MAGIC = b'HCTX'
+LZ_MAGIC = b'HLZ7'
+BWT_MAGIC = b'HBWT'
+AUTO_MAGIC = b'HAUT'
+
+
+def write_varint(output_file, value):
+    """
+    Write a non-negative integer as an unsigned LEB128 varint (7 bits per byte, low group first).
+
+    Args:
+        output_file (file object): A binary file object.
+        value (int): The integer to write.
+    """
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    output_file.write(out)
+
+
+def read_varint(input_file):
+    """
+    Read an unsigned LEB128 varint written by ``write_varint``.
+
+    Args:
+        input_file (file object): A binary file object.
+
+    Returns:
+        int: The decoded integer.
+
+    Raises:
+        EOFError: If the file ends inside the varint.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = input_file.read(1)
+        if not byte:
+            raise EOFError('Unexpected end of file in varint.')
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def code_lengths(codes):
+    """
+    Extract the code length of every symbol from a codebook of bit strings.
+
+    Args:
+        codes (dict): Symbol to code string, e.g. the output of ``generate_huffman_codes``.
+
+    Returns:
+        dict: Symbol to code length. A lone symbol (empty code) gets length 1 so that it still occupies bits.
+    """
+    return {symbol: max(1, len(code)) for symbol, code in codes.items()}
+
+
+def canonical_codes(lengths):
+    """
+    Assign canonical Huffman codes from code lengths.
+
+    Symbols are ordered by (length, symbol) and receive consecutive code values, so the codebook is fully
+    determined by the lengths and the encoder and decoder can rebuild it without storing any code bits.
+
+    Args:
+        lengths (dict): Symbol to code length.
+
+    Returns:
+        dict: Symbol to ``(code, length)`` pair.
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+    for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        code <<= length - previous_length
+        codes[symbol] = (code, length)
+        code += 1
+        previous_length = length
+    return codes
+
+
+def limited_code_lengths(frequencies, max_length):
+    """
+    Compute optimal prefix code lengths no longer than max_length bits (package-merge).
+
+    The classic construction: every symbol is a coin of its frequency at each of the ``max_length`` levels; the
+    two cheapest items of a level are repeatedly packaged into one item of the next level up, and the
+    ``2n - 2`` cheapest items of the last level are selected. A symbol's code length is the number of selected
+    items containing it. Runs in ``O(n * max_length)`` items.
+
+    Args:
+        frequencies (dict): Symbol to count.
+        max_length (int): The longest allowed code length.
+
+    Returns:
+        dict: Symbol to code length. A lone symbol gets length 1.
+
+    Raises:
+        ValueError: If ``2 ** max_length`` codes are not enough for all symbols.
+
+    Examples:
+        # Example usage:
+        limited_code_lengths({'a': 1, 'b': 1, 'c': 2, 'd': 4, 'e': 8}, 3)  # {'a': 3, 'b': 3, 'c': 3, 'd': 3, 'e': 1}
+    """
+    symbols = sorted(frequencies, key=frequencies.get)
+    if len(symbols) <= 1:
+        return {symbol: 1 for symbol in symbols}
+    if len(symbols) > 1 << max_length:
+        raise ValueError("Too many symbols for the maximum code length!")
+    leaves = [(frequencies[symbol], index) for index, symbol in enumerate(symbols)]  # Leaf node: symbol index
+    items = leaves
+    for _ in range(max_length - 1):
+        packages = [(items[k][0] + items[k + 1][0], (items[k][1], items[k + 1][1]))  # Package node: two items
+                    for k in range(0, len(items) - 1, 2)]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+    lengths = [0] * len(symbols)
+    stack = [node for _, node in items[:2 * len(symbols) - 2]]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            stack.extend(node)
+        else:
+            lengths[node] += 1
+    return {symbol: length for symbol, length in zip(symbols, lengths)}
+
+
+def code_cost(lengths, frequencies):
+    """
+    Returns:
+        int: Number of bits needed to encode every symbol occurrence with the given code lengths.
+    """
+    return sum(frequencies[symbol] * length for symbol, length in lengths.items())
+
+
+def code_strings(codes):
+    """
+    Convert ``(code, length)`` pairs into the '0'/'1' strings used by the JSON code tables.
+
+    Args:
+        codes (dict): Symbol to ``(code, length)`` pair.
+
+    Returns:
+        dict: Symbol to code string.
+    """
+    return {symbol: format(code, f'0{length}b') for symbol, (code, length) in codes.items()}
+
+
+def limit_code_strings(codes, frequencies, max_length):
+    """
+    Make a codebook of bit strings respect a maximum code length.
+
+    Args:
+        codes (dict): Symbol to code string, e.g. the output of ``generate_huffman_codes``.
+        frequencies (dict): Symbol to count, used to rebuild the code when it is too long.
+        max_length (int): The longest allowed code length.
+
+    Returns:
+        dict: ``codes`` itself when no code exceeds max_length, otherwise canonical code strings built from
+        ``limited_code_lengths``.
+    """
+    if max(map(len, codes.values()), default=0) <= max_length:
+        return codes
+    return code_strings(canonical_codes(limited_code_lengths(frequencies, max_length)))
+
+
+def limit_codes(codes, frequencies, max_length):
+    """
+    Like ``limit_code_strings``, and count the coded size before and after in ``STATS`` (``unlimited_bits`` and
+    ``limited_bits``) when the code had to be rebuilt.
+
+    Returns:
+        dict: The code strings respecting max_length.
+    """
+    limited = limit_code_strings(codes, frequencies, max_length)
+    if limited is not codes:
+        STATS.count('unlimited_bits', code_cost(code_lengths(codes), frequencies))
+        STATS.count('limited_bits', code_cost(code_lengths(limited), frequencies))
+    return limited
+
+
+def write_code_lengths(output_file, lengths):
+    """
+    Write a compact code-length table.
+
+    Layout:
+        symbol width (1 byte): characters per symbol, 0 for byte values
+        max length   (1 byte)
+        counts       (varint x max length): number of codes of each length 1..max length
+        symbols size (varint): byte size of the symbol string
+        symbols      (UTF-8, or one raw byte per symbol for width 0): all symbols in canonical order
+
+    Args:
+        output_file (file object): A binary file object.
+        lengths (dict): Symbol to code length, every symbol being a string of the same length, or every symbol
+            being a byte value (int in 0..255).
+
+    Raises:
+        ValueError: If the symbols do not share one width or a code length exceeds 255.
+    """
+    ordered = sorted(lengths.items(), key=lambda item: (item[1], item[0]))
+    if ordered and isinstance(ordered[0][0], int):                  # Byte alphabet
+        width = 0
+        symbols_bytes = bytes(symbol for symbol, _ in ordered)
+    else:
+        width = len(ordered[0][0]) if ordered else 1
+        if any(len(symbol) != width for symbol, _ in ordered):
+            raise ValueError("All symbols must have the same number of characters!")
+        symbols_bytes = ''.join(symbol for symbol, _ in ordered).encode('utf-8')
+    max_length = max(lengths.values(), default=0)
+    if max_length > 255:
+        raise ValueError("Code length exceeds 255 bits!")
+    counts = [0] * (max_length + 1)
+    for length in lengths.values():
+        counts[length] += 1
+
+    output_file.write(bytes([width, max_length]))
+    for count in counts[1:]:
+        write_varint(output_file, count)
+    write_varint(output_file, len(symbols_bytes))
+    output_file.write(symbols_bytes)
+
+
+def read_code_lengths(input_file):
+    """
+    Read a code-length table written by ``write_code_lengths``.
+
+    Args:
+        input_file (file object): A binary file object.
+
+    Returns:
+        tuple: ``(lengths, width)`` with the symbol to code length dict and the characters per symbol; width 0
+        means the symbols are byte values (ints).
+    """
+    width, max_length = input_file.read(2)
+    counts = [read_varint(input_file) for _ in range(max_length)]
+    symbols_data = input_file.read(read_varint(input_file))
+    if width == 0:
+        symbol_lengths = (length for length, count in enumerate(counts, start=1) for _ in range(count))
+        return dict(zip(symbols_data, symbol_lengths)), width
+    symbols_text = symbols_data.decode('utf-8')
+    lengths = {}
+    position = 0
+    for length, count in enumerate(counts, start=1):
+        for _ in range(count):
+            lengths[symbols_text[position:position + width]] = length
+            position += width
+    return lengths, width
+
+
+def write_dense_lengths(output_file, lengths):
+    """
+    Write the code lengths of a small integer alphabet as one byte per symbol value, 0 for unused symbols.
+
+    Layout:
+        size    (varint): largest used symbol + 1
+        lengths (1 byte per symbol): a 0 byte is followed by the varint number of further unused symbols, so
+                gaps in the alphabet cost two bytes
+
+    Args:
+        output_file (file object): A binary file object.
+        lengths (dict): Symbol (int >= 0) to code length.
+
+    Raises:
+        ValueError: If a code length exceeds 255.
+    """
+    size = max(lengths, default=-1) + 1
+    if max(lengths.values(), default=0) > 255:
+        raise ValueError("Code length exceeds 255 bits!")
+    write_varint(output_file, size)
+    symbol = 0
+    while symbol < size:
+        if symbol in lengths:
+            output_file.write(bytes((lengths[symbol],)))
+            symbol += 1
+            continue
+        gap = symbol
+        while gap not in lengths:
+            gap += 1
+        output_file.write(b'\x00')
+        write_varint(output_file, gap - symbol - 1)
+        symbol = gap
+
+
+def read_dense_lengths(input_file):
+    """
+    Read a table written by ``write_dense_lengths``.
+
+    Returns:
+        dict: Symbol to code length, for the used symbols only.
+    """
+    size = read_varint(input_file)
+    lengths = {}
+    symbol = 0
+    while symbol < size:
+        length = input_file.read(1)[0]
+        if length:
+            lengths[symbol] = length
+            symbol += 1
+        else:
+            symbol += read_varint(input_file) + 1
+    return lengths
+
+
+def write_canonical_header(output_file, lengths, encoded_bits):
+    """
+    Write the header of a canonical-Huffman file: magic, number of valid payload bits and code-length table.
+
+    Args:
+        output_file (file object): A binary file object.
+        lengths (dict): Symbol to code length.
+        encoded_bits (int): Number of valid bits in the payload that follows.
+    """
+    output_file.write(CANONICAL_MAGIC)
+    output_file.write(encoded_bits.to_bytes(8, byteorder='big'))
+    write_code_lengths(output_file, lengths)
+
+
+def read_canonical_header(input_file):
+    """
+    Read the rest of a canonical-Huffman header once ``CANONICAL_MAGIC`` has been consumed.
+
+    Args:
+        input_file (file object): A binary file object positioned right after the magic.
+
+    Returns:
+        tuple: ``(lengths, width, encoded_bits)``.
+    """
+    encoded_bits = int.from_bytes(input_file.read(8), byteorder='big')
+    lengths, width = read_code_lengths(input_file)
+    return lengths, width, encoded_bits
+
+
+def write_context_tables(output_file, alphabet, context_lengths):
+    """
+    Write the code-length tables of an order-1 context code, one table per previous character.
+
+    Layout:
+        alphabet size (varint): byte size of the alphabet
+        alphabet      (UTF-8): the characters, sorted
+        per context   (alphabet order): varint successor count, the varint gap between consecutive successor
+                      indices, then one code-length byte per successor when there are at least two
+
+    Args:
+        output_file (file object): A binary file object.
+        alphabet (list): Sorted characters; every context and successor must belong to it.
+        context_lengths (dict): Context character -> {successor: code length}. A context with a single
+            successor has no code (length 0) and costs no bits.
+
+    Raises:
+        ValueError: If a code length exceeds 255.
+    """
+    alphabet_bytes = ''.join(alphabet).encode('utf-8')
+    write_varint(output_file, len(alphabet_bytes))
+    output_file.write(alphabet_bytes)
+    position = {char: index for index, char in enumerate(alphabet)}
+    for context in alphabet:
+        lengths = context_lengths.get(context, {})
+        successors = sorted(lengths, key=position.__getitem__)
+        write_varint(output_file, len(successors))
+        previous = -1
+        for char in successors:
+            write_varint(output_file, position[char] - previous - 1)
+            previous = position[char]
+        if len(successors) > 1:
+            if max(lengths.values()) > 255:
+                raise ValueError("Code length exceeds 255 bits!")
+            output_file.write(bytes(lengths[char] for char in successors))
+
+
+def read_context_tables(input_file):
+    """
+    Read the tables written by ``write_context_tables``.
+
+    Args:
+        input_file (file object): A binary file object.
+
+    Returns:
+        tuple: ``(alphabet, context_lengths)``.
+    """
+    alphabet = list(input_file.read(read_varint(input_file)).decode('utf-8'))
+    context_lengths = {}
+    for context in alphabet:
+        count = read_varint(input_file)
+        if not count:
+            continue
+        successors = []
+        index = -1
+        for _ in range(count):
+            index += read_varint(input_file) + 1
+            successors.append(alphabet[index])
+        lengths = input_file.read(count) if count > 1 else [0]
+        context_lengths[context] = dict(zip(successors, lengths))
+    return alphabet, context_lengths
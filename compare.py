@@ -1,5 +1,6 @@
 import argparse
 
+CHUNK_SIZE = 1 << 16  # bytes compared at a time
 
 
 def are_files_identical(file1_path: str, file2_path: str) -> bool:
@@ -15,11 +16,11 @@ def are_files_identical(file1_path: str, file2_path: str) -> bool:
     """
     with open(file1_path, 'rb') as file1, open(file2_path, 'rb') as file2:
         while True:
-            byte1 = file1.read(1)
-            byte2 = file2.read(1)
-            if byte1 != byte2:
+            chunk1 = file1.read(CHUNK_SIZE)
+            chunk2 = file2.read(CHUNK_SIZE)
+            if chunk1 != chunk2:
                 return False
-            if not byte1 and not byte2:
+            if not chunk1:
                 return True
 
 
@@ -1,9 +1,21 @@
 import argparse
 import heapq
 import json
+from collections import Counter
+from functools import partial
+from io import BytesIO
 from typing import Dict
 
+from analysis import analyze_text, byte_histogram, utf8_boundary
 from bitio import OutputBitStream
+from blockindex import write_index
+from canonical import (BLOCK_MAGIC, canonical_codes, code_cost, code_lengths, code_strings, limit_code_strings,
+                       write_canonical_header, write_code_lengths)
+from parallel import map_ordered
+from stats import STATS, add_arguments, reporting
+import vectorized
+
+DEFAULT_BLOCK_SIZE = 1 << 20  # bytes
 
 
 def encoding(input_file_path: str) -> Dict[str, tuple[int, int]]:
@@ -73,18 +85,6 @@ def build_huffman_tree(char_freqs):
     return priority_queue[0]
 
 
-def print_huffman_tree(node, level=0):
-    """递归打印霍夫曼树的每个节点及其频率。
-    参数:
-    node (HuffmanNode): 当前遍历到的节点。
-    level (int): 当前节点的深度，用于格式化输出。
-    """
-    if node is not None:
-        print_huffman_tree(node.right, level + 1)  # 先遍历右子树
-        print(' ' * 7 * level + '->', node.freq)  # 打印当前节点频率
-        print_huffman_tree(node.left, level + 1)  # 再遍历左子树
-
-
 def generate_huffman_codes(node, current_code="", code_dict=None):
     """
     递归生成霍夫曼编码。
@@ -109,6 +109,19 @@ def generate_huffman_codes(node, current_code="", code_dict=None):
     return code_dict
 
 
+def huffman_code_lengths(frequencies, max_code_length=None):
+    """
+    Huffman code lengths of a symbol histogram, optionally limited to max_code_length bits (package-merge).
+
+    Returns:
+    dict: Symbol to code length, ready for canonical.canonical_codes.
+    """
+    huffman_codes = generate_huffman_codes(build_huffman_tree(frequencies))
+    if max_code_length:
+        huffman_codes = limit_code_strings(huffman_codes, frequencies, max_code_length)
+    return code_lengths(huffman_codes)
+
+
 def compute_expected_code_length(huffman_codes, char_freqs):
     total_chars = sum(char_freqs.values())
     expected_length = 0
@@ -117,56 +130,202 @@ def compute_expected_code_length(huffman_codes, char_freqs):
         expected_length += p * len(code)
     return expected_length
 
-def encode_file(input_file_path, output_file_path, huffman_codes):
+def encode_file(input_file_path, output_file_path, huffman_codes, canonical=False, input_text=None):
     
-    codes_json = json.dumps(huffman_codes)          # 将霍夫曼编码表转换为JSON字符串
+    with STATS.stage('codes'):
+        if canonical:
+            lengths = code_lengths(huffman_codes)                       # 只保留各字符的码长
+            huffman_codes = code_strings(canonical_codes(lengths))      # 按码长重新分配范式霍夫曼编码
+        else:
+            codes_json = json.dumps(huffman_codes)  # 将霍夫曼编码表转换为JSON字符串
     
+    if input_text is None:                          # 未提供已读入的文本时才读取文件
+        with STATS.stage('read'), open(input_file_path, 'rb') as file:
+            input_data = file.read()
+        input_text = input_data.decode('utf-8')
+
+    with STATS.stage('encode'):
+        int_codes = {char: (int(code, 2) if code else 0, len(code)) for char, code in huffman_codes.items()}
+        if vectorized.available(int_codes):                             # 有 NumPy 时向量化编码
+            encoded_data, encoded_bits_length = vectorized.pack_codes(input_text, int_codes)
+        else:
+            encoded_text = ''                       # 存储编码后的文本
+            for char in input_text:
+                encoded_text += huffman_codes.get(char, '')     # 根据霍夫曼编码表编码
+            encoded_bits_length = len(encoded_text)
+
+            byte_array = bytearray()
+            for i in range(0, len(encoded_text), 8):
+                byte = encoded_text[i:i+8]
+                if len(byte) < 8:
+                    byte = byte.ljust(8, '0')
+                byte_array.append(int(byte, 2))
+            encoded_data = bytes(byte_array)
+    STATS.count('bits', encoded_bits_length)                            # 编码后的总比特数
+
+    with STATS.stage('write'), open(output_file_path, 'wb') as output_file:
+        if canonical:
+            write_canonical_header(output_file, lengths, encoded_bits_length)   # 写入码长表头
+        else:
+            output_file.write(len(codes_json).to_bytes(4, byteorder='big'))     # 写入编码表长度
+            output_file.write(encoded_bits_length.to_bytes(4, byteorder='big')) # 写入有效编码长度
+            output_file.write(codes_json.encode("utf-8"))                       # 写入编码表
+        
+        output_file.write(encoded_data)                                     # 写入有效编码数据
+        STATS.count('output_bytes', output_file.tell())
+
+
+
+def read_blocks(input_file_path: str, block_size: int = DEFAULT_BLOCK_SIZE, raw: bool = False):
+    """
+    Read a file in blocks of at most about block_size bytes, each ending on a character boundary.
+
+    With raw set, blocks are cut at exactly block_size bytes, whatever the content.
+
+    Yields:
+    bytes: The raw bytes of each block.
+    """
     with open(input_file_path, 'rb') as file:
-        input_data = file.read()
-    
-    input_text = input_data.decode('utf-8')
+        carry = b''
+        while True:
+            chunk = file.read(block_size)
+            if not chunk:
+                break
+            if raw:
+                yield chunk
+                continue
+            block = carry + chunk
+            cut = utf8_boundary(block)
+            carry = block[cut:]                                         # 不完整的字符留给下一块
+            if cut:
+                yield block[:cut]
+        if carry:
+            yield carry
+
+
+def encode_block(block: bytes, max_code_length: int = None, raw: bool = False) -> bytes:
+    """
+    Encode one block with its own canonical Huffman code table, optionally limited to max_code_length bits.
 
-    encoded_text = ''                               # 存储编码后的文本
-    for char in input_text:
-        encoded_text += huffman_codes.get(char, '') # 根据霍夫曼编码表编码
+    Blocks are UTF-8 text coded per character, or with raw set any bytes coded per byte value (the code-length
+    table then has width 0).
 
-    encoded_bits_length = len(encoded_text)
-    print("编码后的总比特数:", encoded_bits_length)
+    Frame layout:
+        raw size     (4 bytes): UTF-8 size of the block
+        encoded bits (4 bytes): number of valid payload bits
+        code-length table (see canonical.write_code_lengths)
+        payload: the encoded bits padded to a whole byte
 
-    with open(output_file_path, 'wb') as output_file:
-        output_file.write(len(codes_json).to_bytes(4, byteorder='big'))     # 写入编码表长度
-        output_file.write(encoded_bits_length.to_bytes(4, byteorder='big')) # 写入有效编码长度
-        output_file.write(codes_json.encode("utf-8"))                       # 写入编码表
-        
-        byte_array = bytearray()
-        for i in range(0, len(encoded_text), 8):
-            byte = encoded_text[i:i+8]
-            if len(byte) < 8:
-                byte = byte.ljust(8, '0')
-            byte_array.append(int(byte, 2))
-        output_file.write(byte_array)                                       # 写入有效编码数据
+    Returns:
+    bytes: The framed block.
+    """
+    if raw:                                                             # 字节模式: 不做 UTF-8 解码
+        text = block
+        char_freqs = byte_histogram(block)
+    else:
+        text = block.decode('utf-8')
+        char_freqs = Counter(text)                                      # 统计本块字符频率
+    lengths = huffman_code_lengths(char_freqs, max_code_length)         # 可限制最长码长 (package-merge)
+    codes = canonical_codes(lengths)
+
+    if vectorized.available(codes):                                     # 有 NumPy 时向量化编码
+        payload, encoded_bits = vectorized.pack_codes(text, codes)
+    else:
+        stream = BytesIO()
+        bit_stream = OutputBitStream(stream)
+        write_bits = bit_stream.write_bits
+        for char in text:
+            write_bits(*codes[char])
+        bit_stream.flush()
+        payload = stream.getvalue()
+        encoded_bits = sum(freq * lengths[char] for char, freq in char_freqs.items())
+
+    frame = BytesIO()
+    frame.write(len(block).to_bytes(4, byteorder='big'))
+    frame.write(encoded_bits.to_bytes(4, byteorder='big'))
+    write_code_lengths(frame, lengths)
+    frame.write(payload)
+    return frame.getvalue()
+
+
+def encode_indexed_block(block: bytes, max_code_length: int = None, raw: bool = False) -> tuple:
+    """
+    Encode one block and count its newlines for the seek table.
+
+    Returns:
+    tuple: The framed block (see encode_block) and the number of b'\\n' bytes in the block.
+    """
+    return encode_block(block, max_code_length, raw), block.count(b'\n')
 
 
+def compress_blocks(input_file_path: str, output_file_path: str, block_size: int = DEFAULT_BLOCK_SIZE,
+                    workers: int = 1, max_code_length: int = None, raw: bool = False) -> None:
+    """
+    Compress a file block by block so that memory stays bounded by the block size.
+
+    The output is BLOCK_MAGIC followed by one frame per block (see encode_block) and a 4-byte zero raw size
+    that terminates the stream. Blocks are independent, so with several workers they are encoded concurrently
+    in a process pool; frames are still written in input order and the output is identical for any worker count.
+    A seek table of frame offsets, raw sizes and newline counts (see blockindex.write_index) follows the
+    terminator so that blocks can later be decoded in parallel or individually.
+    """
+    index = []
+    with open(output_file_path, 'wb') as output_file:
+        output_file.write(BLOCK_MAGIC)
+        offset = len(BLOCK_MAGIC)
+        encode = partial(encode_indexed_block, max_code_length=max_code_length, raw=raw)
+        with STATS.stage('encode'):                                     # 读取、编码与写入交错进行, 合计为一个阶段
+            for frame, newlines in map_ordered(encode, read_blocks(input_file_path, block_size, raw), workers):
+                output_file.write(frame)
+                index.append((offset, int.from_bytes(frame[:4], byteorder='big'), newlines))  # 记录块偏移、原始大小和行数
+                offset += len(frame)
+        output_file.write(bytes(4))
+        write_index(output_file, index)
+        STATS.count('blocks', len(index))
+        STATS.count('input_bytes', sum(raw_size for _, raw_size, _ in index))
+        STATS.count('output_bytes', output_file.tell())
+
+
+def compress(input_file_path: str, output_file_path: str, canonical: bool = False, block_size: int = 0,
+             workers: int = 1, max_code_length: int = None, raw: bool = False) -> None:
+    if block_size or workers != 1:                                      # 分块流式压缩 (可多进程并行)
+        compress_blocks(input_file_path, output_file_path, block_size or DEFAULT_BLOCK_SIZE, workers,
+                        max_code_length, raw)
+        return
 
-def compress(input_file_path: str, output_file_path: str) -> None:
     file_header_size = 4  # bytes
     encoding_map = encoding(input_file_path)
         
-    character_fre_dict = count_character_frequencies(input_file_path)   # 统计字符频率
-    print(count_character_frequencies(input_file_path))                 # 打印字符频率
-    
-    root = build_huffman_tree(character_fre_dict)                       # 构建霍夫曼树
-    print_huffman_tree(root)                                            # 打印霍夫曼树
-    
-    huffman_codes = generate_huffman_codes(root)                        # 生成霍夫曼编码
-    print("Huffman Codes:")
-    for char, code in huffman_codes.items():                            # 打印霍夫曼编码
-        print(f"'{char}': {code}")
-        
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:     # 只读取一次输入文件
+        input_data = file.read()
+    STATS.count('input_bytes', len(input_data))
+    with STATS.stage('count'):
+        if raw:                                                         # 字节模式: 直接统计字节值, 不转码
+            input_text = input_data
+            character_fre_dict = byte_histogram(input_data)
+            canonical = True                                            # JSON 编码表只支持字符
+        else:
+            input_text = input_data.decode('utf-8')
+            stats = analyze_text(input_text, histogram_only=True)       # 共享统计阶段, 只需字符频率
+            character_fre_dict = dict(stats.histogram)                  # 统计字符频率
+    STATS.count('symbols', len(input_text))                             # 符号总数
+    STATS.count('distinct_symbols', len(character_fre_dict))            # 不同符号数
+
+    with STATS.stage('tree'):
+        root = build_huffman_tree(character_fre_dict)                   # 构建霍夫曼树
+
+    with STATS.stage('codes'):
+        huffman_codes = generate_huffman_codes(root)                    # 生成霍夫曼编码
+        if max_code_length:                                             # 限制最长码长, 并记录压缩率损失
+            STATS.count('unlimited_bits', code_cost(code_lengths(huffman_codes), character_fre_dict))
+            huffman_codes = limit_code_strings(huffman_codes, character_fre_dict, max_code_length)
+            STATS.count('limited_bits', code_cost(code_lengths(huffman_codes), character_fre_dict))
+    STATS.set('max_code_length', max(map(len, huffman_codes.values()), default=0))  # 最长码长
+
     expected_length = compute_expected_code_length(huffman_codes, character_fre_dict)   # 计算期望编码长度
-    print(f"Expected Huffman Code Length: {expected_length:.2f} bits per symbol")       # 打印期望编码长度
-    
-    encode_file(input_file_path, output_file_path, huffman_codes)       # 编码并创建文件
+    STATS.set('expected_bits_per_symbol', expected_length)
+
+    encode_file(input_file_path, output_file_path, huffman_codes, canonical, input_text)    # 编码并创建文件
     
     # with open(input_file_path, 'r') as f:
     #     input_file_data = f.read()
@@ -186,15 +345,30 @@ def compress(input_file_path: str, output_file_path: str) -> None:
 # 分割线以下你仅可以修改main函数的具体内容，但请保证main函数的输入为
 # ’输入文件路径‘(即原始数据文件的文件路径名)和’输出文件路径‘(即存储压缩后文件的文件路径名)，两者顺序不可调换。
 
-def main(input_file_path: str, output_file_path: str) -> None:
-    compress(input_file_path, output_file_path)
+def main(input_file_path: str, output_file_path: str, canonical: bool = False, block_size: int = 0,
+         workers: int = 1, max_code_length: int = None, raw: bool = False) -> None:
+    compress(input_file_path, output_file_path, canonical, block_size, workers, max_code_length, raw)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process some files.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--canonical', action='store_true', help='Store canonical code lengths instead of the JSON code table.')
+    parser.add_argument('--block-size', '-b', type=int, default=0,
+                        help=f'Stream the input in blocks of this many bytes (e.g. {DEFAULT_BLOCK_SIZE}).')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Compress blocks in this many processes (0 = one per CPU core); implies block mode.')
+
+    parser.add_argument('--max-code-length', type=int,
+                        help='Limit Huffman codes to this many bits (e.g. 11-15) for single-table decoding.')
+
+    parser.add_argument('--raw', action='store_true',
+                        help='Code byte values instead of UTF-8 characters (any binary file); implies --canonical.')
+
+    add_arguments(parser)                                               # --stats 与 --profile
 
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.canonical, args.block_size, args.workers, args.max_code_length, args.raw)
@@ -1,9 +1,13 @@
 import argparse
 import heapq
-import json
-from collections import defaultdict, Counter
+from io import BytesIO
 from typing import Dict, Tuple
 
+from analysis import analyze_text
+from bitio import OutputBitStream
+from canonical import CONTEXT_MAGIC, canonical_codes, code_lengths, write_context_tables, write_varint
+from stats import STATS, add_arguments, reporting
+
 class HuffmanNode:
     def __init__(self, char, freq):
         self.char = char   # 存储字符
@@ -14,25 +18,31 @@ class HuffmanNode:
     def __lt__(self, other):
         return self.freq < other.freq
 
-def count_transition_frequencies(input_file_path: str) -> dict:
-    transition_counts = defaultdict(lambda: defaultdict(int))
-    total_counts = Counter()
-    
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        text = file.read()
-        for i in range(len(text) - 1):
-            current_char = text[i]
-            next_char = text[i + 1]
-            transition_counts[current_char][next_char] += 1
-            total_counts[current_char] += 1
-    
-    transition_probs = {}
+def count_transition_frequencies(input_text: str) -> dict:
+    transition_counts = {}
+    for (current_char, next_char), count in analyze_text(input_text).transitions.items():
+        transition_counts.setdefault(current_char, {})[next_char] = count
+    return transition_counts
+
+def build_context_codes(transition_counts: dict) -> Dict[str, Dict[str, Tuple[int, int]]]:
+    """
+    Build one canonical Huffman code per previous character from the counts of the characters following it.
+
+    Args:
+        transition_counts (dict): Previous character -> {next character: count}.
+
+    Returns:
+        dict: Previous character -> {next character: (code, length)}. A context followed by a single character
+        gets the empty code ``(0, 0)``: the decoder infers that character without reading any bit.
+    """
+    context_codes = {}
     for current_char, next_chars in transition_counts.items():
-        transition_probs[current_char] = {}
-        for next_char, count in next_chars.items():
-            transition_probs[current_char][next_char] = count / total_counts[current_char]
-    
-    return transition_probs
+        if len(next_chars) == 1:
+            context_codes[current_char] = {next_char: (0, 0) for next_char in next_chars}
+            continue
+        huffman_codes = generate_huffman_codes(build_huffman_tree(next_chars))
+        context_codes[current_char] = canonical_codes(code_lengths(huffman_codes))
+    return context_codes
 
 def build_huffman_tree(char_probs: dict) -> HuffmanNode:
     priority_queue = [HuffmanNode(char, freq) for char, freq in char_probs.items()]
@@ -59,59 +69,70 @@ def generate_huffman_codes(node: HuffmanNode, current_code: str = "", code_dict:
         generate_huffman_codes(node.right, current_code + "1", code_dict)
     return code_dict
 
-def encode_file(input_file_path: str, output_file_path: str, huffman_codes: Dict[str, str]) -> None:
-    codes_json = json.dumps(huffman_codes)
-    
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        input_text = file.read()
-    
-    encoded_text = ''
-    for i in range(len(input_text) - 1):
-        pair = input_text[i] + input_text[i + 1]
-        encoded_text += huffman_codes.get(pair, '')
-    
-    encoded_bits_length = len(encoded_text)
-    print("编码后的总比特数:", encoded_bits_length)
-
-    with open(output_file_path, 'wb') as output_file:
-        output_file.write(len(codes_json).to_bytes(4, byteorder='big'))
-        output_file.write(encoded_bits_length.to_bytes(4, byteorder='big'))
-        output_file.write(codes_json.encode("utf-8"))
-        
-        byte_array = bytearray()
-        for i in range(0, len(encoded_text), 8):
-            byte = encoded_text[i:i+8]
-            if len(byte) < 8:
-                byte = byte.ljust(8, '0')
-            byte_array.append(int(byte, 2))
-        output_file.write(byte_array)
+def write_context_stream(output_file, input_text: str, context_codes: Dict[str, Dict[str, Tuple[int, int]]]) -> int:
+    """
+    Write everything of an order-1 context Huffman file after its magic: varint character count, varint index
+    of the first character in the alphabet, the per-context code-length tables (see
+    canonical.write_context_tables), then the codes of characters 2..n, each taken from the table of the
+    character before it.
+
+    Returns:
+        int: Number of payload bits, before padding.
+    """
+    write_varint(output_file, len(input_text))
+    if not input_text:
+        return 0
+    alphabet = sorted(set(input_text))
+    write_varint(output_file, alphabet.index(input_text[0]))
+    context_lengths = {context: {char: length for char, (_, length) in codes.items()}
+                       for context, codes in context_codes.items()}
+    write_context_tables(output_file, alphabet, context_lengths)
+
+    bit_stream = OutputBitStream(output_file)
+    write_bits = bit_stream.write_bits
+    encoded_bits_length = 0
+    for current_char, next_char in zip(input_text, input_text[1:]):
+        code, length = context_codes[current_char][next_char]
+        if length:
+            write_bits(code, length)
+            encoded_bits_length += length
+    bit_stream.flush()
+    return encoded_bits_length
+
+def encode_file(input_text: str, output_file_path: str, context_codes: Dict[str, Dict[str, Tuple[int, int]]]) -> None:
+    """
+    Write an order-1 context Huffman file: ``CONTEXT_MAGIC`` followed by the stream of ``write_context_stream``.
+    """
+    with STATS.stage('encode'):
+        payload = BytesIO()
+        encoded_bits_length = write_context_stream(payload, input_text, context_codes)
+    STATS.count('bits', encoded_bits_length)
+
+    with STATS.stage('write'), open(output_file_path, 'wb') as output_file:
+        output_file.write(CONTEXT_MAGIC)
+        output_file.write(payload.getvalue())
+        STATS.count('output_bytes', output_file.tell())
 
 def compress(input_file_path: str, output_file_path: str) -> None:
-    transition_probs = count_transition_frequencies(input_file_path)
-    
-    pair_probs = {}
-    for current_char, next_chars in transition_probs.items():
-        for next_char, prob in next_chars.items():
-            pair = current_char + next_char
-            pair_probs[pair] = prob
-    
-    root = build_huffman_tree(pair_probs)
-    
-    print("Huffman Tree:")
-    print_huffman_tree(root)
-    
-    huffman_codes = generate_huffman_codes(root)
-    print("Huffman Codes:")
-    for pair, code in huffman_codes.items():
-        print(f"'{pair}': {code}")
-    
-    encode_file(input_file_path, output_file_path, huffman_codes)
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        input_text = file.read().decode('utf-8')
+    STATS.count('symbols', len(input_text))
+
+    with STATS.stage('count'):
+        transition_counts = count_transition_frequencies(input_text)
+    STATS.count('contexts', len(transition_counts))
+    STATS.count('distinct_symbols', len(set(input_text)))
+
+    with STATS.stage('codes'):
+        context_codes = build_context_codes(transition_counts)
 
-def print_huffman_tree(node, level=0):
-    if node is not None:
-        print_huffman_tree(node.right, level + 1)
-        print(' ' * 7 * level + '->', node.freq)
-        print_huffman_tree(node.left, level + 1)
+    total_pairs = max(1, len(input_text) - 1)
+    expected_length = sum(count * context_codes[current_char][next_char][1]
+                          for current_char, next_chars in transition_counts.items()
+                          for next_char, count in next_chars.items()) / total_pairs
+    STATS.set('expected_bits_per_symbol', expected_length)
+
+    encode_file(input_text, output_file_path, context_codes)
 
 def main(input_file_path: str, output_file_path: str) -> None:
     compress(input_file_path, output_file_path)
@@ -121,6 +142,9 @@ if __name__ == "__main__":
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
 
+    add_arguments(parser)
+
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output)
@@ -0,0 +1,142 @@
+import argparse
+import os
+from collections import Counter
+from io import BytesIO
+
+from bitio import OutputBitStream
+from bwt import move_to_front, transform
+from canonical import BWT_MAGIC, canonical_codes, write_dense_lengths, write_varint
+from compress import huffman_code_lengths
+from parallel import map_ordered
+from rle import find_runs, length_symbol
+from stats import STATS, add_arguments, reporting
+
+ZERO_RUN = 256                # Symbols: MTF ranks 1..255, then ZERO_RUN + length symbol of a run of rank 0
+MAX_CODE_LENGTH = 15          # Keeps the decoder on single-level tables
+DEFAULT_BLOCK_SIZE = 1 << 20  # bytes
+
+
+def block_symbols(ranks):
+    """
+    Run-length code the zeros of an MTF output.
+
+    Runs come from ``rle.find_runs``; a run of rank 0 becomes one ``ZERO_RUN`` symbol with the extra bits of its
+    length, every other rank is its own symbol.
+
+    Returns:
+        list: Ranks (int) and ``(symbol, extra_bits, extra)`` tuples for the zero runs, in order.
+    """
+    run_chars, run_lengths = find_runs(ranks.decode('latin-1'))
+    symbols = []
+    for char, length in zip(run_chars, run_lengths):
+        if char == '\0':
+            symbol, bits, extra = length_symbol(length)
+            symbols.append((ZERO_RUN + symbol, bits, extra))
+        else:
+            symbols.extend([ord(char)] * length)
+    return symbols
+
+
+def encode_block(block, max_code_length=MAX_CODE_LENGTH):
+    """
+    Compress one block with BWT, move-to-front, zero-run RLE and Huffman coding, bzip2 style.
+
+    Frame layout:
+        raw size     (varint)
+        primary      (varint): sentinel row of the BWT
+        code lengths (canonical.write_dense_lengths)
+        symbols      (varint)
+        payload size (varint)
+        payload      (bits, padded to a byte)
+
+    Args:
+        block (bytes): The data, not empty.
+        max_code_length (int): Longest allowed code.
+
+    Returns:
+        bytes: The framed block.
+    """
+    last_column, primary = transform(block)
+    symbols = block_symbols(move_to_front(last_column))
+    frequencies = Counter(symbol if isinstance(symbol, int) else symbol[0] for symbol in symbols)
+    lengths = huffman_code_lengths(frequencies, max_code_length)
+    codes = canonical_codes(lengths)
+
+    payload = BytesIO()
+    bit_stream = OutputBitStream(payload)
+    write_bits = bit_stream.write_bits
+    for symbol in symbols:
+        if isinstance(symbol, int):
+            write_bits(*codes[symbol])
+            continue
+        symbol, bits, extra = symbol
+        write_bits(*codes[symbol])
+        if bits:
+            write_bits(extra, bits)
+    bit_stream.flush()
+
+    frame = BytesIO()
+    write_varint(frame, len(block))
+    write_varint(frame, primary)
+    write_dense_lengths(frame, lengths)
+    write_varint(frame, len(symbols))
+    write_varint(frame, len(payload.getvalue()))
+    frame.write(payload.getvalue())
+    return frame.getvalue()
+
+
+def read_blocks(input_file_path, block_size):
+    """
+    Yields:
+        bytes: Consecutive blocks of block_size bytes (the last one shorter).
+    """
+    with open(input_file_path, 'rb') as file:
+        block = file.read(block_size)
+        while block:
+            yield block
+            block = file.read(block_size)
+
+
+def compress(input_file_path, output_file_path, block_size=DEFAULT_BLOCK_SIZE, workers=1):
+    """
+    Compress any file with the BWT pipeline.
+
+    The output is ``BWT_MAGIC`` followed by one frame per block (see encode_block) and a varint raw size of 0.
+    Blocks are independent: time grows linearly and memory with the block size (the suffix array holds one
+    integer per byte), and with several workers blocks are encoded concurrently.
+
+    Args:
+        input_file_path (str): The file to compress, read as bytes.
+        output_file_path (str): The compressed file.
+        block_size (int): Input bytes per block.
+        workers (int): Number of processes, 0 for one per CPU core.
+    """
+    with open(output_file_path, 'wb') as output_file:
+        output_file.write(BWT_MAGIC)
+        with STATS.stage('encode'):                             # Reading, encoding and writing are interleaved
+            for frame in map_ordered(encode_block, read_blocks(input_file_path, block_size), workers):
+                output_file.write(frame)
+                STATS.count('blocks')
+        write_varint(output_file, 0)
+        STATS.count('output_bytes', output_file.tell())
+    STATS.count('input_bytes', os.path.getsize(input_file_path))
+
+
+def main(input_file_path, output_file_path, block_size=DEFAULT_BLOCK_SIZE, workers=1):
+    compress(input_file_path, output_file_path, block_size, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress files with BWT, move-to-front, RLE and Huffman coding.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--block-size', '-b', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='Input bytes per block; time and memory grow linearly with it.')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Number of processes encoding blocks, 0 for one per CPU core.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.block_size, args.workers)
@@ -0,0 +1,132 @@
+import argparse
+from collections import Counter
+from io import BytesIO
+
+from bitio import OutputBitStream
+from canonical import LZ_MAGIC, canonical_codes, write_dense_lengths, write_varint
+from compress import huffman_code_lengths
+from lz77 import DEFAULT_LEVEL, LEVELS, MatchFinder
+from rle import length_symbol
+from stats import STATS, add_arguments, reporting
+
+LITERALS = 256                # Literal/length symbols: byte values, then LITERALS + length symbol of a match
+MAX_CODE_LENGTH = 15          # Keeps the decoder on single-level tables
+DEFAULT_BLOCK_SIZE = 1 << 20  # bytes
+
+
+def encode_block(lengths, values, max_code_length=MAX_CODE_LENGTH):
+    """
+    Huffman-code the tokens of one block with two tables, DEFLATE style.
+
+    Literals and match lengths share the literal/length alphabet; a match length is ``LITERALS`` plus its
+    ``rle.length_symbol`` followed by the extra bits, and is followed by the distance symbol (same bucketing)
+    from the distance alphabet and its extra bits.
+
+    Frame layout:
+        literal/length code lengths (canonical.write_dense_lengths)
+        distance code lengths       (canonical.write_dense_lengths)
+        tokens       (varint)
+        payload size (varint)
+        payload      (bits, padded to a byte)
+
+    Args:
+        lengths (array): Match lengths from ``MatchFinder.tokenize``, 0 for literals.
+        values (array): Byte values of literals and distances of matches.
+        max_code_length (int): Longest allowed code.
+
+    Returns:
+        bytes: The frame, without the raw size.
+    """
+    litlen_frequencies = Counter()
+    distance_frequencies = Counter()
+    tokens = []
+    for length, value in zip(lengths, values):
+        if length:
+            token = length_symbol(length) + length_symbol(value)
+            litlen_frequencies[LITERALS + token[0]] += 1
+            distance_frequencies[token[3]] += 1
+            tokens.append(token)
+        else:
+            litlen_frequencies[value] += 1
+            tokens.append(value)
+    litlen_lengths = huffman_code_lengths(litlen_frequencies, max_code_length)
+    distance_lengths = huffman_code_lengths(distance_frequencies, max_code_length) if distance_frequencies else {}
+    litlen_codes = canonical_codes(litlen_lengths)
+    distance_codes = canonical_codes(distance_lengths)
+
+    payload = BytesIO()
+    bit_stream = OutputBitStream(payload)
+    write_bits = bit_stream.write_bits
+    for token in tokens:
+        if isinstance(token, int):                      # Literal byte
+            write_bits(*litlen_codes[token])
+            continue
+        symbol, bits, extra, distance_symbol, distance_bits, distance_extra = token
+        write_bits(*litlen_codes[LITERALS + symbol])
+        if bits:
+            write_bits(extra, bits)
+        write_bits(*distance_codes[distance_symbol])
+        if distance_bits:
+            write_bits(distance_extra, distance_bits)
+    bit_stream.flush()
+
+    frame = BytesIO()
+    write_dense_lengths(frame, litlen_lengths)
+    write_dense_lengths(frame, distance_lengths)
+    write_varint(frame, len(tokens))
+    write_varint(frame, len(payload.getvalue()))
+    frame.write(payload.getvalue())
+    return frame.getvalue()
+
+
+def compress(input_file_path, output_file_path, level=DEFAULT_LEVEL, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Compress any file with LZ77 followed by Huffman coding.
+
+    The output is ``LZ_MAGIC`` followed by, per block of block_size input bytes, the varint raw size and the
+    frame of ``encode_block``; a raw size of 0 ends the stream. Matches may reach back into earlier blocks, so
+    blocks are not independent.
+
+    Args:
+        input_file_path (str): The file to compress, read as bytes.
+        output_file_path (str): The compressed file.
+        level (int): Match-finder effort, 1 (fastest) to 9 (smallest output), see lz77.LEVELS.
+        block_size (int): Input bytes per block, each with its own code tables.
+    """
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        data = file.read()
+    STATS.count('input_bytes', len(data))
+    finder = MatchFinder(data, level)
+    with open(output_file_path, 'wb') as output_file:
+        output_file.write(LZ_MAGIC)
+        for start in range(0, len(data), block_size):
+            end = min(start + block_size, len(data))
+            with STATS.stage('count'):                          # Match finding
+                lengths, values = finder.tokenize(start, end)
+            STATS.count('tokens', len(lengths))
+            STATS.count('matches', len(lengths) - lengths.count(0))
+            with STATS.stage('encode'):
+                write_varint(output_file, end - start)
+                output_file.write(encode_block(lengths, values))
+        write_varint(output_file, 0)
+        STATS.count('output_bytes', output_file.tell())
+
+
+def main(input_file_path, output_file_path, level=DEFAULT_LEVEL, block_size=DEFAULT_BLOCK_SIZE):
+    compress(input_file_path, output_file_path, level, block_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress files with an LZ77 match finder and Huffman coding.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--level', '-l', type=int, default=DEFAULT_LEVEL, choices=sorted(LEVELS),
+                        help='Effort level: 1 is fastest, 9 gives the smallest output.')
+    parser.add_argument('--block-size', '-b', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='Input bytes per block of code tables.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.level, args.block_size)
@@ -4,6 +4,11 @@ import argparse
 from collections import Counter
 from typing import Dict, List, Tuple
 
+from analysis import analyze_text
+from canonical import canonical_codes, code_lengths, code_strings, write_canonical_header
+from stats import STATS, add_arguments, reporting
+import vectorized
+
 def count_character_frequencies(input_file_path: str) -> dict:
     frequency_dict = {}
     with open(input_file_path, 'r', encoding='utf-8') as file:
@@ -57,54 +62,77 @@ def compute_expected_code_length(codes: Dict[str, str], char_freqs: Dict[str, in
         expected_length += p * len(code)
     return expected_length
 
-def encode_file(input_file_path: str, output_file_path: str, codes: Dict[str, str]) -> None:
-    codes_json = json.dumps(codes)
+def encode_file(input_file_path: str, output_file_path: str, codes: Dict[str, str], canonical: bool = False,
+                input_text: str = None) -> None:
+    with STATS.stage('codes'):
+        if canonical:
+            lengths = code_lengths(codes)
+            codes = code_strings(canonical_codes(lengths))
+        else:
+            codes_json = json.dumps(codes)
     
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        input_text = file.read()
+    if input_text is None:
+        with STATS.stage('read'), open(input_file_path, 'r', encoding='utf-8') as file:
+            input_text = file.read()
     
-    encoded_text = ''
-    for char in input_text:
-        encoded_text += codes.get(char, '')
-    
-    encoded_length = len(encoded_text)
+    with STATS.stage('encode'):
+        int_codes = {char: (int(code, 2) if code else 0, len(code)) for char, code in codes.items()}
+        if vectorized.available(int_codes):
+            encoded_data, encoded_length = vectorized.pack_codes(input_text, int_codes)
+        else:
+            encoded_text = ''
+            for char in input_text:
+                encoded_text += codes.get(char, '')
+            encoded_length = len(encoded_text)
+
+            byte_array = bytearray()
+            for i in range(0, len(encoded_text), 8):
+                byte = encoded_text[i:i+8]
+                if len(byte) < 8:
+                    byte = byte.ljust(8, '0')
+                byte_array.append(int(byte, 2))
+            encoded_data = bytes(byte_array)
+    STATS.count('bits', encoded_length)
     
-    with open(output_file_path, 'wb') as output_file:
-        output_file.write(len(codes_json).to_bytes(4, byteorder='big'))
-        output_file.write(encoded_length.to_bytes(4, byteorder='big'))
+    with STATS.stage('write'), open(output_file_path, 'wb') as output_file:
+        if canonical:
+            write_canonical_header(output_file, lengths, encoded_length)
+        else:
+            output_file.write(len(codes_json).to_bytes(4, byteorder='big'))
+            output_file.write(encoded_length.to_bytes(4, byteorder='big'))
+            output_file.write(codes_json.encode("utf-8"))
         
-        output_file.write(codes_json.encode("utf-8"))
-        
-        byte_array = bytearray()
-        for i in range(0, len(encoded_text), 8):
-            byte = encoded_text[i:i+8]
-            if len(byte) < 8:
-                byte = byte.ljust(8, '0')
-            byte_array.append(int(byte, 2))
-        output_file.write(byte_array)
-
-def compress(input_file_path: str, output_file_path: str) -> None:
-    character_fre_dict = count_character_frequencies(input_file_path)
-    print(character_fre_dict)
+        output_file.write(encoded_data)
+        STATS.count('output_bytes', output_file.tell())
+
+def compress(input_file_path: str, output_file_path: str, canonical: bool = False) -> None:
+    with STATS.stage('read'), open(input_file_path, 'r', encoding='utf-8') as file:
+        input_text = file.read()
+    STATS.count('symbols', len(input_text))
+    with STATS.stage('count'):
+        character_fre_dict = dict(analyze_text(input_text, histogram_only=True).histogram)
+    STATS.count('distinct_symbols', len(character_fre_dict))
     
-    shannon_fano_codes = compute_shannon_fano_codes(character_fre_dict)
-    print("Shannon-Fano Codes:")
-    for char, code in shannon_fano_codes.items():
-        print(f"'{char}': {code}")
+    with STATS.stage('codes'):
+        shannon_fano_codes = compute_shannon_fano_codes(character_fre_dict)
     
     expected_length = compute_expected_code_length(shannon_fano_codes, character_fre_dict)
-    print(f"Expected Shannon-Fano Code Length: {expected_length:.2f} bits per symbol")
+    STATS.set('expected_bits_per_symbol', expected_length)
 
-    encode_file(input_file_path, output_file_path, shannon_fano_codes)
+    encode_file(input_file_path, output_file_path, shannon_fano_codes, canonical, input_text)
 
-def main(input_file_path: str, output_file_path: str) -> None:
-    compress(input_file_path, output_file_path)
+def main(input_file_path: str, output_file_path: str, canonical: bool = False) -> None:
+    compress(input_file_path, output_file_path, canonical)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process some files.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--canonical', action='store_true', help='Store canonical code lengths instead of the JSON code table.')
+
+    add_arguments(parser)
 
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.canonical)
@@ -3,6 +3,11 @@ import json
 from typing import Dict
 
 from bitio import InputBitStream
+from blockindex import read_index
+from canonical import BLOCK_MAGIC, CANONICAL_MAGIC, canonical_codes, read_canonical_header, read_code_lengths
+from hufftable import DecodeTable
+from parallel import map_ordered, resolve_workers
+from stats import STATS, add_arguments, reporting
 
 
 def decoding(input_file_path: str) -> Dict[int, str]:
@@ -19,33 +24,137 @@ def decoding(input_file_path: str) -> Dict[int, str]:
     }
 
 
-def decode_file(input_file_path, output_file_path):
+def decode_block(input_file):
+    """
+    Decode the next frame of a block-framed file (see compress.encode_block).
+
+    Args:
+        input_file (file object): A binary file object positioned at the start of a frame.
+
+    Returns:
+        bytes: The block's original bytes, or None at the terminating frame.
+    """
+    raw_size = int.from_bytes(input_file.read(4), byteorder='big')     # 读取本块原始大小, 0 表示结束
+    if raw_size == 0:
+        return None
+    encoded_bits = int.from_bytes(input_file.read(4), byteorder='big')
+    lengths, width = read_code_lengths(input_file)                      # 读取本块码长表
+    payload = input_file.read((encoded_bits + 7) // 8)
+    decode_table = DecodeTable(canonical_codes(lengths), root_bits=None)
+    if width == 0:                                                      # 字节模式: 直接输出字节值
+        block = b''.join(bytes(symbols) for symbols in decode_table.decode(payload, encoded_bits))
+    else:
+        block = b''.join(''.join(symbols).encode('utf-8') for symbols in decode_table.decode(payload, encoded_bits))
+    if len(block) != raw_size:
+        raise ValueError("Decoded block size does not match its header!")
+    return block
+
+
+def decode_blocks(input_file, output_file):
+    """
+    Decode a block-framed stream frame by frame, holding at most one block in memory.
+
+    Args:
+        input_file (file object): A binary file object positioned right after BLOCK_MAGIC.
+        output_file (file object): A binary file object receiving the decoded bytes.
+    """
+    block = decode_block(input_file)
+    while block is not None:
+        output_file.write(block)
+        block = decode_block(input_file)
+
+
+def decode_block_at(task):
+    """
+    Decode one block and write it at its final offset of the preallocated output file (worker entry point).
+
+    Args:
+        task (tuple): ``(input_file_path, frame_offset, output_file_path, raw_offset)``.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    input_file_path, frame_offset, output_file_path, raw_offset = task
+    with open(input_file_path, 'rb') as input_file:
+        input_file.seek(frame_offset)
+        block = decode_block(input_file)
+    with open(output_file_path, 'r+b') as output_file:
+        output_file.seek(raw_offset)
+        output_file.write(block)
+    return len(block)
+
+
+def decode_blocks_parallel(input_file_path, output_file_path, index, workers=0):
+    """
+    Decode the blocks listed in a seek table concurrently.
+
+    The output file is first extended to its final size, then every worker decodes a block and writes it
+    directly at its offset, so no block has to pass back through the parent process.
+
+    Args:
+        input_file_path (str): The block-framed compressed file.
+        output_file_path (str): The decompressed file to create.
+        index (list): Entries returned by blockindex.read_index.
+        workers (int): Number of worker processes, 0 for one per CPU core.
+    """
+    total_size = sum(entry.raw_size for entry in index)
+    with open(output_file_path, 'wb') as output_file:
+        output_file.truncate(total_size)                                # 预分配输出文件
+    tasks = ((input_file_path, entry.frame_offset, output_file_path, entry.raw_offset) for entry in index)
+    for _ in map_ordered(decode_block_at, tasks, workers):
+        pass
+
+
+def decode_file(input_file_path, output_file_path, workers=1):
     with open(input_file_path, 'rb') as file:
-        codes_length = int.from_bytes(file.read(4), byteorder='big')    # 读取编码表长度
-        encoded_length = int.from_bytes(file.read(4), byteorder='big')  # 读取有效编码长度
-        # print(codes_length, encoded_length)
-        codes_json = file.read(codes_length)                            # 读取编码表
-        encoded_data = file.read(encoded_length)                        # 读取有效编码数据
-        
-        bit_string = ''.join(f'{byte:08b}' for byte in encoded_data)    # 将编码数据转换为二进制字符串
-
-        huffman_codes = json.loads(codes_json.decode('utf-8'))          # 将编码表转换为字典
-        # print(codes_json)
-        decode_map = {code: char for char, code in huffman_codes.items()}# 反转霍夫曼编码表
-
-    current_code = ""
-    decoded_text = ""
-    sum = 0
-    for bit in bit_string:
-        current_code += bit
-        if sum < encoded_length:
-            if current_code in decode_map:
-                decoded_text += decode_map[current_code]
-                current_code = ""  # 重置当前编码字符串
-        sum = sum + 1
-    
-    with open(output_file_path, 'wb') as file:
-        file.write(decoded_text.encode('utf-8'))
+        magic = file.read(4)
+        if magic == BLOCK_MAGIC:                                        # 分块格式
+            index = read_index(file) if resolve_workers(workers) > 1 else None
+            with STATS.stage('decode'):                                 # 读取、解码与写入交错进行, 合计为一个阶段
+                if index is not None:                                   # 有块索引: 多进程并行解码
+                    decode_blocks_parallel(input_file_path, output_file_path, index, workers)
+                    STATS.count('blocks', len(index))
+                    STATS.count('output_bytes', sum(entry.raw_size for entry in index))
+                    return
+                file.seek(len(BLOCK_MAGIC))
+                with open(output_file_path, 'wb') as output_file:       # 逐块顺序解码
+                    decode_blocks(file, output_file)
+                    STATS.count('output_bytes', output_file.tell())
+            return
+        with STATS.stage('read'):
+            if magic == CANONICAL_MAGIC:                                # 范式霍夫曼文件: 由码长重建编码表
+                lengths, width, encoded_length = read_canonical_header(file)
+                codes = canonical_codes(lengths)
+            else:
+                codes_length = int.from_bytes(magic, byteorder='big')           # 读取编码表长度
+                encoded_length = int.from_bytes(file.read(4), byteorder='big')  # 读取有效编码长度
+                codes_json = file.read(codes_length)                            # 读取编码表
+                huffman_codes = json.loads(codes_json.decode('utf-8'))          # 将编码表转换为字典
+                codes = {char: (int(code, 2), len(code)) for char, code in huffman_codes.items() if code}
+                width = 1
+            encoded_data = file.read((encoded_length + 7) // 8)         # 读取有效编码数据
+    STATS.count('bits', encoded_length)
+    STATS.count('distinct_symbols', len(codes))
+
+    with STATS.stage('tree'):
+        decode_table = DecodeTable(codes, root_bits=None)               # 构建多比特查找表 (码长受限时为单级表)
+
+    with STATS.stage('decode'), open(output_file_path, 'wb') as file:
+        first = True
+        for symbols in decode_table.decode(encoded_data, encoded_length):  # 每次查表解出一个完整码字
+            STATS.count('symbols', len(symbols))
+            if width == 0:                                              # 字节模式: 符号即字节值, 无需编码
+                file.write(bytes(symbols))
+                continue
+            if width == 2:                                              # 重叠字符对: 首对完整输出, 其余只取第二个字符
+                text = ''.join(pair[1] for pair in symbols)
+                if first:
+                    text = symbols[0][0] + text
+            else:
+                text = ''.join(symbols)
+            first = False
+            file.write(text.encode('utf-8'))
+        STATS.count('output_bytes', file.tell())
 
 
 def decompress(input_file_path: str, output_file_path: str) -> None:
@@ -77,8 +186,8 @@ def decompress(input_file_path: str, output_file_path: str) -> None:
 # 分割线以下你仅可以修改main函数的具体内容，但请保证main函数的输入参数为
 # ’输入文件路径‘(存储压缩后文件的路径名)和’输出文件路径‘(存储解压后文件的路径名)，两者顺序不可调换。
 
-def main(input_file_path: str, output_file_path: str) -> None:
-    decode_file(input_file_path, output_file_path)
+def main(input_file_path: str, output_file_path: str, workers: int = 1) -> None:
+    decode_file(input_file_path, output_file_path, workers)
     # decompress(input_file_path, output_file_path)
 
 
@@ -86,7 +195,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process some files.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Decode blocks of a block-framed file in this many processes (0 = one per CPU core).')
+
+    add_arguments(parser)                                               # --stats 与 --profile
 
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.workers)
@@ -0,0 +1,65 @@
+import argparse
+
+from canonical import CONTEXT_MAGIC, canonical_codes, read_context_tables, read_varint
+from hufftable import DecodeTable, decode_contexts
+from stats import STATS, add_arguments, reporting
+
+
+def build_decode_tables(context_lengths: dict) -> dict:
+    """
+    Build one lookup table per context from the code lengths stored by compress_2.
+
+    Returns:
+        dict: Previous character -> DecodeTable, or the lone successor character for contexts without a code.
+    """
+    tables = {}
+    for context, lengths in context_lengths.items():
+        if len(lengths) == 1:
+            tables[context] = next(iter(lengths))
+        else:
+            tables[context] = DecodeTable(canonical_codes(lengths))
+    return tables
+
+
+def read_context_stream(input_file):
+    """
+    Decode the stream written by ``compress_2.write_context_stream``, which follows the magic.
+
+    Yields:
+        list: Consecutive runs of decoded characters.
+    """
+    char_count = read_varint(input_file)
+    if not char_count:
+        return
+    first = read_varint(input_file)
+    alphabet, context_lengths = read_context_tables(input_file)
+    tables = build_decode_tables(context_lengths)
+    yield from decode_contexts(tables, alphabet[first], char_count, input_file.read())
+
+
+def decompress(input_file_path: str, output_file_path: str) -> None:
+    with open(input_file_path, 'rb') as input_file, open(output_file_path, 'wb') as output_file:
+        if input_file.read(len(CONTEXT_MAGIC)) != CONTEXT_MAGIC:
+            raise ValueError("Not an order-1 context Huffman file!")
+        with STATS.stage('decode'):
+            for symbols in read_context_stream(input_file):
+                STATS.count('symbols', len(symbols))
+                output_file.write(''.join(symbols).encode('utf-8'))
+        STATS.count('output_bytes', output_file.tell())
+
+
+def main(input_file_path: str, output_file_path: str) -> None:
+    decompress(input_file_path, output_file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Process some files.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output)
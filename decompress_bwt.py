@@ -0,0 +1,86 @@
+import argparse
+
+from bitio import InputBitStream
+from bwt import inverse_transform, move_to_front_inverse
+from canonical import BWT_MAGIC, canonical_codes, read_dense_lengths, read_varint
+from compress_bwt import ZERO_RUN
+from hufftable import DecodeTable
+from rle import extra_bits, symbol_length
+from stats import STATS, add_arguments, reporting
+
+
+def decode_ranks(payload, count, table):
+    """
+    Decode count symbols of a frame back into the MTF ranks, expanding the zero runs.
+
+    Returns:
+        bytearray: The ranks.
+    """
+    ranks = bytearray()
+    bit_stream = InputBitStream(payload)
+    read_bits = bit_stream.read_bits
+    read_symbol = table.read_symbol
+    for _ in range(count):
+        symbol = read_symbol(bit_stream)
+        if symbol < ZERO_RUN:
+            ranks.append(symbol)
+            continue
+        symbol -= ZERO_RUN
+        bits = extra_bits(symbol)
+        ranks += bytes(symbol_length(symbol, read_bits(bits) if bits else 0))
+    return ranks
+
+
+def decode_block(input_file, raw_size):
+    """
+    Decode the rest of a frame written by ``compress_bwt.encode_block`` once its raw size has been read.
+
+    Returns:
+        bytes: The original block.
+
+    Raises:
+        ValueError: If the block does not decode to raw_size bytes.
+    """
+    primary = read_varint(input_file)
+    table = DecodeTable(canonical_codes(read_dense_lengths(input_file)), root_bits=None)
+    count = read_varint(input_file)
+    payload = input_file.read(read_varint(input_file))
+    ranks = decode_ranks(payload, count, table)
+    if len(ranks) != raw_size:
+        raise ValueError("Block size mismatch!")
+    return inverse_transform(move_to_front_inverse(ranks), primary)
+
+
+def decompress(input_file_path, output_file_path):
+    """
+    Decompress a file written by compress_bwt, one block at a time.
+
+    Raises:
+        ValueError: If the file does not start with ``BWT_MAGIC``.
+    """
+    with open(input_file_path, 'rb') as input_file, open(output_file_path, 'wb') as output_file:
+        if input_file.read(len(BWT_MAGIC)) != BWT_MAGIC:
+            raise ValueError("Not a BWT file!")
+        with STATS.stage('decode'):
+            raw_size = read_varint(input_file)
+            while raw_size:
+                output_file.write(decode_block(input_file, raw_size))
+                STATS.count('blocks')
+                raw_size = read_varint(input_file)
+        STATS.count('output_bytes', output_file.tell())
+
+
+def main(input_file_path, output_file_path):
+    decompress(input_file_path, output_file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decompress files written by compress_bwt.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output)
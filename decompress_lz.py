@@ -0,0 +1,97 @@
+import argparse
+from array import array
+
+from bitio import InputBitStream
+from canonical import LZ_MAGIC, canonical_codes, read_dense_lengths, read_varint
+from compress_lz import LITERALS
+from hufftable import DecodeTable
+from lz77 import WINDOW_SIZE, expand
+from rle import DIRECT_LENGTHS, extra_bits, symbol_length
+from stats import STATS, add_arguments, reporting
+
+
+def read_tables(input_file):
+    """
+    Read the two code-length tables at the start of a frame written by ``compress_lz.encode_block``.
+
+    Returns:
+        tuple: ``(litlen_table, distance_table)`` DecodeTables, the distance table being None for a block
+        without matches.
+    """
+    litlen_lengths = read_dense_lengths(input_file)
+    distance_lengths = read_dense_lengths(input_file)
+    litlen_table = DecodeTable(canonical_codes(litlen_lengths), root_bits=None)
+    distance_table = DecodeTable(canonical_codes(distance_lengths), root_bits=None) if distance_lengths else None
+    return litlen_table, distance_table
+
+
+def decode_tokens(payload, count, litlen_table, distance_table):
+    """
+    Decode count tokens back into the parallel arrays of ``MatchFinder.tokenize``.
+
+    Returns:
+        tuple: ``(lengths, values)`` arrays.
+    """
+    lengths = array('H')
+    values = array('L')
+    bit_stream = InputBitStream(payload)
+    read_bits = bit_stream.read_bits
+    read_litlen = litlen_table.read_symbol
+    for _ in range(count):
+        symbol = read_litlen(bit_stream)
+        if symbol < LITERALS:
+            lengths.append(0)
+            values.append(symbol)
+            continue
+        symbol -= LITERALS
+        length = symbol if symbol <= DIRECT_LENGTHS else symbol_length(symbol, read_bits(extra_bits(symbol)))
+        symbol = distance_table.read_symbol(bit_stream)
+        distance = symbol if symbol <= DIRECT_LENGTHS else symbol_length(symbol, read_bits(extra_bits(symbol)))
+        lengths.append(length)
+        values.append(distance)
+    return lengths, values
+
+
+def decompress(input_file_path, output_file_path):
+    """
+    Decompress a file written by compress_lz, keeping only the last WINDOW_SIZE bytes of history in memory.
+
+    Raises:
+        ValueError: If the file does not start with ``LZ_MAGIC`` or a block does not decode to its raw size.
+    """
+    with open(input_file_path, 'rb') as input_file, open(output_file_path, 'wb') as output_file:
+        if input_file.read(len(LZ_MAGIC)) != LZ_MAGIC:
+            raise ValueError("Not an LZ77 Huffman file!")
+        with STATS.stage('decode'):
+            history = bytearray()
+            raw_size = read_varint(input_file)
+            while raw_size:
+                litlen_table, distance_table = read_tables(input_file)
+                count = read_varint(input_file)
+                payload = input_file.read(read_varint(input_file))
+                lengths, values = decode_tokens(payload, count, litlen_table, distance_table)
+                start = len(history)
+                expand(history, lengths, values)
+                if len(history) - start != raw_size:
+                    raise ValueError("Block size mismatch!")
+                output_file.write(history[start:])
+                STATS.count('blocks')
+                del history[:-WINDOW_SIZE]
+                raw_size = read_varint(input_file)
+        STATS.count('output_bytes', output_file.tell())
+
+
+def main(input_file_path, output_file_path):
+    decompress(input_file_path, output_file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decompress files written by compress_lz.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output)
@@ -0,0 +1,289 @@
+import argparse
+import math
+import os
+import random
+from collections import Counter
+
+from analysis import DEFAULT_CHUNK_SIZE, utf8_boundary
+import vectorized
+
+np = vectorized.np
+
+DEFAULT_MAX_ORDER = 3
+DEFAULT_SAMPLE_BLOCK = 1 << 20  # bytes
+HASH_BASE = 0x100000001B3  # FNV-1a 64-bit prime
+HASH_MASK = (1 << 64) - 1
+Z_95 = 1.96
+
+
+def sum_count_log(counts):
+    """
+    Returns:
+        float: sum(c * log2(c)) over the non-zero counts of a Counter or an array.
+    """
+    if np is not None and isinstance(counts, np.ndarray):
+        counts = counts[counts > 0].astype(np.float64)
+        return float((counts * np.log2(counts)).sum())
+    return sum(count * math.log2(count) for count in counts.values() if count)
+
+
+class OrderKEstimator:
+    """
+    Streaming estimator of the empirical conditional entropies H_0..H_k of a text.
+
+    H_j is the entropy of a character given the j characters before it:
+    ``H_j = (sum_ctx c(ctx) log2 c(ctx) - sum_ctx,x c(ctx x) log2 c(ctx x)) / N_j``. For every order the
+    estimator keeps the counts of the contexts and of the (context, character) pairs. Chunks are fed with
+    ``update``; the last k characters are carried over so that contexts spanning chunks are counted.
+
+    With ``hash_bits`` set, contexts are hashed into fixed tables of ``1 << hash_bits`` counters per order, so
+    memory no longer grows with the number of distinct contexts; collisions merge contexts and bias the
+    estimate downwards for large k.
+
+    Examples:
+        # Example usage:
+        estimator = OrderKEstimator(max_order=2)
+        estimator.update('abracadabra')
+        estimator.entropies()  # [H_0, H_1, H_2]
+    """
+
+    def __init__(self, max_order=DEFAULT_MAX_ORDER, hash_bits=None):
+        """
+        Args:
+            max_order (int): The largest order k.
+            hash_bits (int): If set, count hashed contexts in tables of this many bits.
+        """
+        self.max_order = max_order
+        self.hash_bits = hash_bits
+        if hash_bits and np is not None:
+            self.contexts = [np.zeros(1 << hash_bits, dtype=np.int64) for _ in range(max_order + 1)]
+            self.joint = [np.zeros(1 << hash_bits, dtype=np.int64) for _ in range(max_order + 1)]
+        else:
+            self.contexts = [Counter() for _ in range(max_order + 1)]
+            self.joint = [Counter() for _ in range(max_order + 1)]
+        self.tail = ''
+
+    def reset_context(self):
+        """
+        Forget the carried characters, e.g. before feeding a chunk that does not follow the previous one.
+        """
+        self.tail = ''
+
+    def update(self, text):
+        """
+        Add the next chunk of text.
+
+        Args:
+            text (str): The chunk.
+        """
+        if not text:
+            return
+        data = self.tail + text
+        if np is not None:
+            self._update_arrays(data, len(self.tail))
+        else:
+            self._update_counters(data, len(self.tail))
+        self.tail = data[-self.max_order:] if self.max_order else ''
+
+    def _update_counters(self, data, start):
+        shift = 64 - self.hash_bits if self.hash_bits else None
+        for order in range(self.max_order + 1):
+            first = max(start, order)
+            contexts = (data[position - order:position] for position in range(first, len(data)))
+            grams = (data[position - order:position + 1] for position in range(first, len(data)))
+            if shift is not None:
+                contexts = (string_hash(context) >> shift for context in contexts)
+                grams = (string_hash(gram) >> shift for gram in grams)
+            self.contexts[order].update(contexts)
+            self.joint[order].update(grams)
+
+    def _update_arrays(self, data, start):
+        symbols = np.frombuffer(data.encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+        base = np.uint64(HASH_BASE)
+        for order in range(self.max_order + 1):
+            first = max(start, order)
+            if first >= len(symbols):
+                continue
+            context_hash = np.zeros(len(symbols) - first, dtype=np.uint64)
+            for offset in range(order, 0, -1):
+                context_hash = context_hash * base + symbols[first - offset:len(symbols) - offset] + np.uint64(1)
+            joint_hash = context_hash * base + symbols[first:] + np.uint64(1)
+            for table, hashes in ((self.contexts[order], context_hash), (self.joint[order], joint_hash)):
+                hashes = mix_hash(hashes)
+                if self.hash_bits:
+                    table += np.bincount((hashes >> np.uint64(64 - self.hash_bits)).astype(np.int64),
+                                         minlength=len(table))
+                else:
+                    keys, counts = np.unique(hashes, return_counts=True)
+                    table.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def merge(self, other):
+        """
+        Add the counts of another estimator with the same settings.
+
+        Args:
+            other (OrderKEstimator): The estimator to merge.
+        """
+        for order in range(self.max_order + 1):
+            if isinstance(self.joint[order], Counter):
+                self.contexts[order].update(other.contexts[order])
+                self.joint[order].update(other.joint[order])
+            else:
+                self.contexts[order] += other.contexts[order]
+                self.joint[order] += other.joint[order]
+
+    def entropies(self):
+        """
+        Returns:
+            list: H_0..H_k in bits per character (0.0 for orders without any sample).
+        """
+        result = []
+        for order in range(self.max_order + 1):
+            joint = self.joint[order]
+            samples = int(joint.sum()) if np is not None and isinstance(joint, np.ndarray) else sum(joint.values())
+            if not samples:
+                result.append(0.0)
+                continue
+            result.append((sum_count_log(self.contexts[order]) - sum_count_log(joint)) / samples)
+        return result
+
+
+def mix_hash(hashes):
+    """
+    Spread the bits of 64-bit polynomial hashes (splitmix64 finalizer) before they are truncated to a table.
+    """
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def string_hash(text):
+    """
+    Hash a string like the NumPy path of OrderKEstimator: a polynomial hash over the code points, mixed with
+    the splitmix64 finalizer. Unlike the builtin ``hash``, the value does not change between processes.
+
+    Returns:
+        int: A 64-bit hash.
+    """
+    value = 0
+    for char in text:
+        value = (value * HASH_BASE + ord(char) + 1) & HASH_MASK
+    value ^= value >> 30
+    value = (value * 0xBF58476D1CE4E5B9) & HASH_MASK
+    value ^= value >> 27
+    value = (value * 0x94D049BB133111EB) & HASH_MASK
+    return value ^ (value >> 31)
+
+
+def estimate_file(input_file_path, max_order=DEFAULT_MAX_ORDER, hash_bits=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compute H_0..H_k of a UTF-8 text file in one streaming pass, reading newlines like analysis.analyze_file.
+
+    Args:
+        input_file_path (str): The file to analyze.
+        max_order (int): The largest order k.
+        hash_bits (int): Count hashed contexts in tables of this many bits, see OrderKEstimator.
+        chunk_size (int): Number of characters read at a time.
+
+    Returns:
+        list: H_0..H_k in bits per character.
+    """
+    estimator = OrderKEstimator(max_order, hash_bits)
+    with open(input_file_path, 'r', encoding='utf-8') as file:
+        chunk = file.read(chunk_size)
+        while chunk:
+            estimator.update(chunk)
+            chunk = file.read(chunk_size)
+    return estimator.entropies()
+
+
+def read_sample_block(file, offset, block_size):
+    """
+    Read about block_size bytes at offset, trimmed to whole UTF-8 characters, with universal newlines.
+
+    Returns:
+        str: The decoded block.
+    """
+    file.seek(offset)
+    data = file.read(block_size)
+    start = 0
+    while start < min(len(data), 4) and data[start] & 0xC0 == 0x80:  # Skip a character cut at the start
+        start += 1
+    text = data[start:utf8_boundary(data)].decode('utf-8', errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def estimate_sample(input_file_path, fraction, max_order=DEFAULT_MAX_ORDER, hash_bits=None,
+                    block_size=DEFAULT_SAMPLE_BLOCK, seed=None):
+    """
+    Estimate H_0..H_k from a random sample of blocks instead of the whole file.
+
+    About ``fraction`` of the file's blocks (at least two) are drawn without replacement. The estimate is
+    computed from the pooled counts of the sampled blocks; the error bound is a 95% half-width
+    ``1.96 * s / sqrt(m) * sqrt(1 - m / M)`` from the spread ``s`` of the per-block estimates over the ``m``
+    sampled of ``M`` blocks. It reflects sampling variability only: high-order estimates from small blocks
+    remain biased low, so use blocks much larger than the number of distinct order-k contexts.
+
+    Args:
+        input_file_path (str): The file to analyze.
+        fraction (float): Share of the blocks to read, in (0, 1].
+        max_order (int): The largest order k.
+        hash_bits (int): Count hashed contexts in tables of this many bits, see OrderKEstimator.
+        block_size (int): Size in bytes of a sampled block.
+        seed (int): Seed of the block selection, for reproducible estimates.
+
+    Returns:
+        list: ``(estimate, half_width)`` for H_0..H_k in bits per character.
+    """
+    file_size = os.path.getsize(input_file_path)
+    block_count = max(1, math.ceil(file_size / block_size))
+    sample_count = min(block_count, max(2, math.ceil(fraction * block_count)))
+    offsets = sorted(random.Random(seed).sample(range(block_count), sample_count))
+
+    pooled = OrderKEstimator(max_order, hash_bits)
+    per_block = []
+    with open(input_file_path, 'rb') as file:
+        for block in offsets:
+            estimator = OrderKEstimator(max_order, hash_bits)
+            estimator.update(read_sample_block(file, block * block_size, block_size))
+            per_block.append(estimator.entropies())
+            pooled.merge(estimator)
+
+    result = []
+    correction = math.sqrt(1 - sample_count / block_count)
+    for order, estimate in enumerate(pooled.entropies()):
+        values = [entropies[order] for entropies in per_block]
+        half_width = 0.0
+        if len(values) > 1:
+            mean = sum(values) / len(values)
+            deviation = math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
+            half_width = Z_95 * deviation / math.sqrt(len(values)) * correction
+        result.append((estimate, half_width))
+    return result
+
+
+def main(input_file_path, max_order=DEFAULT_MAX_ORDER, hash_bits=None, sample=None,
+         block_size=DEFAULT_SAMPLE_BLOCK, seed=None):
+    if sample:
+        estimates = estimate_sample(input_file_path, sample, max_order, hash_bits, block_size, seed)
+    else:
+        estimates = [(estimate, None) for estimate in estimate_file(input_file_path, max_order, hash_bits)]
+    for order, (estimate, half_width) in enumerate(estimates):
+        bound = '' if half_width is None else f' (± {half_width:.4f})'
+        print(f"H{order}: {estimate:.4f} bits per symbol{bound}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Estimate order-k conditional entropies of a text file.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--order', '-k', type=int, default=DEFAULT_MAX_ORDER, help='Largest context order.')
+    parser.add_argument('--hash-bits', type=int, help='Count hashed contexts in tables of this many bits.')
+    parser.add_argument('--sample', type=float, help='Estimate from this fraction of the file, e.g. 0.01.')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_SAMPLE_BLOCK, help='Sampled block size in bytes.')
+    parser.add_argument('--seed', type=int, help='Seed of the sampled block selection.')
+
+    args = parser.parse_args()
+
+    main(args.input, args.order, args.hash_bits, args.sample, args.block_size, args.seed)
@@ -0,0 +1,158 @@
+import argparse
+import sys
+from bisect import bisect_right
+
+from blockindex import read_index
+from canonical import BLOCK_MAGIC
+from decompress import decode_block
+
+
+def open_index(input_file):
+    """
+    Read the seek table of a block-framed file.
+
+    Args:
+        input_file (file object): A seekable binary file object.
+
+    Returns:
+        list: The BlockEntry list of the file.
+
+    Raises:
+        ValueError: If the file is not block-framed or has no seek table.
+    """
+    input_file.seek(0)
+    if input_file.read(len(BLOCK_MAGIC)) != BLOCK_MAGIC:
+        raise ValueError("Not a block-framed file; compress it with --block-size.")
+    index = read_index(input_file)
+    if index is None:
+        raise ValueError("The file has no seek table.")
+    return index
+
+
+def read_block(input_file, entry):
+    """
+    Decode the block described by a seek table entry.
+
+    Returns:
+        bytes: The decompressed block.
+    """
+    input_file.seek(entry.frame_offset)
+    return decode_block(input_file)
+
+
+def nth_line_end(block, count):
+    """
+    Find the position right after the count-th newline of a block.
+
+    Returns:
+        int: The position, or len(block) if the block has fewer newlines.
+    """
+    position = 0
+    for _ in range(count):
+        position = block.find(b'\n', position) + 1
+        if position == 0:
+            return len(block)
+    return position
+
+
+def extract_bytes(input_file_path, start, end=None):
+    """
+    Decompress the byte range [start, end) of a block-framed file, decoding only the blocks that cover it.
+
+    Args:
+        input_file_path (str): The compressed file.
+        start (int): First decompressed byte offset.
+        end (int): Offset after the last byte, None for the end of the file.
+
+    Yields:
+        bytes: Consecutive pieces of the range.
+    """
+    with open(input_file_path, 'rb') as input_file:
+        index = open_index(input_file)
+        first = max(bisect_right([entry.raw_offset for entry in index], start) - 1, 0)
+        for entry in index[first:]:
+            if end is not None and entry.raw_offset >= end:
+                break
+            block = read_block(input_file, entry)
+            piece_start = max(start - entry.raw_offset, 0)
+            piece_end = len(block) if end is None else min(end - entry.raw_offset, len(block))
+            if piece_start < piece_end:
+                yield block[piece_start:piece_end]
+
+
+def extract_lines(input_file_path, first_line, last_line=None):
+    """
+    Decompress lines first_line..last_line (1-based, inclusive) of a block-framed file, decoding only the
+    blocks that cover them.
+
+    Args:
+        input_file_path (str): The compressed file.
+        first_line (int): First line number, starting at 1.
+        last_line (int): Last line number, None for the end of the file.
+
+    Yields:
+        bytes: Consecutive pieces of the lines, newlines included.
+
+    Raises:
+        ValueError: If the seek table has no newline counts.
+    """
+    with open(input_file_path, 'rb') as input_file:
+        index = open_index(input_file)
+        if index and index[0].newlines is None:
+            raise ValueError("The seek table has no newline counts; recompress the file.")
+        skip = first_line - 1  # Newlines before the first wanted byte
+        first = 0
+        if skip > 0:
+            first = bisect_right([entry.line_offset + entry.newlines for entry in index], skip - 1)
+        for entry in index[first:]:
+            if last_line is not None and entry.line_offset >= last_line:
+                break
+            block = read_block(input_file, entry)
+            piece_start = nth_line_end(block, skip - entry.line_offset) if skip > entry.line_offset else 0
+            piece_end = len(block)
+            if last_line is not None and last_line - entry.line_offset <= entry.newlines:
+                piece_end = nth_line_end(block, last_line - entry.line_offset)
+            if piece_start < piece_end:
+                yield block[piece_start:piece_end]
+
+
+def parse_range(text):
+    """
+    Parse a 'START:END' command-line range; either side may be empty.
+
+    Returns:
+        tuple: ``(start, end)`` with None for an empty side.
+    """
+    start, _, end = text.partition(':')
+    return (int(start) if start else None), (int(end) if end else None)
+
+
+def main(input_file_path, output_file_path=None, byte_range=None, line_range=None):
+    if line_range is not None:
+        first_line, last_line = line_range
+        pieces = extract_lines(input_file_path, first_line or 1, last_line)
+    else:
+        start, end = byte_range or (None, None)
+        pieces = extract_bytes(input_file_path, start or 0, end)
+
+    if output_file_path is None:
+        for piece in pieces:
+            sys.stdout.buffer.write(piece)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output_file_path, 'wb') as output_file:
+            for piece in pieces:
+                output_file.write(piece)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decompress part of a block-framed file.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, help='Output file path (default: standard output).')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--bytes', '-c', type=parse_range, help='Byte range START:END, 0-based, END exclusive.')
+    group.add_argument('--lines', '-n', type=parse_range, help='Line range FIRST:LAST, 1-based, LAST inclusive.')
+
+    args = parser.parse_args()
+
+    main(args.input, args.output, args.bytes, args.lines)
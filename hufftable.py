@@ -0,0 +1,222 @@
+ROOT_BITS = 10
+MAX_ROOT_BITS = 15  # Longest code still decoded with a single table when root_bits is None
+CHUNK_SYMBOLS = 1 << 16
+
+
+class DecodeTable:
+    """
+    Two-level lookup table resolving a whole prefix codeword per step.
+
+    The first-level table is indexed by the next ``root_bits`` bits of the stream. Codes no longer than
+    ``root_bits`` are replicated over every index they prefix; longer codes share one entry per distinct
+    ``root_bits`` prefix which points to a second-level table indexed by the bits that follow.
+
+    Examples:
+        # Example usage:
+        table = DecodeTable({'a': (0b0, 1), 'b': (0b10, 2), 'c': (0b11, 2)})
+        for symbols in table.decode(b'\\x58', 6):
+            print(''.join(symbols))  # abca
+    """
+
+    def __init__(self, codes, root_bits=ROOT_BITS):
+        """
+        Initialize the DecodeTable instance.
+
+        Args:
+            codes (dict): Maps each symbol to a ``(code, length)`` pair, ``code`` being the integer value of
+                the codeword bits (most significant bit first).
+            root_bits (int): Number of bits indexing the first-level table. It is lowered to the longest code
+                length when all codes are shorter. None picks a single-level table (one lookup per symbol) when
+                the longest code has at most ``MAX_ROOT_BITS`` bits, e.g. for length-limited codes, and
+                ``ROOT_BITS`` otherwise.
+
+        Raises:
+            ValueError: If a code has a non-positive length or does not fit in its length.
+        """
+        max_length = 0
+        for code, length in codes.values():
+            if length <= 0 or code >> length:
+                raise ValueError("Invalid code length!")
+            max_length = max(max_length, length)
+        if root_bits is None:
+            root_bits = max_length if max_length <= MAX_ROOT_BITS else ROOT_BITS
+        root_bits = min(root_bits, max_length)
+        self.root_bits = root_bits
+        self.max_length = max_length
+        self.entries = [None] * (1 << root_bits)
+
+        long_codes = {}
+        for symbol, (code, length) in codes.items():
+            if length <= root_bits:
+                shift = root_bits - length
+                start = code << shift
+                for index in range(start, start + (1 << shift)):
+                    self.entries[index] = (symbol, length)
+            else:
+                prefix = code >> (length - root_bits)
+                long_codes.setdefault(prefix, []).append((symbol, code, length))
+
+        for prefix, group in long_codes.items():
+            sub_bits = max(length for _, _, length in group) - root_bits
+            subtable = [None] * (1 << sub_bits)
+            for symbol, code, length in group:
+                suffix_bits = length - root_bits
+                shift = sub_bits - suffix_bits
+                start = (code & ((1 << suffix_bits) - 1)) << shift
+                for index in range(start, start + (1 << shift)):
+                    subtable[index] = (symbol, length)
+            self.entries[prefix] = (subtable, -sub_bits)
+
+    def decode(self, data, bit_length, chunk_symbols=CHUNK_SYMBOLS):
+        """
+        Decode the first ``bit_length`` bits of a byte buffer.
+
+        Args:
+            data (bytes-like): The encoded bytes, most significant bit first.
+            bit_length (int): Number of valid bits; decoding stops exactly there.
+            chunk_symbols (int): Maximum number of symbols yielded at once.
+
+        Yields:
+            list: Consecutive runs of decoded symbols.
+
+        Raises:
+            ValueError: If the bits do not form a valid codeword sequence.
+        """
+        need = self.max_length
+        lookup = self.lookup
+        acc = 0
+        acc_bits = 0
+        pos = 0
+        consumed = 0
+        symbols = []
+        append = symbols.append
+        while consumed < bit_length:
+            if acc_bits < need:
+                acc, acc_bits, pos = refill(data, pos, acc, acc_bits, need)
+            symbol, length = lookup(acc, acc_bits)
+            acc_bits -= length
+            acc &= (1 << acc_bits) - 1
+            consumed += length
+            append(symbol)
+            if len(symbols) >= chunk_symbols:
+                yield symbols
+                symbols = []
+                append = symbols.append
+        if consumed > bit_length:
+            raise ValueError("Encoded data ends inside a code!")
+        if symbols:
+            yield symbols
+
+    def lookup(self, acc, acc_bits):
+        """
+        Resolve the codeword at the top of a bit accumulator, without consuming it.
+
+        Args:
+            acc (int): Buffered bits, the next one being the most significant of the low ``acc_bits`` bits.
+            acc_bits (int): Number of buffered bits, at least ``max_length``.
+
+        Returns:
+            tuple: ``(symbol, length)`` of the codeword.
+
+        Raises:
+            ValueError: If the bits are not a valid codeword.
+        """
+        root_bits = self.root_bits
+        entry = self.entries[(acc >> (acc_bits - root_bits)) & ((1 << root_bits) - 1)]
+        if entry is None:
+            raise ValueError("Invalid code in encoded data!")
+        if entry[1] < 0:
+            subtable, sub_bits = entry[0], -entry[1]
+            entry = subtable[(acc >> (acc_bits - root_bits - sub_bits)) & ((1 << sub_bits) - 1)]
+            if entry is None:
+                raise ValueError("Invalid code in encoded data!")
+        return entry
+
+    def read_symbol(self, bit_stream):
+        """
+        Decode one symbol from an ``InputBitStream``, consuming exactly its codeword.
+
+        Args:
+            bit_stream (InputBitStream): The stream positioned at the start of a codeword.
+
+        Returns:
+            The decoded symbol.
+
+        Raises:
+            ValueError: If the next bits are not a valid codeword.
+            EOFError: If the stream ends inside the codeword.
+        """
+        entry = self.entries[bit_stream.peek_bits(self.root_bits)]
+        if entry is None:
+            raise ValueError("Invalid code in encoded data!")
+        symbol, length = entry
+        if length < 0:
+            sub_bits = -length
+            entry = symbol[bit_stream.peek_bits(self.root_bits + sub_bits) & ((1 << sub_bits) - 1)]
+            if entry is None:
+                raise ValueError("Invalid code in encoded data!")
+            symbol, length = entry
+        bit_stream.skip_bits(length)
+        return symbol
+
+
+def refill(data, pos, acc, acc_bits, need):
+    """
+    Append 56-bit slices of a byte buffer to a bit accumulator until it holds at least ``need`` bits.
+
+    Bytes past the end of the buffer read as zeros; the callers stop at their own bit count.
+
+    Returns:
+        tuple: The updated ``(acc, acc_bits, pos)``.
+    """
+    while acc_bits < need:
+        chunk = data[pos:pos + 7]
+        if len(chunk) < 7:
+            chunk = bytes(chunk).ljust(7, b'\x00')
+        acc = (acc << 56) | int.from_bytes(chunk, 'big')
+        acc_bits += 56
+        pos += 7
+    return acc, acc_bits, pos
+
+
+def decode_contexts(tables, first, count, data, chunk_symbols=CHUNK_SYMBOLS):
+    """
+    Decode an order-1 context code: every symbol is read with the table selected by the symbol before it.
+
+    Args:
+        tables (dict): Previous symbol -> DecodeTable of its successors, or the successor itself when it is
+            the only one (such symbols take no bits).
+        first: The first symbol, which selects the table of the second one.
+        count (int): Total number of symbols, including the first.
+        data (bytes-like): The encoded bytes, most significant bit first.
+        chunk_symbols (int): Maximum number of symbols yielded at once.
+
+    Yields:
+        list: Consecutive runs of decoded symbols, starting with ``first``.
+
+    Raises:
+        ValueError: If the bits do not form a valid codeword for the current context.
+    """
+    acc = 0
+    acc_bits = 0
+    pos = 0
+    symbol = first
+    symbols = [first]
+    append = symbols.append
+    for _ in range(count - 1):
+        table = tables[symbol]
+        if not isinstance(table, DecodeTable):              # Lone successor, implied
+            symbol = table
+        else:
+            if acc_bits < table.max_length:
+                acc, acc_bits, pos = refill(data, pos, acc, acc_bits, table.max_length)
+            symbol, length = table.lookup(acc, acc_bits)
+            acc_bits -= length
+            acc &= (1 << acc_bits) - 1
+        append(symbol)
+        if len(symbols) >= chunk_symbols:
+            yield symbols
+            symbols = []
+            append = symbols.append
+    if symbols:
+        yield symbols
@@ -0,0 +1,186 @@
+from array import array
+
+WINDOW_BITS = 15
+WINDOW_SIZE = 1 << WINDOW_BITS  # Matches reach at most WINDOW_SIZE - 1 bytes back
+WINDOW_MASK = WINDOW_SIZE - 1
+MIN_MATCH = 3
+MAX_MATCH = 258
+DEFAULT_LEVEL = 6
+
+# Effort level -> (longest hash chain walked, match length that stops the search, lazy matching)
+LEVELS = {
+    1: (4, 8, False),
+    2: (8, 16, False),
+    3: (16, 32, False),
+    4: (8, 16, True),
+    5: (16, 32, True),
+    6: (32, 64, True),
+    7: (128, 258, True),
+    8: (1024, 258, True),
+    9: (4096, 258, True),
+}
+
+
+def match_length(data, earlier, position, limit):
+    """
+    Returns:
+        int: Number of equal bytes (at most limit) at data[earlier:] and data[position:].
+    """
+    length = 0
+    while length + 16 <= limit and data[earlier + length:earlier + length + 16] == \
+            data[position + length:position + length + 16]:
+        length += 16
+    while length < limit and data[earlier + length] == data[position + length]:
+        length += 1
+    return length
+
+
+class MatchFinder:
+    """
+    Hash-chain match finder over a sliding window.
+
+    Every position is indexed by its next MIN_MATCH bytes: ``head`` maps those bytes to the latest position
+    starting with them and ``prev`` links each position to the previous one with the same bytes, in a ring of
+    WINDOW_SIZE entries. A search walks the chain from the newest position until it leaves the window, finds a
+    match of ``nice_length`` bytes or has tried ``max_chain`` candidates.
+
+    The finder keeps its chains between calls to ``tokenize``, so consecutive blocks of one buffer can refer
+    to data of the blocks before them.
+
+    Examples:
+        # Example usage:
+        finder = MatchFinder(b'abcabcabcx', level=6)
+        finder.tokenize(0, 10)  # (array('H', [0, 0, 0, 6, 0]), array('L', [97, 98, 99, 3, 120]))
+    """
+
+    def __init__(self, data, level=DEFAULT_LEVEL):
+        """
+        Args:
+            data (bytes): The whole buffer to compress.
+            level (int): Effort level, 1 (fastest) to 9 (best ratio), see LEVELS.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Level must be one of {sorted(LEVELS)}!")
+        self.data = data
+        self.max_chain, self.nice_length, self.lazy = LEVELS[level]
+        self.head = {}
+        self.prev = array('q', [-1]) * WINDOW_SIZE
+
+    def insert(self, position):
+        """
+        Index the MIN_MATCH bytes starting at position.
+        """
+        data = self.data
+        if position + MIN_MATCH <= len(data):
+            key = (data[position] << 16) | (data[position + 1] << 8) | data[position + 2]
+            self.prev[position & WINDOW_MASK] = self.head.get(key, -1)
+            self.head[key] = position
+
+    def longest_match(self, position, limit):
+        """
+        Find the longest earlier occurrence of the bytes at position, before position is inserted.
+
+        Returns:
+            tuple: ``(length, distance)``, length being 0 when there is no match of MIN_MATCH bytes.
+        """
+        data = self.data
+        if limit < MIN_MATCH:
+            return 0, 0
+        key = (data[position] << 16) | (data[position + 1] << 8) | data[position + 2]
+        candidate = self.head.get(key, -1)
+        prev = self.prev
+        best_length = MIN_MATCH - 1
+        best_distance = 0
+        chain = self.max_chain
+        while candidate >= 0 and position - candidate < WINDOW_SIZE and chain:
+            if data[candidate + best_length] == data[position + best_length]:
+                length = match_length(data, candidate, position, limit)
+                if length > best_length:
+                    best_length = length
+                    best_distance = position - candidate
+                    if length >= self.nice_length or length == limit:
+                        break
+            next_candidate = prev[candidate & WINDOW_MASK]
+            if next_candidate >= candidate:                     # Ring entry reused by a newer position
+                break
+            candidate = next_candidate
+            chain -= 1
+        if best_distance:
+            return best_length, best_distance
+        return 0, 0
+
+    def tokenize(self, start, end):
+        """
+        Turn data[start:end] into literals and matches.
+
+        With lazy matching, a match is only taken if the match starting one byte later is not longer;
+        otherwise the byte is emitted as a literal and the later match is considered instead. Matches never
+        extend past end.
+
+        Returns:
+            tuple: Parallel arrays ``(lengths, values)``: length 0 with the byte value for a literal, or the
+            match length with its distance.
+        """
+        data = self.data
+        lengths = array('H')
+        values = array('L')
+        lazy = self.lazy
+        nice_length = self.nice_length
+        insert = self.insert
+        position = start
+        previous_length = previous_distance = 0      # Match found at position - 1, not emitted yet
+        pending = False                             # data[position - 1] not emitted yet
+        while position < end:
+            length, distance = self.longest_match(position, min(MAX_MATCH, end - position))
+            insert(position)
+            if previous_length >= MIN_MATCH and length <= previous_length:
+                lengths.append(previous_length)
+                values.append(previous_distance)
+                for skipped in range(position + 1, position - 1 + previous_length):
+                    insert(skipped)
+                position += previous_length - 1
+                previous_length = 0
+                pending = False
+                continue
+            if pending:
+                lengths.append(0)
+                values.append(data[position - 1])
+            if length >= MIN_MATCH and (not lazy or length >= nice_length):
+                lengths.append(length)
+                values.append(distance)
+                if lazy or length < nice_length:            # Fast levels skip indexing inside long matches
+                    for skipped in range(position + 1, position + length):
+                        insert(skipped)
+                position += length
+                previous_length = 0
+                pending = False
+                continue
+            previous_length, previous_distance = length, distance
+            pending = True
+            position += 1
+        if pending:
+            lengths.append(0)
+            values.append(data[position - 1])
+        return lengths, values
+
+
+def expand(output, lengths, values):
+    """
+    Append the bytes described by ``tokenize`` arrays to output.
+
+    Args:
+        output (bytearray): The data decoded so far (at least the last WINDOW_SIZE bytes of it).
+        lengths (iterable): Match lengths, 0 for literals.
+        values (iterable): Byte values of literals and distances of matches.
+    """
+    for length, value in zip(lengths, values):
+        if not length:
+            output.append(value)
+            continue
+        start = len(output) - value
+        if value >= length:
+            output += output[start:start + length]
+        else:                                               # Overlapping copy repeats the last value bytes
+            period = output[start:]
+            repeats, rest = divmod(length, value)
+            output += period * repeats + period[:rest]
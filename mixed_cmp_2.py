@@ -3,6 +3,9 @@ import heapq
 import json
 from collections import Counter
 from bitio import OutputBitStream, InputBitStream
+from canonical import code_cost, code_lengths, limit_codes
+from rle import RUN_SCHEME, find_runs, split_lengths
+from stats import STATS, add_arguments, reporting
 
 class HuffmanNode:
     def __init__(self, symbol, freq):
@@ -15,20 +18,9 @@ class HuffmanNode:
         return self.freq < other.freq
 
 def run_length_encode(text):
-    if not text:
-        return []
-    result = []
-    last_char = text[0]
-    count = 1
-    for char in text[1:]:
-        if char == last_char:
-            count += 1
-        else:
-            result.append((last_char, count))
-            last_char = char
-            count = 1
-    result.append((last_char, count))
-    return result
+    # (char, count) pairs; compress itself works on the parallel arrays of rle.find_runs
+    run_chars, run_lengths = find_runs(text)
+    return list(zip(run_chars, run_lengths))
 
 def build_huffman_tree(frequencies):
     priority_queue = [HuffmanNode(symbol, freq) for symbol, freq in frequencies.items()]
@@ -55,7 +47,7 @@ def generate_codes(node, prefix="", code_dict=None):
         generate_codes(node.right, prefix + '1', code_dict)
     return code_dict
 
-def encode_text_to_bits(output_file_path, rle_data, char_codes, length_codes):
+def encode_text_to_bits(output_file_path, run_chars, length_symbols, extra_counts, extras, char_codes, length_codes):
     with open(output_file_path, 'wb') as f:
         bit_stream = OutputBitStream(f)
         
@@ -64,44 +56,68 @@ def encode_text_to_bits(output_file_path, rle_data, char_codes, length_codes):
         serializable_length_codes = {str(k): v for k, v in length_codes.items()}
 
         # Serialize codes to JSON and write them to the file
-        codes_json = json.dumps({'char_codes': serializable_char_codes, 'length_codes': serializable_length_codes})
+        # length_codes are keyed by length symbol; run_scheme tells the decoder how to read the extra bits,
+        # runs how many runs to decode before the padding bits
+        codes_json = json.dumps({'char_codes': serializable_char_codes, 'length_codes': serializable_length_codes,
+                                 'run_scheme': RUN_SCHEME, 'runs': len(run_chars)})
         codes_bytes = codes_json.encode('utf-8')
         f.write(len(codes_bytes).to_bytes(4, 'big'))  # Write the length of the JSON data
         f.write(codes_bytes)  # Write the JSON data
         
-        # Write the encoded data
-        for char, count in rle_data:
-            for bit in char_codes[char]:
-                bit_stream.write(int(bit))
-            for bit in length_codes[count]:
-                bit_stream.write(int(bit))
+        # Write the encoded data, one whole code per call
+        int_char_codes = {k: (int(v, 2) if v else 0, len(v)) for k, v in char_codes.items()}
+        int_length_codes = {k: (int(v, 2) if v else 0, len(v)) for k, v in length_codes.items()}
+        write_bits = bit_stream.write_bits
+        for char, symbol, extra_count, extra in zip(run_chars, length_symbols, extra_counts, extras):
+            write_bits(*int_char_codes[char])
+            write_bits(*int_length_codes[symbol])
+            if extra_count:
+                write_bits(extra, extra_count)
         bit_stream.flush()
+        STATS.count('output_bytes', f.tell())
 
-def compress(input_file_path, output_file_path):
-    with open(input_file_path, 'r', encoding='utf-8') as file:
+def compress(input_file_path, output_file_path, max_code_length=None):
+    with STATS.stage('read'), open(input_file_path, 'r', encoding='utf-8') as file:
         text = file.read()
+    STATS.count('symbols', len(text))
 
-    rle_data = run_length_encode(text)
-    char_frequencies = Counter([char for char, _ in rle_data])
-    length_frequencies = Counter([count for _, count in rle_data])
+    # Runs as parallel arrays; lengths become a bounded alphabet of length symbols plus extra bits
+    with STATS.stage('count'):
+        run_chars, run_lengths = find_runs(text)
+        length_symbols, extra_counts, extras = split_lengths(run_lengths)
+        char_frequencies = Counter(run_chars)
+        length_frequencies = Counter(length_symbols)
+    STATS.count('runs', len(run_chars))
+    STATS.count('distinct_symbols', len(char_frequencies) + len(length_frequencies))
 
-    char_root = build_huffman_tree(char_frequencies)
-    length_root = build_huffman_tree(length_frequencies)
+    with STATS.stage('tree'):
+        char_root = build_huffman_tree(char_frequencies)
+        length_root = build_huffman_tree(length_frequencies)
 
-    char_codes = generate_codes(char_root)
-    length_codes = generate_codes(length_root)
-    
-    print(char_codes)
-    print(length_codes)
-    
-    encode_text_to_bits(output_file_path, rle_data, char_codes, length_codes)
+    with STATS.stage('codes'):
+        char_codes = generate_codes(char_root)
+        length_codes = generate_codes(length_root)
+        if max_code_length:
+            char_codes = limit_codes(char_codes, char_frequencies, max_code_length)
+            length_codes = limit_codes(length_codes, length_frequencies, max_code_length)
+    STATS.count('bits', code_cost(code_lengths(char_codes), char_frequencies)
+                + code_cost(code_lengths(length_codes), length_frequencies) + sum(extra_counts))
+
+    # Encoding and writing are interleaved in one pass over the runs
+    with STATS.stage('encode'):
+        encode_text_to_bits(output_file_path, run_chars, length_symbols, extra_counts, extras, char_codes,
+                            length_codes)
 
 def main():
     parser = argparse.ArgumentParser(description='Compress text files using RLE and Huffman coding.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--max-code-length', type=int,
+                        help='Limit Huffman codes to this many bits (e.g. 11-15).')
+    add_arguments(parser)
     args = parser.parse_args()
-    compress(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        compress(args.input, args.output, args.max_code_length)
 
 if __name__ == "__main__":
     main()
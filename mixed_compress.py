@@ -2,6 +2,9 @@ import argparse
 import heapq
 from collections import Counter
 from bitio import OutputBitStream
+from canonical import code_cost, code_lengths, limit_codes
+from rle import RUN_SCHEME, find_runs, split_lengths
+from stats import STATS, add_arguments, reporting
 import json
 
 class HuffmanNode:
@@ -15,20 +18,9 @@ class HuffmanNode:
         return self.freq < other.freq
 
 def run_length_encode(text):
-    if not text:
-        return []
-    result = []
-    last_char = text[0]
-    count = 1
-    for char in text[1:]:
-        if char == last_char:
-            count += 1
-        else:
-            result.append((last_char, count))
-            last_char = char
-            count = 1
-    result.append((last_char, count))  # Append the last run
-    return result
+    # (char, count) pairs; compress itself works on the parallel arrays of rle.find_runs
+    run_chars, run_lengths = find_runs(text)
+    return list(zip(run_chars, run_lengths))
 
 def build_huffman_tree(frequencies):
     priority_queue = [HuffmanNode(symbol, freq) for symbol, freq in frequencies.items()]
@@ -55,43 +47,66 @@ def generate_codes(node, prefix="", code_dict=None):
         generate_codes(node.right, prefix + '1', code_dict)
     return code_dict
 
-def encode_text_to_bits(output_file_path, rle_data, codes):
+def encode_text_to_bits(output_file_path, run_symbols, extra_counts, extras, codes):
     with open(output_file_path, 'wb') as f:
         bit_stream = OutputBitStream(f)
         
-        # Convert the codes dictionary with tuple keys to a serializable format
+        # Convert the codes dictionary with (char, length symbol) keys to a serializable format
         serializable_codes = {f"{k[0]}_{k[1]}": v for k, v in codes.items()}
         
-        # Serialize and write the Huffman codes as JSON at the beginning of the file
-        codes_json = json.dumps(serializable_codes)
+        # Serialize and write the Huffman codes and the run length scheme as JSON at the beginning of the file
+        codes_json = json.dumps({'codes': serializable_codes, 'run_scheme': RUN_SCHEME})
         codes_bytes = codes_json.encode('utf-8')
         f.write(len(codes_bytes).to_bytes(4, 'big'))  # Write the length of the JSON data
         f.write(codes_bytes)  # Write the JSON data
 
-        # Write the encoded data
-        for char, count in rle_data:
-            encoded_bits = codes[(char, count)]
-            for bit in encoded_bits:
-                bit_stream.write(int(bit))
+        # Write the encoded data, one whole code per call
+        int_codes = {k: (int(v, 2) if v else 0, len(v)) for k, v in codes.items()}
+        write_bits = bit_stream.write_bits
+        for symbol, extra_count, extra in zip(run_symbols, extra_counts, extras):
+            write_bits(*int_codes[symbol])
+            if extra_count:
+                write_bits(extra, extra_count)
         bit_stream.flush()
+        STATS.count('output_bytes', f.tell())
 
-def compress(input_file_path, output_file_path):
-    with open(input_file_path, 'r', encoding='utf-8') as file:
+def compress(input_file_path, output_file_path, max_code_length=None):
+    with STATS.stage('read'), open(input_file_path, 'r', encoding='utf-8') as file:
         text = file.read()
+    STATS.count('symbols', len(text))
 
-    rle_data = run_length_encode(text)
-    frequencies = Counter(rle_data)
-    root = build_huffman_tree(frequencies)
-    huffman_codes = generate_codes(root)
-    
-    encode_text_to_bits(output_file_path, rle_data, huffman_codes)
+    # Runs as parallel arrays; a run is coded as one (char, length symbol) symbol plus the length's extra bits
+    with STATS.stage('count'):
+        run_chars, run_lengths = find_runs(text)
+        length_symbols, extra_counts, extras = split_lengths(run_lengths)
+        run_symbols = list(zip(run_chars, length_symbols))
+        frequencies = Counter(run_symbols)
+    STATS.count('runs', len(run_symbols))
+    STATS.count('distinct_symbols', len(frequencies))
+
+    with STATS.stage('tree'):
+        root = build_huffman_tree(frequencies)
+
+    with STATS.stage('codes'):
+        huffman_codes = generate_codes(root)
+        if max_code_length:
+            huffman_codes = limit_codes(huffman_codes, frequencies, max_code_length)
+    STATS.count('bits', code_cost(code_lengths(huffman_codes), frequencies) + sum(extra_counts))
+
+    # Encoding and writing are interleaved in one pass over the runs
+    with STATS.stage('encode'):
+        encode_text_to_bits(output_file_path, run_symbols, extra_counts, extras, huffman_codes)
 
 def main():
     parser = argparse.ArgumentParser(description='Compress text files using RLE and Huffman coding.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--max-code-length', type=int,
+                        help='Limit Huffman codes to this many bits (e.g. 11-15).')
+    add_arguments(parser)
     args = parser.parse_args()
-    compress(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        compress(args.input, args.output, args.max_code_length)
 
 if __name__ == "__main__":
     main()
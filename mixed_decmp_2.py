@@ -1,28 +1,35 @@
 import json
 import argparse
 from bitio import InputBitStream
+from hufftable import DecodeTable
+from rle import RUN_SCHEME, extra_bits, symbol_length
+from stats import STATS, add_arguments, reporting
 
 
-class BitStreamReader:
-    def __init__(self, file):
-        self.file = file
-        self.current_byte = 0
-        self.bit_position = 8  # Start at 8 to trigger reading the first byte
+OUTPUT_CHUNK = 1 << 16  # Characters expanded before each write
 
-    def read_bit(self):
-        if self.bit_position == 8:
-            byte = self.file.read(1)
-            if not byte:
-                return None  # End of file reached
-            self.current_byte = byte[0]
-            self.bit_position = 0
+def make_decode_table(codes):
+    # Codebook {symbol: code string} -> DecodeTable, or the symbol itself when it is alone with an empty code
+    if len(codes) == 1 and not next(iter(codes.values())):
+        return next(iter(codes))
+    return DecodeTable({symbol: (int(code, 2), len(code)) for symbol, code in codes.items()}, root_bits=None)
 
-        bit = (self.current_byte >> (7 - self.bit_position)) & 1
-        self.bit_position += 1
-        return bit
+def read_symbol(table, bit_reader):
+    if isinstance(table, DecodeTable):
+        return table.read_symbol(bit_reader)
+    return table
+
+def write_run(file, char, count):
+    # Expand a run in pieces of at most OUTPUT_CHUNK characters, so memory stays bounded for any run length
+    if count > OUTPUT_CHUNK:
+        piece = (char * OUTPUT_CHUNK).encode('utf-8')
+        for _ in range(count // OUTPUT_CHUNK):
+            file.write(piece)
+        count %= OUTPUT_CHUNK
+    file.write((char * count).encode('utf-8'))
 
 def decode_text_from_bits(input_file_path, output_file_path):
-    with open(input_file_path, 'rb') as f:
+    with open(input_file_path, 'rb') as f, open(output_file_path, 'wb') as file:
         # Read the length of the JSON data
         length_bytes = f.read(4)
         codes_length = int.from_bytes(length_bytes, 'big')
@@ -31,52 +38,66 @@ def decode_text_from_bits(input_file_path, output_file_path):
         codes_json_bytes = f.read(codes_length)
         codes_json = codes_json_bytes.decode('utf-8')
         codes = json.loads(codes_json)
-        char_codes = {v: k for k, v in codes['char_codes'].items()}
-        length_codes = {v: k for k, v in codes['length_codes'].items()}
-        
-        bit_reader = BitStreamReader(f)
-        decoded_text = []
-
-        while True:
-            char_code = ''
-            length_code = ''
-            
-            # Decode the character using the Huffman codes
-            while char_code not in char_codes:
-                bit = bit_reader.read_bit()
-                if bit is None:
-                    break  # End of file or stream
-                char_code += str(bit)
-            if char_code not in char_codes:
-                break  # End of character code stream
+        run_scheme = codes.get('run_scheme')  # Absent in files with one code per distinct run length
+        if run_scheme not in (None, RUN_SCHEME):
+            raise ValueError(f"Unknown run length scheme: {run_scheme}")
+        run_count = codes.get('runs')  # Absent in older files, which end at the first incomplete code
 
-            char = char_codes[char_code]
-            
-            # Decode the length using the Huffman codes
-            while length_code not in length_codes:
-                bit = bit_reader.read_bit()
-                if bit is None:
-                    break  # End of file or stream
-                length_code += str(bit)
-            if length_code not in length_codes:
-                break  # End of length code stream
+        # One lookup table per codebook: a whole codeword per lookup
+        char_table = make_decode_table(codes['char_codes'])
+        length_table = make_decode_table({int(k): v for k, v in codes['length_codes'].items()})
 
-            count = int(length_codes[length_code])
-            decoded_text.append(char * count)
+        try:
+            bit_reader = InputBitStream(f)  # Reads the payload in chunks
+        except EOFError:
+            bit_reader = None  # No payload: a single run whose codes are both empty
+        pending = []
+        pending_chars = 0
+        runs = 0
+        while run_count is None or runs < run_count:
+            if run_count is None and (bit_reader is None or bit_reader.eof()):
+                break
+            try:
+                char = read_symbol(char_table, bit_reader)
+                count = read_symbol(length_table, bit_reader)
+                if run_scheme is not None and extra_bits(count):
+                    count = symbol_length(count, bit_reader.read_bits(extra_bits(count)))
+            except (EOFError, ValueError):
+                if run_count is not None:
+                    raise
+                break  # Older files: padding bits at the end of the stream
+            runs += 1
 
-    with open(output_file_path, 'wb') as file:
-        file.write(''.join(decoded_text).encode('utf-8'))
+            if count >= OUTPUT_CHUNK:
+                file.write(''.join(pending).encode('utf-8'))
+                pending = []
+                pending_chars = 0
+                write_run(file, char, count)
+                continue
+            pending.append(char * count)
+            pending_chars += count
+            if pending_chars >= OUTPUT_CHUNK:
+                file.write(''.join(pending).encode('utf-8'))
+                pending = []
+                pending_chars = 0
+        file.write(''.join(pending).encode('utf-8'))
+        STATS.count('runs', runs)
+        STATS.count('output_bytes', file.tell())
 
 
 def decompress(input_file_path, output_file_path):
-    decode_text_from_bits(input_file_path, output_file_path)
+    # Reading, decoding and writing are interleaved in one pass over the runs
+    with STATS.stage('decode'):
+        decode_text_from_bits(input_file_path, output_file_path)
 
 def main():
     parser = argparse.ArgumentParser(description='Decompress text files using RLE and Huffman coding.')
     parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    add_arguments(parser)
     args = parser.parse_args()
-    decompress(args.input, args.output)
+    with reporting(args.stats, args.profile):
+        decompress(args.input, args.output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_workers(workers):
+    """
+    Turn a worker count option into a number of processes.
+
+    Args:
+        workers (int): Requested number of processes; 0 or None means one per CPU core.
+
+    Returns:
+        int: The number of processes to use (at least 1).
+    """
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
+def map_ordered(function, items, workers=1, window=None):
+    """
+    Apply a function to every item in a process pool and yield the results in input order.
+
+    At most ``window`` items are in flight at once, so a lazy iterable (e.g. blocks read from a file) is never
+    materialized and memory stays bounded by ``window`` times the item size. Because results are yielded in
+    input order, the output does not depend on the number of workers.
+
+    Args:
+        function (callable): A picklable (module-level) function of one argument.
+        items (iterable): The arguments.
+        workers (int): Number of worker processes; 1 runs everything in the calling process, 0 uses all cores.
+        window (int): Maximum number of pending tasks, by default twice the number of workers.
+
+    Yields:
+        The results of function(item), in the order of items.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1:
+        yield from map(function, items)
+        return
+    window = window or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
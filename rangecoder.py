@@ -0,0 +1,360 @@
+import argparse
+from bisect import bisect_right
+from io import BytesIO
+
+from analysis import analyze_text
+from canonical import read_varint, write_varint
+from stats import STATS, add_arguments, reporting
+
+RANGE_MAGIC = b'HRC1'
+TOTAL_BITS = 16         # Every context's frequencies sum to 1 << TOTAL_BITS
+TOP = 1 << 24           # Renormalize when the range drops below this
+MASK32 = (1 << 32) - 1
+
+
+class RangeEncoder:
+    """
+    Byte-oriented range encoder with integer arithmetic (the carry-propagating scheme used by LZMA).
+
+    ``low`` is kept in 33 bits so that a carry out of the 32-bit window can be detected; the top byte is held
+    back in ``cache`` (followed by ``cache_size - 1`` 0xFF bytes) until it is known whether the carry reaches
+    it. The range is renormalized one byte at a time whenever it falls below 2^24.
+
+    Examples:
+        # Example usage:
+        encoder = RangeEncoder(output_file)
+        encoder.encode(start, size, TOTAL_BITS)  # Symbol with frequency size at cumulative frequency start
+        encoder.finish()
+    """
+
+    def __init__(self, output_file):
+        """
+        Args:
+            output_file (file object): A binary file object.
+        """
+        self._output_file = output_file
+        self._buffer = bytearray()
+        self.low = 0
+        self.range = MASK32
+        self._cache = 0
+        self._cache_size = 1
+
+    def _shift_low(self):
+        low = self.low
+        if low < 0xFF000000 or low > MASK32:
+            carry = low >> 32
+            self._buffer.append((self._cache + carry) & 0xFF)
+            if self._cache_size > 1:
+                self._buffer += bytes([(0xFF + carry) & 0xFF]) * (self._cache_size - 1)
+            self._cache_size = 0
+            self._cache = (low >> 24) & 0xFF
+        self._cache_size += 1
+        self.low = (low << 8) & MASK32
+
+    def encode(self, start, size, total_bits):
+        """
+        Encode a symbol occupying ``[start, start + size)`` of a frequency total of ``1 << total_bits``.
+        """
+        r = self.range >> total_bits
+        self.low += r * start
+        self.range = r * size
+        while self.range < TOP:
+            self.range <<= 8
+            self._shift_low()
+
+    def finish(self):
+        """
+        Flush the remaining bytes of ``low`` and the buffer to the file.
+        """
+        for _ in range(5):
+            self._shift_low()
+        self._output_file.write(self._buffer)
+        self._buffer = bytearray()
+
+
+class RangeDecoder:
+    """
+    Decoder for the bytes written by ``RangeEncoder``.
+
+    The decoder mirrors the encoder's range: ``code`` holds the offset of the encoded value from ``low``.
+    Symbols are decoded in two steps, ``target`` to get the cumulative frequency to look up and ``consume``
+    once the symbol and its interval are known.
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data (bytes): The encoded bytes.
+        """
+        self._data = data
+        self._pos = 5
+        self.code = int.from_bytes(data[:5].ljust(5, b'\0'), byteorder='big')
+        self.range = MASK32
+
+    def target(self, total_bits):
+        """
+        Returns:
+            int: The cumulative frequency (below ``1 << total_bits``) the next symbol's interval contains.
+        """
+        self._r = self.range >> total_bits
+        return min(self.code // self._r, (1 << total_bits) - 1)
+
+    def consume(self, start, size):
+        """
+        Remove the interval ``[start, start + size)`` of the symbol returned for the last ``target``.
+        """
+        r = self._r
+        self.code -= r * start
+        self.range = r * size
+        while self.range < TOP:
+            byte = self._data[self._pos] if self._pos < len(self._data) else 0
+            self._pos += 1
+            self.code = ((self.code << 8) | byte) & MASK32
+            self.range <<= 8
+
+
+def scale_frequencies(counts, total_bits=TOTAL_BITS):
+    """
+    Scale counts to integer frequencies summing to exactly ``1 << total_bits``, keeping every symbol >= 1.
+
+    Args:
+        counts (list): Positive counts, at most ``1 << total_bits`` of them.
+
+    Returns:
+        list: The scaled frequencies, in the same order.
+    """
+    total = 1 << total_bits
+    count_sum = sum(counts)
+    frequencies = [max(1, count * total // count_sum) for count in counts]
+    excess = sum(frequencies) - total
+    order = sorted(range(len(counts)), key=lambda index: -frequencies[index])
+    if excess < 0:
+        frequencies[order[0]] -= excess                 # Rounding loss goes to the most frequent symbol
+    while excess > 0:                                   # Symbols raised to 1 are paid by the largest ones
+        for index in order:
+            if excess == 0 or frequencies[index] == 1:
+                break
+            frequencies[index] -= 1
+            excess -= 1
+    return frequencies
+
+
+class Order1Model:
+    """
+    Static order-1 model: for every previous character, scaled frequencies of the characters that follow it.
+
+    Contexts followed by a single character cost nothing to code and are skipped by the coder.
+
+    Attributes:
+        alphabet (list): Sorted characters of the text.
+        successors (dict): Context character -> list of ``(char, frequency)`` in alphabet order.
+    """
+
+    def __init__(self, alphabet, successors):
+        self.alphabet = alphabet
+        self.successors = successors
+        self.intervals = {}   # Context -> {char: (start, size)}, for encoding
+        self.tables = {}      # Context -> (cumulative starts, chars, frequencies), for decoding
+        for context, table in successors.items():
+            starts = []
+            start = 0
+            for _, frequency in table:
+                starts.append(start)
+                start += frequency
+            chars = [char for char, _ in table]
+            frequencies = [frequency for _, frequency in table]
+            self.intervals[context] = dict(zip(chars, zip(starts, frequencies)))
+            self.tables[context] = (starts, chars, frequencies)
+
+    @classmethod
+    def from_stats(cls, stats):
+        """
+        Build the model from the transition counts of ``analysis.SymbolStats``.
+        """
+        alphabet = sorted(stats.histogram)
+        grouped = {}
+        for (previous, char), count in stats.transitions.items():
+            grouped.setdefault(previous, []).append((char, count))
+        successors = {}
+        for context, table in grouped.items():
+            table.sort()
+            frequencies = scale_frequencies([count for _, count in table]) if len(table) > 1 else [1 << TOTAL_BITS]
+            successors[context] = [(char, frequency) for (char, _), frequency in zip(table, frequencies)]
+        return cls(alphabet, successors)
+
+    def write(self, output_file):
+        """
+        Write the model: the alphabet, then for every context its successor indices and frequencies.
+
+        Layout:
+            alphabet size (varint): byte size of the alphabet
+            alphabet      (UTF-8): the sorted characters
+            per context   (alphabet order): varint successor count, then per successor the varint gap to the
+                          previous successor index and, for contexts with several successors, varint frequency - 1
+        """
+        alphabet_bytes = ''.join(self.alphabet).encode('utf-8')
+        write_varint(output_file, len(alphabet_bytes))
+        output_file.write(alphabet_bytes)
+        position = {char: index for index, char in enumerate(self.alphabet)}
+        buffer = BytesIO()
+        for context in self.alphabet:
+            table = self.successors.get(context, [])
+            write_varint(buffer, len(table))
+            previous = -1
+            for char, frequency in table:
+                write_varint(buffer, position[char] - previous - 1)
+                previous = position[char]
+                if len(table) > 1:
+                    write_varint(buffer, frequency - 1)
+        output_file.write(buffer.getvalue())
+
+    @classmethod
+    def read(cls, input_file):
+        """
+        Read a model written by ``write``.
+        """
+        alphabet = list(input_file.read(read_varint(input_file)).decode('utf-8'))
+        successors = {}
+        for context in alphabet:
+            count = read_varint(input_file)
+            if not count:
+                continue
+            table = []
+            index = -1
+            for _ in range(count):
+                index += read_varint(input_file) + 1
+                frequency = read_varint(input_file) + 1 if count > 1 else 1 << TOTAL_BITS
+                table.append((alphabet[index], frequency))
+            successors[context] = table
+        return cls(alphabet, successors)
+
+
+def encode_text(text, stats=None):
+    """
+    Compress a text with the order-1 model and the range coder.
+
+    File layout: ``RANGE_MAGIC``, varint character count, the first character's index in the alphabet, the
+    model, then the range-coded bytes of characters 2..n, each coded in the context of the one before it.
+
+    Args:
+        text (str): The text to compress.
+        stats (SymbolStats): Statistics of the text, computed if omitted.
+
+    Returns:
+        bytes: The compressed file content.
+    """
+    if stats is None:
+        stats = analyze_text(text)
+    model = Order1Model.from_stats(stats)
+    output_file = BytesIO()
+    output_file.write(RANGE_MAGIC)
+    write_varint(output_file, len(text))
+    if not text:
+        return output_file.getvalue()
+    write_varint(output_file, model.alphabet.index(text[0]))
+    model.write(output_file)
+
+    encoder = RangeEncoder(output_file)
+    encode = encoder.encode
+    intervals = model.intervals
+    for previous, char in zip(text, text[1:]):
+        start, size = intervals[previous][char]
+        if size != 1 << TOTAL_BITS:                     # A lone successor is implied, no bits needed
+            encode(start, size, TOTAL_BITS)
+    encoder.finish()
+    return output_file.getvalue()
+
+
+def decode_text(data):
+    """
+    Decompress the output of ``encode_text``.
+
+    Args:
+        data (bytes): The compressed file content.
+
+    Returns:
+        str: The original text.
+
+    Raises:
+        ValueError: If the data does not start with ``RANGE_MAGIC``.
+    """
+    input_file = BytesIO(data)
+    if input_file.read(len(RANGE_MAGIC)) != RANGE_MAGIC:
+        raise ValueError("Not a range-coded file!")
+    char_count = read_varint(input_file)
+    if not char_count:
+        return ''
+    first = read_varint(input_file)
+    model = Order1Model.read(input_file)
+    decoder = RangeDecoder(data[input_file.tell():])
+    target = decoder.target
+    consume = decoder.consume
+    tables = model.tables
+
+    char = model.alphabet[first]
+    decoded = [char]
+    for _ in range(char_count - 1):
+        starts, chars, frequencies = tables[char]
+        if len(chars) == 1:
+            char = chars[0]
+        else:
+            index = bisect_right(starts, target(TOTAL_BITS)) - 1
+            consume(starts[index], frequencies[index])
+            char = chars[index]
+        decoded.append(char)
+    return ''.join(decoded)
+
+
+def compress(input_file_path, output_file_path):
+    """
+    Compress a UTF-8 text file and compare the size with the order-1 bound of performance_limit.
+
+    Returns:
+        tuple: ``(payload_bits_per_char, bound_bits_per_char)``, also set as ``STATS`` counters.
+    """
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        text = file.read().decode('utf-8')
+    STATS.count('symbols', len(text))
+    with STATS.stage('count'):
+        stats = analyze_text(text)
+    with STATS.stage('encode'):
+        data = encode_text(text, stats)
+    with STATS.stage('write'), open(output_file_path, 'wb') as file:
+        file.write(data)
+    STATS.count('output_bytes', len(data))
+
+    bound = stats.conditional_entropy()
+    bits_per_char = len(data) * 8 / stats.total if stats.total else 0.0
+    STATS.set('bits_per_symbol', bits_per_char)
+    STATS.set('bound_bits_per_symbol', bound)                   # Order-1 conditional entropy
+    return bits_per_char, bound
+
+
+def decompress(input_file_path, output_file_path):
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        data = file.read()
+    with STATS.stage('decode'):
+        text = decode_text(data)
+    STATS.count('symbols', len(text))
+    with STATS.stage('write'), open(output_file_path, 'wb') as file:
+        file.write(text.encode('utf-8'))
+
+
+def main(input_file_path, output_file_path, decompress_mode=False):
+    if decompress_mode:
+        decompress(input_file_path, output_file_path)
+    else:
+        compress(input_file_path, output_file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Order-1 context range coding of UTF-8 text.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--decompress', '-d', action='store_true', help='Decompress instead of compress.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.decompress)
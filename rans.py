@@ -0,0 +1,308 @@
+import argparse
+from io import BytesIO
+
+from analysis import analyze_text
+from canonical import read_varint, write_varint
+from rangecoder import scale_frequencies
+from stats import STATS, add_arguments, reporting
+
+RANS_MAGIC = b'HANS'
+RANS_L = 1 << 23                # Lower bound of a normalized state; states live in [RANS_L, RANS_L << 8)
+MIN_PROB_BITS = 12
+MAX_PROB_BITS = 20
+DEFAULT_LANES = 8
+BLOCK_SYMBOLS = 1 << 20
+
+
+def probability_bits(alphabet_size):
+    """
+    Returns:
+        int: Precision of the quantized frequencies, large enough to leave room above 1 for every symbol.
+    """
+    return max(MIN_PROB_BITS, min(MAX_PROB_BITS, alphabet_size.bit_length() + 4))
+
+
+class RansTable:
+    """
+    Quantized order-0 frequencies and the slot tables used by the rANS coder.
+
+    Frequencies sum to ``1 << prob_bits``. The decode table has one entry per slot ``x & mask`` of the state
+    holding ``(symbol, frequency, slot - start)``, so a symbol is decoded with one lookup, one multiply and
+    one add.
+
+    Attributes:
+        symbols (list): The symbols in table order.
+        frequencies (list): Quantized frequency of each symbol.
+        prob_bits (int): log2 of the frequency total.
+    """
+
+    def __init__(self, symbols, frequencies, prob_bits):
+        self.symbols = symbols
+        self.frequencies = frequencies
+        self.prob_bits = prob_bits
+        self.starts = []
+        start = 0
+        for frequency in frequencies:
+            self.starts.append(start)
+            start += frequency
+        self.index = {symbol: position for position, symbol in enumerate(symbols)}
+        self._decode_table = None
+
+    @classmethod
+    def from_histogram(cls, histogram):
+        """
+        Quantize a histogram such as ``SymbolStats.histogram``, the counts that feed ``build_huffman_tree``.
+        """
+        symbols = sorted(histogram)
+        prob_bits = probability_bits(len(symbols))
+        frequencies = scale_frequencies([histogram[symbol] for symbol in symbols], prob_bits)
+        return cls(symbols, frequencies, prob_bits)
+
+    @property
+    def decode_table(self):
+        if self._decode_table is None:
+            table = []
+            for symbol, frequency in zip(self.symbols, self.frequencies):
+                table.extend((symbol, frequency, offset) for offset in range(frequency))  # offset = slot - start
+            self._decode_table = table
+        return self._decode_table
+
+    def write(self, output_file):
+        """
+        Layout: prob_bits (1 byte), varint symbol count, varint symbols size, UTF-8 symbols, varint
+        frequency - 1 per symbol.
+        """
+        output_file.write(bytes([self.prob_bits]))
+        symbols_bytes = ''.join(self.symbols).encode('utf-8')
+        write_varint(output_file, len(self.symbols))
+        write_varint(output_file, len(symbols_bytes))
+        output_file.write(symbols_bytes)
+        for frequency in self.frequencies:
+            write_varint(output_file, frequency - 1)
+
+    @classmethod
+    def read(cls, input_file):
+        prob_bits = input_file.read(1)[0]
+        count = read_varint(input_file)
+        symbols = list(input_file.read(read_varint(input_file)).decode('utf-8'))
+        if len(symbols) != count:
+            raise ValueError("Corrupted symbol table!")
+        frequencies = [read_varint(input_file) + 1 for _ in range(count)]
+        return cls(symbols, frequencies, prob_bits)
+
+
+def encode_block(text, table, lanes=DEFAULT_LANES):
+    """
+    Encode a text with ``lanes`` interleaved rANS states.
+
+    Character i is coded by state ``i % lanes``. Every state has its own byte stream: the encoder runs
+    backwards over its characters and pushes renormalization bytes on a stack, so the decoder can run forwards
+    and read them in order. The states do not depend on each other, so lanes can be decoded separately.
+
+    Layout: per lane its final state (4 bytes) and the varint size of its stream, then the streams of lanes
+    0, 1, ... concatenated.
+
+    Args:
+        text (str): The characters to encode, all present in the table.
+        table (RansTable): The quantized frequencies.
+        lanes (int): Number of interleaved states, at least 1.
+
+    Returns:
+        bytes: The encoded block.
+
+    Raises:
+        ValueError: If lanes is less than 1.
+    """
+    if lanes < 1:
+        raise ValueError("At least one rANS lane is needed!")
+    prob_bits = table.prob_bits
+    symbols = [table.index[char] for char in text]
+    starts = table.starts
+    frequencies = table.frequencies
+    # x_max[symbol]: encoding must not push the state past RANS_L << 8
+    x_max = [((RANS_L >> prob_bits) << 8) * frequency for frequency in frequencies]
+
+    header = BytesIO()
+    streams = []
+    for lane in range(lanes):
+        x = RANS_L
+        stack = bytearray()
+        for symbol in reversed(symbols[lane::lanes]):
+            frequency = frequencies[symbol]
+            limit = x_max[symbol]
+            while x >= limit:
+                stack.append(x & 0xFF)
+                x >>= 8
+            x = ((x // frequency) << prob_bits) + x % frequency + starts[symbol]
+        stack.reverse()
+        header.write(x.to_bytes(4, byteorder='big'))
+        write_varint(header, len(stack))
+        streams.append(stack)
+    return header.getvalue() + b''.join(streams)
+
+
+def read_lanes(data, lanes):
+    """
+    Returns:
+        tuple: ``(states, offsets)``: the initial state and the stream offset in data of every lane.
+    """
+    header = BytesIO(data)
+    states = []
+    sizes = []
+    for _ in range(lanes):
+        states.append(int.from_bytes(header.read(4), byteorder='big'))
+        sizes.append(read_varint(header))
+    offsets = []
+    offset = header.tell()
+    for size in sizes:
+        offsets.append(offset)
+        offset += size
+    return states, offsets
+
+
+def decode_block(data, count, table, lanes=DEFAULT_LANES):
+    """
+    Decode ``count`` characters written by ``encode_block``.
+
+    Lanes are decoded one after the other, each with its state in a local variable and its own stream
+    position, and interleaved back into text order by slice assignment.
+
+    Returns:
+        str: The decoded characters.
+    """
+    states, offsets = read_lanes(data, lanes)
+    decode_table = table.decode_table
+    mask = (1 << table.prob_bits) - 1
+    prob_bits = table.prob_bits
+    decoded = [None] * count
+    for lane in range(min(lanes, count)):
+        x = states[lane]
+        position = offsets[lane]
+        lane_symbols = []
+        append = lane_symbols.append
+        for _ in range(len(range(lane, count, lanes))):
+            symbol, frequency, offset = decode_table[x & mask]
+            x = frequency * (x >> prob_bits) + offset
+            while x < RANS_L:
+                x = (x << 8) | data[position]
+                position += 1
+            append(symbol)
+        decoded[lane::lanes] = lane_symbols
+    return ''.join(decoded)
+
+
+def encode_text(text, stats=None, lanes=DEFAULT_LANES, block_symbols=BLOCK_SYMBOLS):
+    """
+    Compress a text with an order-0 rANS coder.
+
+    File layout: ``RANS_MAGIC``, varint character count, varint lanes, the frequency table, then per block of
+    ``block_symbols`` characters the varint byte size of the block followed by its bytes.
+
+    Args:
+        text (str): The text to compress.
+        stats (SymbolStats): Statistics of the text, computed if omitted.
+        lanes (int): Number of interleaved states per block, at least 1.
+        block_symbols (int): Characters per block.
+
+    Returns:
+        bytes: The compressed file content.
+
+    Raises:
+        ValueError: If lanes is less than 1.
+    """
+    if lanes < 1:
+        raise ValueError("At least one rANS lane is needed!")
+    if stats is None:
+        stats = analyze_text(text)
+    output_file = BytesIO()
+    output_file.write(RANS_MAGIC)
+    write_varint(output_file, len(text))
+    write_varint(output_file, lanes)
+    if not text:
+        return output_file.getvalue()
+    table = RansTable.from_histogram(stats.histogram)
+    table.write(output_file)
+    for start in range(0, len(text), block_symbols):
+        block = encode_block(text[start:start + block_symbols], table, lanes)
+        write_varint(output_file, len(block))
+        output_file.write(block)
+    return output_file.getvalue()
+
+
+def decode_text(data, block_symbols=BLOCK_SYMBOLS):
+    """
+    Decompress the output of ``encode_text``.
+
+    Raises:
+        ValueError: If the data does not start with ``RANS_MAGIC`` or has no lanes.
+    """
+    input_file = BytesIO(data)
+    if input_file.read(len(RANS_MAGIC)) != RANS_MAGIC:
+        raise ValueError("Not a rANS file!")
+    char_count = read_varint(input_file)
+    lanes = read_varint(input_file)
+    if lanes < 1:
+        raise ValueError("At least one rANS lane is needed!")
+    if not char_count:
+        return ''
+    table = RansTable.read(input_file)
+    chunks = []
+    for start in range(0, char_count, block_symbols):
+        block = input_file.read(read_varint(input_file))
+        chunks.append(decode_block(block, min(block_symbols, char_count - start), table, lanes))
+    return ''.join(chunks)
+
+
+def lane_count(value):
+    """argparse type of ``--lanes``: an integer of at least 1."""
+    lanes = int(value)
+    if lanes < 1:
+        raise argparse.ArgumentTypeError("the number of lanes must be at least 1")
+    return lanes
+
+
+def compress(input_file_path, output_file_path, lanes=DEFAULT_LANES):
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        text = file.read().decode('utf-8')
+    STATS.count('symbols', len(text))
+    with STATS.stage('count'):
+        stats = analyze_text(text)
+    with STATS.stage('encode'):
+        data = encode_text(text, stats, lanes)
+    with STATS.stage('write'), open(output_file_path, 'wb') as file:
+        file.write(data)
+    STATS.count('output_bytes', len(data))
+
+    STATS.set('bits_per_symbol', len(data) * 8 / stats.total if stats.total else 0.0)
+    STATS.set('entropy_bits_per_symbol', stats.entropy() if stats.total else 0.0)  # Order-0 entropy
+
+
+def decompress(input_file_path, output_file_path):
+    with STATS.stage('read'), open(input_file_path, 'rb') as file:
+        data = file.read()
+    with STATS.stage('decode'):
+        text = decode_text(data)
+    STATS.count('symbols', len(text))
+    with STATS.stage('write'), open(output_file_path, 'wb') as file:
+        file.write(text.encode('utf-8'))
+
+
+def main(input_file_path, output_file_path, decompress_mode=False, lanes=DEFAULT_LANES):
+    if decompress_mode:
+        decompress(input_file_path, output_file_path)
+    else:
+        compress(input_file_path, output_file_path, lanes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Order-0 rANS coding of UTF-8 text with interleaved states.')
+    parser.add_argument('--input', '-i', type=str, required=True, help='Input file path.')
+    parser.add_argument('--output', '-o', type=str, required=True, help='Output file path.')
+    parser.add_argument('--decompress', '-d', action='store_true', help='Decompress instead of compress.')
+    parser.add_argument('--lanes', type=lane_count, default=DEFAULT_LANES, help='Number of interleaved rANS states.')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+
+    with reporting(args.stats, args.profile):
+        main(args.input, args.output, args.decompress, args.lanes)
@@ -0,0 +1,98 @@
+from array import array
+
+from analysis import RUN_PATTERN
+import vectorized
+
+np = vectorized.np
+
+RUN_SCHEME = 'log2-15'  # Stored in the JSON headers; identifies the length symbols below
+DIRECT_LENGTHS = 15     # Run lengths 1..15 are their own symbol
+
+
+def find_runs(text):
+    """
+    Split a text into runs of identical characters, detected in bulk rather than one character at a time.
+
+    With NumPy, run starts are the positions where consecutive code points differ; otherwise the runs come
+    from one regular-expression scan.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        tuple: ``(run_chars, run_lengths)``: a string holding the character of every run and an
+        ``array('Q')`` of their lengths, in text order.
+
+    Examples:
+        # Example usage:
+        find_runs('aaabcc')  # ('abc', array('Q', [3, 1, 2]))
+    """
+    if not text:
+        return '', array('Q')
+    if np is not None:
+        symbols = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+        starts = np.concatenate(([0], np.flatnonzero(symbols[1:] != symbols[:-1]) + 1))
+        lengths = np.diff(np.append(starts, len(symbols))).astype(np.uint64)
+        run_chars = symbols[starts].tobytes().decode('utf-32-le')
+        run_lengths = array('Q')
+        run_lengths.frombytes(lengths.tobytes())
+        return run_chars, run_lengths
+    runs = [(run.group(1), run.end() - run.start()) for run in RUN_PATTERN.finditer(text)]
+    return ''.join(char for char, _ in runs), array('Q', (length for _, length in runs))
+
+
+def length_symbol(length):
+    """
+    Map a run length to its symbol, number of extra bits and extra-bits value.
+
+    Lengths 1..DIRECT_LENGTHS are their own symbol. A longer length with ``b`` significant bits uses symbol
+    ``DIRECT_LENGTHS + b - 4`` followed by its ``b - 1`` low bits (a bucketed Elias-gamma code), so lengths up
+    to 2**64 need at most 75 symbols however varied the runs are.
+
+    Returns:
+        tuple: ``(symbol, extra_bits, extra)``.
+    """
+    if length <= DIRECT_LENGTHS:
+        return length, 0, 0
+    bits = length.bit_length()
+    return DIRECT_LENGTHS + bits - 4, bits - 1, length - (1 << (bits - 1))
+
+
+def symbol_length(symbol, extra=0):
+    """
+    Inverse of ``length_symbol``.
+
+    Returns:
+        int: The run length.
+    """
+    if symbol <= DIRECT_LENGTHS:
+        return symbol
+    return (1 << (symbol - DIRECT_LENGTHS + 3)) + extra
+
+
+def extra_bits(symbol):
+    """
+    Returns:
+        int: Number of extra bits following a length symbol.
+    """
+    return 0 if symbol <= DIRECT_LENGTHS else symbol - DIRECT_LENGTHS + 3
+
+
+def split_lengths(run_lengths):
+    """
+    Apply ``length_symbol`` to every run length.
+
+    Returns:
+        tuple: ``(symbols, extra_bits, extras)`` lists, parallel to run_lengths.
+    """
+    if np is not None and len(run_lengths):
+        lengths = np.frombuffer(run_lengths, dtype=np.uint64)
+        bits = np.frexp(lengths.astype(np.float64))[1]                     # bit_length, exact below 2**53
+        if lengths.max() < (1 << 53):
+            long_runs = lengths > DIRECT_LENGTHS
+            symbols = np.where(long_runs, DIRECT_LENGTHS + bits - 4, lengths.astype(np.int64))
+            extra_counts = np.where(long_runs, bits - 1, 0)
+            extras = np.where(long_runs, lengths - (np.uint64(1) << (bits - 1).clip(0).astype(np.uint64)), 0)
+            return symbols.tolist(), extra_counts.tolist(), extras.astype(np.int64).tolist()
+    split = [length_symbol(length) for length in run_lengths]
+    return [symbol for symbol, _, _ in split], [bits for _, bits, _ in split], [extra for _, _, extra in split]
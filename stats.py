@@ -0,0 +1,172 @@
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+STAGES = ('read', 'count', 'tree', 'codes', 'encode', 'write', 'decode', 'total')  # Report order of the known stages
+FORMATS = ('text', 'json')
+
+
+class Stats:
+    """
+    Per-stage timers and named counters, collected silently and reported only on request.
+
+    Stage timers add up the wall-clock time of every ``stage`` block with the same name; counters hold symbol
+    and bit counts (``count`` adds to them, ``set`` overwrites them). Hooks are called with ``(stage, seconds)``
+    each time a stage ends, e.g. to stream timings to a profiler or a log. Stages run in worker processes
+    (block mode with several workers) are not collected.
+
+    Examples:
+        # Example usage:
+        stats = Stats()
+        with stats.stage('read'):
+            data = open('data.txt', 'rb').read()
+        stats.count('symbols', len(data))
+        stats.report('json')  # {"timers": {"read": 0.000123}, "counters": {"symbols": 1024}}
+    """
+
+    def __init__(self):
+        self.timers = {}     # Stage -> seconds
+        self.counters = {}   # Name -> value
+        self.hooks = []      # Callables (stage, seconds), run at the end of every stage
+
+    def reset(self):
+        """Forget the timers and counters gathered so far; hooks are kept."""
+        self.timers.clear()
+        self.counters.clear()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of code and add its duration to the timer of a stage.
+
+        Args:
+            name (str): The stage, one of ``STAGES`` for the codecs of this package.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+            for hook in self.hooks:
+                hook(name, seconds)
+
+    def count(self, name, value=1):
+        """Add value to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Set a counter, for values that do not add up (e.g. the expected code length)."""
+        self.counters[name] = value
+
+    def add_hook(self, hook):
+        """
+        Register a callable run with ``(stage, seconds)`` at the end of every stage.
+
+        Returns:
+            callable: The hook, so it can be given to ``remove_hook`` later.
+        """
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: ``{'timers': {stage: seconds}, 'counters': {name: value}}``, known stages first.
+        """
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        timers = sorted(self.timers.items(), key=lambda item: order.get(item[0], len(STAGES)))
+        return {'timers': {stage: round(seconds, 6) for stage, seconds in timers}, 'counters': dict(self.counters)}
+
+    def report(self, stats_format='text', file=None):
+        """
+        Write the timers and counters, by default to stderr so that they never mix with piped output.
+
+        Args:
+            stats_format (str): 'json' for one JSON object, 'text' for one aligned line per value.
+            file (file object): Where to write, sys.stderr if None.
+
+        Raises:
+            ValueError: If stats_format is not one of ``FORMATS``.
+        """
+        file = file or sys.stderr
+        values = self.as_dict()
+        if stats_format == 'json':
+            print(json.dumps(values), file=file)
+        elif stats_format == 'text':
+            for stage, seconds in values['timers'].items():
+                print(f"{stage:<26} {seconds * 1000:12.3f} ms", file=file)
+            for name, value in values['counters'].items():
+                value = f"{value:15.4f}" if isinstance(value, float) else f"{value:12d}"
+                print(f"{name:<26} {value}", file=file)
+        else:
+            raise ValueError(f"Unknown stats format: {stats_format}")
+
+
+STATS = Stats()  # Default collector, used by the codecs
+
+
+def peak_rss_kb():
+    """
+    Returns:
+        int: Peak resident set size of this process in KB (VmHWM of /proc/self/status), or None where /proc is
+        not available. Unlike ``ru_maxrss``, it does not include the memory of the parent that started the process.
+    """
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def reporting(stats_format=None, profile_path=None, stats=STATS):
+    """
+    Collect the statistics of a run from scratch, then report them and optionally save a cProfile profile.
+
+    The whole run is timed as the ``total`` stage, which leaves out interpreter startup and module imports, and
+    the peak RSS of the process is set as the ``peak_rss_kb`` counter where it is known.
+    Nothing is written unless stats_format or profile_path is given, so a CLI stays quiet by default.
+
+    Args:
+        stats_format (str): None, or a format of ``Stats.report``.
+        profile_path (str): If given, profile the run with cProfile and dump it there (read it with pstats).
+        stats (Stats): The collector to reset and report.
+
+    Examples:
+        # Example usage:
+        with reporting('json'):
+            compress('data.txt', 'data.huf')
+    """
+    stats.reset()
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with stats.stage('total'):
+            yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+    peak = peak_rss_kb()
+    if peak is not None:
+        stats.set('peak_rss_kb', peak)
+    if stats_format:
+        stats.report(stats_format)
+
+
+def add_arguments(parser):
+    """Add the ``--stats`` and ``--profile`` options used by ``reporting`` to an argparse parser."""
+    parser.add_argument('--stats', choices=FORMATS,
+                        help='Report per-stage timings and symbol/bit counters on stderr in this format.')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Profile the run with cProfile and save the result to PATH (read it with pstats).')
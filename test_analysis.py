@@ -0,0 +1,33 @@
+import pytest
+
+from analysis import SymbolStats, analyze_text
+import vectorized
+
+np = pytest.importorskip('numpy')
+
+TEXTS = ['abracadabra', 'aaab\nbbba\n\ncc', 'zyx漢字zz漢 yx', 'q']
+
+
+def analyze_chunks(text, chunk_size):
+    stats = SymbolStats()
+    for start in range(0, len(text), chunk_size):
+        stats.update(text[start:start + chunk_size])
+    stats.finish()
+    return [list(counts.items()) for counts in (stats.histogram, stats.transitions, stats.run_lengths,
+                                                 stats.run_chars)]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_numpy_counts_match_pure_python_in_order(monkeypatch, text, chunk_size):
+    with_numpy = analyze_chunks(text, chunk_size)
+    monkeypatch.setattr(vectorized, 'np', None)
+    assert with_numpy == analyze_chunks(text, chunk_size)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_histogram_only_matches_full_histogram_in_order(monkeypatch, text, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(vectorized, 'np', None)
+    assert list(analyze_text(text, histogram_only=True).histogram.items()) == list(analyze_text(text).histogram.items())
@@ -0,0 +1,31 @@
+import random
+
+import pytest
+
+from bwt import inverse_transform, move_to_front, move_to_front_inverse, suffix_array, transform
+
+
+def random_blocks(alphabet_size, count=50, seed=1):
+    generator = random.Random(seed)
+    for _ in range(count):
+        length = generator.randint(1, 200)
+        yield bytes(generator.randrange(alphabet_size) for _ in range(length))
+
+
+@pytest.mark.parametrize('alphabet_size', [1, 2, 3, 4, 256])
+def test_suffix_array_matches_naive_sort(alphabet_size):
+    for block in random_blocks(alphabet_size):
+        n = len(block)
+        assert suffix_array(block, 255) == sorted(range(n), key=lambda i: block[i:])
+
+
+@pytest.mark.parametrize('alphabet_size', [1, 2, 4, 256])
+def test_transform_round_trips(alphabet_size):
+    for block in random_blocks(alphabet_size):
+        last_column, primary = transform(block)
+        assert inverse_transform(last_column, primary) == block
+        assert move_to_front_inverse(move_to_front(last_column)) == last_column
+
+
+def test_transform_example():
+    assert transform(b'banana') == (b'annbaa', 4)
@@ -0,0 +1,28 @@
+import pytest
+
+from analysis import analyze_file
+from entropy import OrderKEstimator, estimate_file
+
+TEXT = 'abracadabra, the quick brown fox jumps over the lazy dog\n' * 20
+
+
+def estimate(chunks, hash_bits=None):
+    estimator = OrderKEstimator(max_order=3, hash_bits=hash_bits)
+    for chunk in chunks:
+        estimator.update(chunk)
+    return estimator.entropies()
+
+
+@pytest.mark.parametrize('hash_bits', [None, 12])
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 64])
+def test_chunked_matches_whole_text(hash_bits, chunk_size):
+    chunks = [TEXT[start:start + chunk_size] for start in range(0, len(TEXT), chunk_size)]
+    assert estimate(chunks, hash_bits) == pytest.approx(estimate([TEXT], hash_bits))
+
+
+def test_crlf_file_reads_like_analysis(tmp_path):
+    path = tmp_path / 'crlf.txt'
+    path.write_bytes(TEXT.replace('\n', '\r\n').encode('utf-8'))
+    entropies = estimate_file(str(path))
+    assert entropies == pytest.approx(estimate([TEXT]))
+    assert entropies[0] == pytest.approx(analyze_file(str(path)).entropy())
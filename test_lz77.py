@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+from lz77 import WINDOW_SIZE, MatchFinder, expand
+
+
+def sample_data(size=WINDOW_SIZE + 5000, seed=1):
+    generator = random.Random(seed)
+    words = [bytes(generator.randrange(97, 101) for _ in range(generator.randint(1, 12))) for _ in range(40)]
+    data = bytearray()
+    while len(data) < size:
+        data += generator.choice(words) if generator.random() < 0.9 else bytes([generator.randrange(256)])
+    return bytes(data[:size])
+
+
+@pytest.mark.parametrize('level', [1, 3, 4, 6, 9])
+@pytest.mark.parametrize('block_size', [1000, WINDOW_SIZE // 2 + 7])
+def test_expand_tokenize_round_trips_across_blocks(level, block_size):
+    data = sample_data()
+    finder = MatchFinder(data, level)
+    output = bytearray()
+    for start in range(0, len(data), block_size):
+        expand(output, *finder.tokenize(start, min(start + block_size, len(data))))
+        assert output == data[:len(output)]
+    assert bytes(output) == data
+
+
+def test_runs_use_overlapping_matches():
+    data = b'a' * 1000 + b'ab' * 500
+    output = bytearray()
+    expand(output, *MatchFinder(data, 1).tokenize(0, len(data)))
+    assert bytes(output) == data
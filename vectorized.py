@@ -0,0 +1,216 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; callers fall back to the pure Python encoders.
+    np = None
+
+CHUNK_SYMBOLS = 1 << 18
+MAX_CODE_LENGTH = 64
+DENSE_LIMIT = 1 << 22  # Largest pair matrix (cells) counted densely
+
+
+def available(codes):
+    """
+    Check whether a code table can be packed with NumPy.
+
+    Args:
+        codes (dict): Symbol to ``(code, length)`` pair.
+
+    Returns:
+        bool: True if NumPy is installed and every code fits in 64 bits.
+    """
+    return np is not None and all(length <= MAX_CODE_LENGTH for _, length in codes.values())
+
+
+def pack_codes(text, codes, chunk_symbols=CHUNK_SYMBOLS):
+    """
+    Encode a text with a prefix code using array operations instead of a per-character loop.
+
+    Characters are mapped to code and length arrays, bit offsets come from a cumulative sum of the lengths and
+    the bits are scattered into a 0/1 array that ``numpy.packbits`` turns into bytes. The text is processed in
+    chunks of ``chunk_symbols`` characters to bound memory, carrying the unaligned tail bits from one chunk
+    to the next. The result is bit-identical to concatenating the code strings and padding with 0. Characters
+    missing from the table are skipped, like ``huffman_codes.get(char, '')`` does.
+
+    Args:
+        text (str or bytes-like): The text to encode, or raw bytes coded with a byte-value table.
+        codes (dict): Character (or byte value) to ``(code, length)`` pair, lengths up to 64 bits.
+        chunk_symbols (int): Number of characters processed per chunk.
+
+    Returns:
+        tuple: ``(payload, bit_length)`` with the packed bytes and the number of valid bits.
+    """
+    if not codes:
+        return b'', 0
+    if isinstance(text, str):
+        alphabet = sorted(codes)
+        code_points = np.array([ord(char) for char in alphabet], dtype=np.uint32)
+        code_values = np.array([codes[char][0] for char in alphabet], dtype=np.uint64)
+        code_lengths = np.array([codes[char][1] for char in alphabet], dtype=np.int64)
+        symbols = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    else:                                               # Raw bytes: 256-entry tables indexed by the byte value
+        byte_values = np.zeros(256, dtype=np.uint64)
+        byte_lengths = np.zeros(256, dtype=np.int64)
+        for byte, (code, length) in codes.items():
+            byte_values[byte] = code
+            byte_lengths[byte] = length
+        symbols = np.frombuffer(text, dtype=np.uint8)
+
+    payload = bytearray()
+    carry = np.zeros(0, dtype=np.uint8)
+    bit_length = 0
+    for start in range(0, len(symbols), chunk_symbols):
+        chunk = symbols[start:start + chunk_symbols]
+        if isinstance(text, str):
+            index = np.searchsorted(code_points, chunk)
+            index[index == len(code_points)] = 0
+            lengths = np.where(code_points[index] == chunk, code_lengths[index], 0)
+            values = code_values[index]
+        else:
+            lengths = byte_lengths[chunk]
+            values = byte_values[chunk]
+
+        total = int(lengths.sum())
+        starts = np.cumsum(lengths) - lengths
+        owner = np.repeat(np.arange(len(chunk)), lengths)
+        shifts = (lengths[owner] - 1 - (np.arange(total) - starts[owner])).astype(np.uint64)
+        bits = ((values[owner] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+        bits = np.concatenate((carry, bits))
+        whole = len(bits) & ~7
+        payload += np.packbits(bits[:whole]).tobytes()
+        carry = bits[whole:]
+        bit_length += total
+    payload += np.packbits(carry).tobytes()
+    return bytes(payload), bit_length
+
+
+def unique_in_order(values):
+    """
+    Distinct values of an array with their counts, in order of first occurrence like ``collections.Counter``.
+
+    Returns:
+        tuple: ``(keys, counts)`` arrays.
+    """
+    keys, first, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    return keys[order], counts[order]
+
+
+def count_histogram(text):
+    """
+    Returns:
+        dict: Character -> count of a non-empty text, in order of first occurrence.
+    """
+    keys, counts = unique_in_order(np.frombuffer(text.encode('utf-32-le'), dtype='<u4'))
+    return dict(zip(map(chr, keys.tolist()), counts.tolist()))
+
+
+def count_chunk(text, last=None, open_run=0):
+    """
+    Count characters, adjacent pairs and runs of a text chunk with array operations.
+
+    Characters are mapped to dense indices with ``numpy.unique``; pairs are counted over
+    ``previous * alphabet_size + next``, and runs are found where consecutive code points differ. Every count
+    is returned in the order the pure Python path of ``analysis.SymbolStats`` inserts it (first occurrence),
+    so that code tables built from the counts do not depend on whether NumPy is installed.
+
+    Args:
+        text (str): A non-empty chunk.
+        last (str): The character preceding the chunk, None at the start of the text.
+        open_run (int): Length of the run of ``last`` still open before the chunk.
+
+    Returns:
+        tuple: ``(histogram, transitions, run_lengths, run_chars, open_run)``: character counts, (previous,
+        next) pair counts including the pair across the chunk boundary, counts of closed run lengths, counts
+        of closed runs per character, and the length of the run left open at the end of the chunk.
+    """
+    symbols = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    alphabet, first, index, counts = np.unique(symbols, return_index=True, return_inverse=True,
+                                               return_counts=True)
+    chars = [chr(code_point) for code_point in alphabet.tolist()]
+    counts = counts.tolist()
+    histogram = {chars[key]: counts[key] for key in np.argsort(first, kind='stable').tolist()}
+
+    size = len(alphabet)
+    pair_keys, pair_counts = unique_in_order(index[:-1].astype(np.int64) * size + index[1:])
+    transitions = {}
+    if last is not None:
+        transitions[(last, text[0])] = 1
+    for key, count in zip(pair_keys.tolist(), pair_counts.tolist()):
+        pair = (chars[key // size], chars[key % size])
+        transitions[pair] = transitions.get(pair, 0) + count
+
+    starts = np.concatenate(([0], np.flatnonzero(symbols[1:] != symbols[:-1]) + 1))
+    lengths = np.diff(np.append(starts, len(symbols)))
+    run_index = index[starts]
+    if text[0] == last:
+        lengths[0] += open_run
+    run_lengths = {}
+    run_chars = {}
+    if open_run and text[0] != last:
+        run_lengths[open_run] = 1
+        run_chars[last] = 1
+    for key, count in zip(*(array.tolist() for array in unique_in_order(lengths[:-1]))):
+        run_lengths[key] = run_lengths.get(key, 0) + count
+    for key, count in zip(*(array.tolist() for array in unique_in_order(run_index[:-1]))):
+        run_chars[chars[key]] = run_chars.get(chars[key], 0) + count
+    return histogram, transitions, run_lengths, run_chars, int(lengths[-1])
+
+
+def count_matrix(histogram, transitions):
+    """
+    Arrange pair counts as an integer matrix over a dense symbol index.
+
+    Args:
+        histogram (dict): Character counts; its keys define the index order.
+        transitions (dict): (previous, next) pair counts.
+
+    Returns:
+        tuple: ``(alphabet, matrix)``. The matrix is a dense ``len(alphabet) x len(alphabet)`` array when it
+        holds at most ``DENSE_LIMIT`` cells, otherwise a sparse ``(rows, columns, counts)`` triple of arrays.
+    """
+    alphabet = list(histogram)
+    position = {char: index for index, char in enumerate(alphabet)}
+    rows = np.fromiter((position[previous] for previous, _ in transitions), dtype=np.int64, count=len(transitions))
+    columns = np.fromiter((position[char] for _, char in transitions), dtype=np.int64, count=len(transitions))
+    counts = np.fromiter(transitions.values(), dtype=np.int64, count=len(transitions))
+    size = len(alphabet)
+    if size * size <= DENSE_LIMIT:
+        matrix = np.zeros((size, size), dtype=np.int64)
+        matrix[rows, columns] = counts
+        return alphabet, matrix
+    return alphabet, (rows, columns, counts)
+
+
+def order1_entropies(histogram, transitions, total):
+    """
+    Compute order-0, order-1 conditional and pair joint entropies with array math.
+
+    Args:
+        histogram (dict): Character counts.
+        transitions (dict): (previous, next) pair counts.
+        total (int): Number of characters.
+
+    Returns:
+        tuple: ``(H(X), H(X_2|X_1), H(X_1, X_2))`` in bits. H(X_2|X_1) weights every context by its share of
+        all characters, like SymbolStats.conditional_entropy.
+    """
+    char_counts = np.fromiter(histogram.values(), dtype=np.float64, count=len(histogram))
+    p = char_counts / total
+    entropy = float(-(p * np.log2(p)).sum())
+    if not transitions:
+        return entropy, 0.0, 0.0
+
+    alphabet, matrix = count_matrix(histogram, transitions)
+    if isinstance(matrix, tuple):
+        rows, _, counts = matrix
+    else:
+        rows, _ = np.nonzero(matrix)
+        counts = matrix[matrix > 0]
+    counts = counts.astype(np.float64)
+    context_counts = np.bincount(rows, weights=counts, minlength=len(alphabet))
+    p_next = counts / context_counts[rows]
+    conditional_entropy = float((p[rows] * p_next * -np.log2(p_next)).sum())
+    p_pair = counts / counts.sum()
+    joint_entropy = float(-(p_pair * np.log2(p_pair)).sum())
+    return entropy, conditional_entropy, joint_entropy